@@ -1,18 +1,59 @@
-from fastapi import FastAPI
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 # Import your Pydantic models
 from app.models import ChatRequest, ChatResponse, DocumentSource
 
 # Import your final, history-aware RAG chain
-from core.chain import final_rag_chain
+from core.chain import get_final_rag_chain
+from core.history_compactor import get_history_compactor
+from core.metrics import metrics_callback
+from core.warmup import warm_up
+
+# --- Startup ---
+# Nothing heavy is built at import time, so uvicorn starts serving (and /live answers)
+# immediately while the model, Chroma and the Groq client warm up in the background.
+startup_state: Dict[str, Any] = {"ready": False, "error": None, "timings": {}}
+warmup_task: Optional[asyncio.Task] = None
+
+
+async def _warm_up_in_background() -> None:
+    try:
+        startup_state["timings"] = await asyncio.to_thread(warm_up)
+        startup_state["ready"] = True
+    except Exception as e:
+        print(f"Error during startup warmup: {e}")
+        startup_state["error"] = str(e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global warmup_task
+    warmup_task = asyncio.create_task(_warm_up_in_background())
+    yield
+    warmup_task.cancel()
+
+
+async def _wait_for_warmup() -> None:
+    # Requests that arrive during warmup wait for it instead of building components a second time.
+    # If warmup failed, the chain is built lazily on the request and raises the real error.
+    if warmup_task is not None and not warmup_task.done():
+        await asyncio.shield(warmup_task)
+
 
 # Initialize the FastAPI app
 app = FastAPI(
     title="Shree's Personal RAG API",
     description="A chatbot API for Shree's personal website, "
-                "powered by LangChain, Groq, and Chroma."
+                "powered by LangChain, Groq, and Chroma.",
+    lifespan=lifespan
 )
 
 # --- CORS Configuration ---
@@ -41,8 +82,40 @@ def read_root():
     return {"status": "ok", "message": "Welcome to Shree's RAG API!"}
 
 
+@app.get("/live")
+def liveness():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe: 200 once every component has warmed up, 503 until then.
+    """
+    if startup_state["ready"]:
+        return {"status": "ready", "startup_seconds": startup_state["timings"]}
+
+    status = "failed" if startup_state["error"] else "warming_up"
+    return JSONResponse(
+        status_code=503,
+        content={"status": status, "error": startup_state["error"]}
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: per-stage latency, LLM tokens, retrieved chunks,
+    cache hit rates and session-store size (for this worker process).
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_handler(request: ChatRequest):
+async def chat_handler(request: ChatRequest, background_tasks: BackgroundTasks):
     """
     The main chat endpoint.
     
@@ -53,12 +126,14 @@ async def chat_handler(request: ChatRequest):
     
     # 1. Create the config object for the chain
     # This tells the chain which session to use for memory
-    config = {"configurable": {"session_id": request.session_id}}
+    config = {"configurable": {"session_id": request.session_id}, "callbacks": [metrics_callback]}
     
     # 2. Create the input for the chain
     # This must match the 'input_messages_key' from your chain.py
     input_data = {"input": request.query}
     
+    await _wait_for_warmup()
+
     # 3. Invoke the chain
     # The chain will automatically:
     # - Load history (using get_session_history)
@@ -66,38 +141,83 @@ async def chat_handler(request: ChatRequest):
     # - Retrieve documents
     # - Generate the answer
     # - Save the new messages to history
-    response = final_rag_chain.invoke(input_data, config=config)
+    # ainvoke keeps the event loop free: Groq is called through its async
+    # client and Chroma/embedding work runs on the bounded executor.
+    response = await get_final_rag_chain().ainvoke(input_data, config=config)
+
+    # Fold older turns into the session summary after the response has been sent
+    compactor = get_history_compactor()
+    if compactor is not None:
+        background_tasks.add_task(compactor.refresh, request.session_id)
     
     # 4. Format the response
     # The chain's output is a dictionary. We extract
     # the 'answer' and 'context' (which are the documents).
-    
-    # Convert the LangChain Document objects into Pydantic models
-    # source_docs = [
-    #     DocumentSource(
-    #         page_content=doc.page_content,
-    #         metadata=doc.metadata
-    #     ) for doc in response.get("context", [])
-    # ]
-
-    source_docs = []
-    for doc in response.get("context", []):
-        # Flashrank adds metadata values as 'numpy.float32', which 
-        # Pydantic/JSON cannot serialize. We must convert them to standard floats.
-        safe_metadata = {}
-        for key, value in doc.metadata.items():
-            # We check the type string to avoid importing numpy directly
-            if "numpy" in str(type(value)):
-                safe_metadata[key] = float(value)
-            else:
-                safe_metadata[key] = value
-        
-        source_docs.append(DocumentSource(
-            page_content=doc.page_content,
-            metadata=safe_metadata
-        ))
-    
     return ChatResponse(
         answer=response.get("answer", "Error: No answer found."),
-        source_documents=source_docs
-    )
\ No newline at end of file
+        source_documents=_to_source_documents(response.get("context", []))
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream_handler(request: ChatRequest):
+    """
+    The streaming chat endpoint.
+
+    Runs the same history-aware chain as /chat, but streams the
+    result back as Server-Sent Events:
+    - "sources": the retrieved documents, sent as soon as retrieval finishes
+    - "token":   a piece of the answer, sent as the LLM generates it
+    - "done":    the answer is complete (and saved to the session history)
+    - "error":   something went wrong mid-stream
+    """
+    config = {"configurable": {"session_id": request.session_id}, "callbacks": [metrics_callback]}
+    input_data = {"input": request.query}
+
+    async def event_stream() -> AsyncIterator[str]:
+        await _wait_for_warmup()
+        try:
+            # astream yields partial dicts: the passthrough keys first, then
+            # 'context' once the retriever returns, then 'answer' token by token.
+            # RunnableWithMessageHistory writes the full answer to history
+            # when the stream ends.
+            async for chunk in get_final_rag_chain().astream(input_data, config=config):
+                if "context" in chunk:
+                    sources = _to_source_documents(chunk["context"])
+                    yield _sse_event("sources", [doc.model_dump() for doc in sources])
+                if chunk.get("answer"):
+                    yield _sse_event("token", chunk["answer"])
+            yield _sse_event("done", {})
+        except Exception as e:
+            print(f"Error while streaming chat response: {e}")
+            yield _sse_event("error", {"message": "Error: could not generate an answer."})
+
+    # Runs once the last event has been sent, like the background task on /chat
+    compactor = get_history_compactor()
+    background = BackgroundTask(compactor.refresh, request.session_id) if compactor is not None else None
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Stop proxies (e.g. nginx on Spaces) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background
+    )
+
+
+def _to_source_documents(docs) -> List[DocumentSource]:
+    """
+    Convert the LangChain Document objects into Pydantic models.
+    """
+    # The reranker stores its scores as plain floats, so metadata is JSON-safe as-is
+    return [
+        DocumentSource(page_content=doc.page_content, metadata=doc.metadata)
+        for doc in docs
+    ]
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """
+    Format a single Server-Sent Event frame.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
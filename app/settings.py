@@ -2,6 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, SecretStr
+from typing import Optional
 
 class Settings(BaseSettings):
     LLM_PROVIDER: str = Field("groq", env="LLM_PROVIDER")
@@ -9,23 +10,129 @@ class Settings(BaseSettings):
     #LLM_MODEL: str = Field("llama-3.1-8B-instant", env = "LLM_MODEL")
     LLM_MODEL: str = Field("llama-3.3-70b-versatile", env = "LLM_MODEL")
     GROQ_API_KEY: SecretStr = Field(..., env = "GROQ_API_KEY")
+    # Model for rewriting follow-ups into standalone search queries (empty = LLM_MODEL). Check a smaller one
+    # (e.g. llama-3.1-8b-instant) against LLM_MODEL with scripts/eval_rewriter.py before switching
+    REPHRASE_LLM_MODEL: str = Field("", env="REPHRASE_LLM_MODEL")
+
+    # LLM_PROVIDER="fake": deterministic offline model for load tests (time to first token, then a fixed token rate)
+    FAKE_LLM_FIRST_TOKEN_MS: float = Field(200, env="FAKE_LLM_FIRST_TOKEN_MS")
+    FAKE_LLM_TOKENS_PER_SECOND: float = Field(250, env="FAKE_LLM_TOKENS_PER_SECOND")
+    FAKE_LLM_ANSWER_TOKENS: int = Field(60, env="FAKE_LLM_ANSWER_TOKENS")
 
     EMBEDDING_MODEL_NAME: str = Field("all-MiniLM-L6-v2", env = "EMBEDDING_MODEL_NAME")
     EMBEDDING_DEVICE: str = Field("cpu", env="EMBEDDING_DEVICE")
     EMBEDDING_NORMALIZE: bool = Field(False, env="EMBEDDING_NORMALIZE")
-    EMBEDDING_BATCH_SIZE: int = Field(1, env="EMBEDDING_BATCH_SIZE")
+    # Upper bound for a single sentence-transformers forward pass
+    EMBEDDING_BATCH_SIZE: int = Field(64, env="EMBEDDING_BATCH_SIZE")
+    # Ingestion batches are sized so (batch size x longest chunk) stays under this many tokens
+    EMBEDDING_BATCH_TOKEN_BUDGET: int = Field(8192, env="EMBEDDING_BATCH_TOKEN_BUDGET")
+    # "torch" (sentence-transformers) or "onnx" (ONNX Runtime export, see scripts/export_onnx_embeddings.py)
+    EMBEDDING_BACKEND: str = Field("torch", env="EMBEDDING_BACKEND")
+    EMBEDDING_ONNX_DIR: str = Field("./onnx_models/all-MiniLM-L6-v2", env="EMBEDDING_ONNX_DIR")
+    EMBEDDING_ONNX_QUANTIZED: bool = Field(True, env="EMBEDDING_ONNX_QUANTIZED")
+    # Coalesce concurrent query embeddings arriving within a few ms into one batch
+    EMBEDDING_MICROBATCH_ENABLED: bool = Field(True, env="EMBEDDING_MICROBATCH_ENABLED")
+    EMBEDDING_MICROBATCH_WINDOW_MS: float = Field(5, env="EMBEDDING_MICROBATCH_WINDOW_MS")
+    EMBEDDING_MICROBATCH_MAX_SIZE: int = Field(32, env="EMBEDDING_MICROBATCH_MAX_SIZE")
+    EMBEDDING_CACHE_ENABLED: bool = Field(True, env="EMBEDDING_CACHE_ENABLED")
+    EMBEDDING_CACHE_PATH: str = Field("./embedding_cache.sqlite3", env="EMBEDDING_CACHE_PATH")
+    EMBEDDING_QUERY_LRU_SIZE: int = Field(1024, env="EMBEDDING_QUERY_LRU_SIZE")
     GITHUB_USERNAME: str = Field(..., env = "GITHUB_USERNAME")
+    # "api" fetches only the README files through the GitHub API; "git" clones every repo (old behaviour).
+    # Both load the same documents with the same metadata, so switching doesn't re-embed anything
+    GITHUB_LOADER_MODE: str = Field("api", env="GITHUB_LOADER_MODE")
+    GITHUB_API_URL: str = Field("https://api.github.com", env="GITHUB_API_URL")
+    GITHUB_TOKEN: Optional[SecretStr] = Field(None, env="GITHUB_TOKEN")
+    GITHUB_MAX_CONCURRENCY: int = Field(8, env="GITHUB_MAX_CONCURRENCY")
+    GITHUB_README_CACHE_PATH: str = Field("./github_readme_cache.json", env="GITHUB_README_CACHE_PATH")
 
     VECTOR_DB_PATH: str = Field("./vector_db_store", env = "VECTOR_DB_PATH")
     VECTOR_DB_COLLECTION_NAME: str = Field("resume_rag", env = "VECTOR_DB_NAME")
+    # Vector search backend: "chroma" (HNSW) or "numpy" (exact search over a memory-mapped array, written by ingest)
+    VECTOR_BACKEND: str = Field("chroma", env="VECTOR_BACKEND")
+    # HNSW index of the Chroma collection (see scripts/sweep_hnsw.py). Space, M and construction ef are
+    # fixed when the collection is created; to change them, ingest into a new VECTOR_DB_PATH and point the API at it.
+    # "l2" is what the existing collection was built with. all-MiniLM-L6-v2 ends in a Normalize layer, so its
+    # vectors are unit-length either way and l2 ranks exactly like cosine
+    HNSW_SPACE: str = Field("l2", env="HNSW_SPACE")
+    HNSW_M: int = Field(16, env="HNSW_M")
+    HNSW_CONSTRUCTION_EF: int = Field(100, env="HNSW_CONSTRUCTION_EF")
+    # Can change at any time: applied to the existing collection on startup
+    HNSW_SEARCH_EF: int = Field(100, env="HNSW_SEARCH_EF")
+    # Candidates handed to the reranker, which keeps RERANKER_TOP_N for the prompt, so a smaller k would only shrink
+    # the rerank batch, not the prompt. Stays at 12 with hybrid retrieval until scripts/bench_hybrid_retrieval.py
+    # shows the same recall at a smaller k on the real corpus
     RETRIEVER_K_VALUE: int = Field(12, env="RETRIEVER_K_VALUE") 
+    # "vector" (Chroma only) or "hybrid" (Chroma + BM25 fused with reciprocal-rank fusion)
+    RETRIEVER_MODE: str = Field("hybrid", env="RETRIEVER_MODE")
+    # How many candidates each retriever contributes before fusion
+    HYBRID_CANDIDATES_K: int = Field(20, env="HYBRID_CANDIDATES_K")
+    HYBRID_RRF_K: int = Field(60, env="HYBRID_RRF_K")
+    # Follow-up turns: search with the raw input while the rephrase call runs, and search again with the
+    # standalone question only when it is less similar (cosine) than this; optionally add the previous turn's query
+    SPECULATIVE_RETRIEVAL_ENABLED: bool = Field(False, env="SPECULATIVE_RETRIEVAL_ENABLED")
+    SPECULATIVE_RETRIEVAL_THRESHOLD: float = Field(0.9, env="SPECULATIVE_RETRIEVAL_THRESHOLD")
+    SPECULATIVE_RETRIEVAL_PREVIOUS_QUERY: bool = Field(False, env="SPECULATIVE_RETRIEVAL_PREVIOUS_QUERY")
+    # Follow-ups with no references to earlier turns that are this similar (cosine) to a corpus topic
+    # go to retrieval as they are, without the rephrase LLM call. Off until the threshold is tuned on the
+    # real corpus with scripts/eval_rewriter.py
+    REPHRASE_FAST_PATH_ENABLED: bool = Field(False, env="REPHRASE_FAST_PATH_ENABLED")
+    REPHRASE_FAST_PATH_MIN_SIMILARITY: float = Field(0.3, env="REPHRASE_FAST_PATH_MIN_SIMILARITY")
+    # Topic centroids written by scripts/ingest.py: up to this many per source (k-means over its chunks)
+    TOPIC_CENTROIDS_PER_SOURCE: int = Field(3, env="TOPIC_CENTROIDS_PER_SOURCE")
+    # Questions less similar (cosine) than this to every topic centroid get a templated redirect, without
+    # retrieval or the LLM (see scripts/eval_topic_gate.py). Only first turns are gated, and never greetings,
+    # questions to the assistant or questions with references (core/topic_gate.py:is_gateable). Off until the
+    # threshold has been checked against the real centroids: a false positive replaces a real answer with the redirect
+    OFF_TOPIC_GATE_ENABLED: bool = Field(False, env="OFF_TOPIC_GATE_ENABLED")
+    OFF_TOPIC_GATE_THRESHOLD: float = Field(0.2, env="OFF_TOPIC_GATE_THRESHOLD")
     
     # 2. The "Strict Filter": How many docs to send to the LLM after reranking
-    # RERANKER_TOP_N: int = Field(3, env="RERANKER_TOP_N")
+    RERANKER_ENABLED: bool = Field(False, env="RERANKER_ENABLED")
+    RERANKER_TOP_N: int = Field(3, env="RERANKER_TOP_N")
+    RERANKER_MODEL: str = Field("ms-marco-TinyBERT-L-2-v2", env="RERANKER_MODEL")
+    # Past this many ms of scoring, the chunks go to the LLM in retriever order instead
+    RERANKER_BUDGET_MS: float = Field(300, env="RERANKER_BUDGET_MS")
+    RERANKER_CACHE_SIZE: int = Field(4096, env="RERANKER_CACHE_SIZE")
+
+    # Merge overlapping neighbour chunks, drop near-duplicates and pack the context into this many tokens
+    CONTEXT_COMPACTION_ENABLED: bool = Field(True, env="CONTEXT_COMPACTION_ENABLED")
+    CONTEXT_TOKEN_BUDGET: int = Field(3000, env="CONTEXT_TOKEN_BUDGET")
+    CONTEXT_DUPLICATE_THRESHOLD: float = Field(0.9, env="CONTEXT_DUPLICATE_THRESHOLD")
 
     CHUNK_SIZE: int = Field(1000, env = "CHUNK_SIZE")
     CHUNK_OVERLAP: int = Field(200, env = "CHUNK_OVERLAP")
 
+    # Semantic answer cache: reuse an answer when the standalone question is this similar (cosine)
+    SEMANTIC_CACHE_ENABLED: bool = Field(True, env="SEMANTIC_CACHE_ENABLED")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(0.95, env="SEMANTIC_CACHE_THRESHOLD")
+    SEMANTIC_CACHE_MAX_ENTRIES: int = Field(256, env="SEMANTIC_CACHE_MAX_ENTRIES")
+    SEMANTIC_CACHE_TTL_SECONDS: float = Field(3600, env="SEMANTIC_CACHE_TTL_SECONDS")
+
+    # Identical first-turn questions that arrive while one is already being answered wait for that answer
+    SINGLE_FLIGHT_ENABLED: bool = Field(True, env="SINGLE_FLIGHT_ENABLED")
+    # How long a follower waits for the leader before running the chain itself (e.g. the leader's Groq call hangs)
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = Field(30.0, env="SINGLE_FLIGHT_TIMEOUT_SECONDS")
+
+    # Chat history storage: "memory" (per process) or "sqlite" (survives restarts, shared by workers)
+    SESSION_STORE_BACKEND: str = Field("memory", env="SESSION_STORE_BACKEND")
+    SESSION_STORE_PATH: str = Field("./session_store.sqlite3", env="SESSION_STORE_PATH")
+    SESSION_MAX_SESSIONS: int = Field(1000, env="SESSION_MAX_SESSIONS")
+    SESSION_IDLE_TTL_SECONDS: float = Field(3600, env="SESSION_IDLE_TTL_SECONDS")
+    SESSION_MAX_MESSAGES: int = Field(20, env="SESSION_MAX_MESSAGES")
+    SESSION_MAX_TOKENS: int = Field(4000, env="SESSION_MAX_TOKENS")
+
+    # History compaction: the last HISTORY_KEEP_TURNS turns stay verbatim, older turns are folded into a rolling
+    # summary after the response is sent, and the history part of every prompt stays under HISTORY_TOKEN_BUDGET
+    HISTORY_COMPACTION_ENABLED: bool = Field(True, env="HISTORY_COMPACTION_ENABLED")
+    HISTORY_KEEP_TURNS: int = Field(3, env="HISTORY_KEEP_TURNS")
+    HISTORY_SUMMARIZE_EVERY_TURNS: int = Field(2, env="HISTORY_SUMMARIZE_EVERY_TURNS")
+    HISTORY_TOKEN_BUDGET: int = Field(1500, env="HISTORY_TOKEN_BUDGET")
+    HISTORY_SUMMARY_MAX_WORDS: int = Field(150, env="HISTORY_SUMMARY_MAX_WORDS")
+
+    # Size of the thread pool that runs blocking work (Chroma, embeddings) off the event loop
+    BLOCKING_IO_MAX_WORKERS: int = Field(4, env="BLOCKING_IO_MAX_WORKERS")
+
 
     class Config():
         env_file = ".env"
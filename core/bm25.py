@@ -0,0 +1,160 @@
+# The purpose of this file is to provide keyword (BM25) retrieval over the same chunks that live in Chroma.
+# Our corpus is full of exact tokens (repo names like "3D-Image-Rendering", library and company names) that
+# MiniLM embeddings match poorly; BM25 matches them exactly. The index is a small in-memory inverted index,
+# rebuilt by scripts/ingest.py and persisted as JSON next to the Chroma files in VECTOR_DB_PATH.
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from core.vector_store import get_collection_version
+
+BM25_INDEX_FILE = "bm25_index.json"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_.]")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can did do does for from has have he his how i in is it its "
+    "me my of on or she that the their them they this to was what when where which who why "
+    "will with you your about tell".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens. Compound tokens ("3d-image-rendering", "langchain.chains") are kept
+    whole and also split into their parts, so both the exact name and its pieces match.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if _SPLIT_RE.search(token):
+            tokens.extend(part for part in _SPLIT_RE.split(token) if part and part not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.collection_version = ""
+
+    @classmethod
+    def build(
+        cls,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        collection_version: str = ""
+    ) -> "BM25Index":
+        index = cls()
+        index.ids, index.texts, index.metadatas = list(ids), list(texts), list(metadatas)
+        index.collection_version = collection_version
+
+        postings = defaultdict(list)
+        for doc_idx, text in enumerate(texts):
+            term_counts = Counter(tokenize(text))
+            index.doc_lengths.append(sum(term_counts.values()))
+            for term, tf in term_counts.items():
+                postings[term].append((doc_idx, tf))
+        index.postings = dict(postings)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Top-k (doc index, BM25 score) pairs for the query.
+        """
+        n_docs = len(self.ids)
+        if not n_docs:
+            return []
+        avg_length = sum(self.doc_lengths) / n_docs
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_idx] / avg_length)
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def document(self, doc_idx: int) -> Document:
+        return Document(id=self.ids[doc_idx], page_content=self.texts[doc_idx], metadata=dict(self.metadatas[doc_idx]))
+
+    def save(self, path: str) -> None:
+        data = {
+            "collection_version": self.collection_version,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Postings are cheap to rebuild and would triple the file size, so only the chunks are stored
+        index = cls.build(data["ids"], data["texts"], data["metadatas"], data["collection_version"])
+        index.k1, index.b = data["k1"], data["b"]
+        return index
+
+
+def bm25_index_path(vector_db_path: str) -> str:
+    return os.path.join(vector_db_path, BM25_INDEX_FILE)
+
+
+class BM25Retriever(BaseRetriever):
+    """
+    Retriever over the persisted BM25 index. Reloads the index when ingest bumps the collection version.
+    """
+    index_path: str
+    k: int = 12
+
+    _index: Optional[BM25Index] = PrivateAttr(default=None)
+    _loaded_version: Optional[str] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_index(self) -> BM25Index:
+        version = get_collection_version()
+        with self._lock:
+            if self._index is None or self._loaded_version != version:
+                print(f"Loading BM25 index from {self.index_path}")
+                self._index = BM25Index.load(self.index_path)
+                self._loaded_version = version
+            return self._index
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        index = self._get_index()
+        return [index.document(doc_idx) for doc_idx, _ in index.search(query, self.k)]
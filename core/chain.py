@@ -1,69 +1,180 @@
 ## The purpose of this file is 
 
-from langchain.chains import (
-	create_history_aware_retriever,
-    create_retrieval_chain
-)
+from functools import lru_cache
+from operator import itemgetter
+from typing import Optional
+
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable, RunnableBranch, RunnablePassthrough
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
-# from langchain.retrievers import ContextualCompressionRetriever
-# from langchain.retrievers.document_compressors.flashrank_rerank import FlashrankRerank
-
-from core.vector_store import base_retriever
-from core.llm import llm
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.retrievers import BaseRetriever
+
+from core.retrievers import get_candidate_retriever, get_retriever
+from core.embeddings import get_embedding_model
+from core.llm import getLLM, getRephraseLLM
+from core.semantic_cache import SemanticAnswerCache
+from core.single_flight import SingleFlight
+from core.speculative_retrieval import SpeculativeRetrieval
+from core.query_rewriter import QueryRewriter
+from core.topic_gate import OffTopicGate
+from core.topic_centroids import get_topic_centroids_loader
+from core.session_store import get_session_store
+from core.history_compactor import CompactedChatHistory
 from core.prompts import (
     REPHRASE_PROMPT,
     RAG_PROMPT
 )
-# from app.settings import Settings
-
-# settings = Settings()
-
-# compressor = FlashrankRerank(top_n=settings.RERANKER_TOP_N)
-
-# retriever = ContextualCompressionRetriever(
-#     base_compressor=compressor, 
-#     base_retriever=base_retriever
-# )
-
-# LLM create a standalone question to use for embedding and similarity search
-history_aware_retriever = create_history_aware_retriever(
-    llm,
-    base_retriever,
-    REPHRASE_PROMPT
-)
+from app.settings import Settings
+
+settings = Settings()
+
+def build_rephrase_chain(llm: BaseChatModel, rewriter: Optional[QueryRewriter] = None) -> Runnable:
+    # LLM create a standalone question to use for embedding and similarity search.
+    # On the first turn there is no history, so the input already is the standalone question.
+    rephrase = REPHRASE_PROMPT | llm | StrOutputParser()
+    if rewriter is not None:
+        # Self-contained follow-ups skip the LLM too
+        rephrase = rewriter.wrap(rephrase)
+    return RunnableBranch(
+        (lambda x: not x.get("chat_history"), lambda x: x["input"]),
+        rephrase
+    ).with_config(run_name="rephrase_question", tags=["stage:rephrase"])
+
+
+def build_conversational_rag_chain(
+    llm: BaseChatModel,
+    retriever: BaseRetriever,
+    answer_cache: Optional[SemanticAnswerCache] = None,
+    speculative: Optional[SpeculativeRetrieval] = None,
+    rephrase_llm: Optional[BaseChatModel] = None,
+    rewriter: Optional[QueryRewriter] = None
+) -> Runnable:
+    rephrase_chain = build_rephrase_chain(rephrase_llm or llm, rewriter)
+
+    # uses the context to answer the question from the LLM
+    question_answer_chain = create_stuff_documents_chain(
+        llm,
+        RAG_PROMPT
+    ).with_config(tags=["stage:generation"])
+
+    # searches with the standalone question, then passes the context (the included documents)
+    # as well as the question with history into the llm to answer
+    if speculative is not None:
+        retrieve = speculative.retrieve(retriever)
+    else:
+        retrieve = itemgetter("standalone_question") | retriever
+    retrieve_and_answer = RunnablePassthrough.assign(
+        context=retrieve.with_config(run_name="retrieve_documents")
+    ).assign(answer=question_answer_chain)
+
+    if answer_cache is not None:
+        retrieve_and_answer = answer_cache.wrap(retrieve_and_answer)
+
+    if speculative is not None:
+        # Candidate search on the raw input runs in parallel with the rephrase LLM call
+        rephrase = RunnablePassthrough.assign(
+            standalone_question=rephrase_chain,
+            speculative_candidates=speculative.speculate()
+        )
+    else:
+        rephrase = RunnablePassthrough.assign(standalone_question=rephrase_chain)
+
+    return (rephrase | retrieve_and_answer).with_config(run_name="retrieval_chain")
+
+
+@lru_cache(maxsize=None)
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache(
+        get_embedding_model(),
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS
+    )
+
+
+@lru_cache(maxsize=None)
+def get_single_flight() -> Optional[SingleFlight]:
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return None
+    return SingleFlight(
+        input_key="input",
+        history_key="chat_history",
+        timeout_seconds=settings.SINGLE_FLIGHT_TIMEOUT_SECONDS
+    )
+
+
+@lru_cache(maxsize=None)
+def get_speculative_retrieval() -> Optional[SpeculativeRetrieval]:
+    if not settings.SPECULATIVE_RETRIEVAL_ENABLED:
+        return None
+    return SpeculativeRetrieval(
+        get_candidate_retriever(),
+        get_embedding_model(),
+        threshold=settings.SPECULATIVE_RETRIEVAL_THRESHOLD,
+        k=settings.RETRIEVER_K_VALUE,
+        rrf_k=settings.HYBRID_RRF_K,
+        include_previous_query=settings.SPECULATIVE_RETRIEVAL_PREVIOUS_QUERY
+    )
+
+
+@lru_cache(maxsize=None)
+def get_query_rewriter() -> Optional[QueryRewriter]:
+    if not settings.REPHRASE_FAST_PATH_ENABLED:
+        return None
+    return QueryRewriter(
+        get_embedding_model(),
+        get_topic_centroids_loader().get,
+        min_topic_similarity=settings.REPHRASE_FAST_PATH_MIN_SIMILARITY
+    )
+
+
+@lru_cache(maxsize=None)
+def get_off_topic_gate() -> Optional[OffTopicGate]:
+    if not settings.OFF_TOPIC_GATE_ENABLED:
+        return None
+    return OffTopicGate(
+        get_embedding_model(),
+        get_topic_centroids_loader().get,
+        threshold=settings.OFF_TOPIC_GATE_THRESHOLD
+    )
+
+
+@lru_cache(maxsize=None)
+def get_conversational_rag_chain() -> Runnable:
+    chain = build_conversational_rag_chain(
+        getLLM(), get_retriever(), get_answer_cache(), get_speculative_retrieval(),
+        rephrase_llm=getRephraseLLM(), rewriter=get_query_rewriter()
+    )
+    single_flight = get_single_flight()
+    if single_flight is not None:
+        # Inside RunnableWithMessageHistory, so each coalesced caller still writes its own history
+        chain = single_flight.wrap(chain)
+    off_topic_gate = get_off_topic_gate()
+    if off_topic_gate is not None:
+        # Outermost: off-topic questions skip rephrase, retrieval and generation (and single-flight)
+        chain = off_topic_gate.wrap(chain)
+    return chain
 
-# uses the context to answer the question from the LLM
-question_answer_chain = create_stuff_documents_chain(
-    llm,
-    RAG_PROMPT
-)
-
-# takes the context (the included documents) as well as the 
-# rephrased question with history and passes it into the llm to answer
-conversational_rag_chain = create_retrieval_chain(
-    history_aware_retriever,
-    question_answer_chain
-)
-
-chat_history_store = {}
 
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in chat_history_store:
-        chat_history_store[session_id] = ChatMessageHistory()
-    return chat_history_store[session_id]
-
-final_rag_chain = RunnableWithMessageHistory(
-    conversational_rag_chain,
-    get_session_history=get_session_history,
-    input_messages_key="input",
-    output_messages_key="answer",
-    history_messages_key="chat_history"
-)
-
-
-
-
-
+    # Adapter between RunnableWithMessageHistory and the bounded session store
+    if settings.HISTORY_COMPACTION_ENABLED:
+        # Prompts see the rolling summary + recent turns; core/history_compactor.py does the folding
+        return CompactedChatHistory(get_session_store(), session_id, settings.HISTORY_TOKEN_BUDGET)
+    return get_session_store().get_history(session_id)
+
+
+@lru_cache(maxsize=None)
+def get_final_rag_chain() -> Runnable:
+    return RunnableWithMessageHistory(
+        get_conversational_rag_chain(),
+        get_session_history=get_session_history,
+        input_messages_key="input",
+        output_messages_key="answer",
+        history_messages_key="chat_history"
+    )
@@ -0,0 +1,204 @@
+# The purpose of this file is to shrink the retrieved context before it is stuffed into RAG_PROMPT.
+# Ingestion splits with a 200-char overlap and records `start_index`, so neighbouring chunks from the same
+# README often come back together and the overlapping text would be sent to the LLM twice. This stage:
+# 1. merges chunks from the same source whose [start_index, start_index + len) spans overlap or touch
+# 2. drops chunks whose text is (almost) entirely covered by a better-ranked chunk
+#    (e.g. the same text in two repos' READMEs)
+# 3. packs what's left, in retrieval order, into a token budget (truncating the last chunk if needed)
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from core.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Chunks are whitespace-stripped by the splitter, so "touching" chunks can be a newline or two apart
+_MAX_MERGE_GAP = 2
+# Smallest useful tail of a chunk when truncating to fit the budget
+_MIN_TRUNCATED_TOKENS = 50
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class CompactionReport:
+    chunks_in: int = 0
+    chunks_out: int = 0
+    merged: int = 0
+    duplicates_dropped: int = 0
+    dropped_for_budget: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+def _source_of(doc: Document) -> Tuple[str, object]:
+    # start_index restarts on every PDF page (PyPDFLoader), so offsets are only comparable within a page
+    metadata = doc.metadata
+    source = metadata.get("source_key") or metadata.get("repo_name") or metadata.get("source_file") or metadata.get("source", "")
+    return source, metadata.get("page")
+
+
+def _shingles(text: str, n: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    return {tuple(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+
+def merge_adjacent_chunks(docs: List[Document]) -> Tuple[List[Document], int]:
+    """
+    Merge overlapping/contiguous chunks of the same source (and PDF page). Each merged chunk takes the
+    rank, metadata and scores of its best-ranked member. Returns the new list and how many chunks were folded in.
+    """
+    spans: Dict[Tuple[str, object], List[Tuple[int, int, Document]]] = {}
+    unplaced: List[Tuple[int, Document]] = []
+    for rank, doc in enumerate(docs):
+        start = doc.metadata.get("start_index")
+        if isinstance(start, int):
+            spans.setdefault(_source_of(doc), []).append((start, rank, doc))
+        else:
+            unplaced.append((rank, doc))
+
+    merged_count = 0
+    ranked: List[Tuple[int, Document]] = list(unplaced)
+    for members in spans.values():
+        members.sort(key=lambda item: item[0])
+
+        cur_start, cur_rank, cur_doc = members[0]
+        cur_text, cur_parts = cur_doc.page_content, 1
+        for start, rank, doc in members[1:]:
+            cur_end = cur_start + len(cur_text)
+            if start <= cur_end + _MAX_MERGE_GAP:
+                if start >= cur_end:
+                    cur_text = cur_text + "\n" + doc.page_content
+                else:
+                    cur_text = cur_text + doc.page_content[cur_end - start:]
+                if rank < cur_rank:
+                    cur_rank, cur_doc = rank, doc
+                cur_parts += 1
+                merged_count += 1
+                continue
+            ranked.append((cur_rank, _merged_document(cur_doc, cur_start, cur_text, cur_parts)))
+            cur_start, cur_rank, cur_doc = start, rank, doc
+            cur_text, cur_parts = doc.page_content, 1
+        ranked.append((cur_rank, _merged_document(cur_doc, cur_start, cur_text, cur_parts)))
+
+    ranked.sort(key=lambda item: item[0])
+    return [doc for _, doc in ranked], merged_count
+
+
+def _merged_document(doc: Document, start: int, text: str, parts: int) -> Document:
+    if parts == 1:
+        return doc
+    metadata = dict(doc.metadata, start_index=start, merged_chunks=parts)
+    return Document(id=doc.id, page_content=text, metadata=metadata)
+
+
+def drop_near_duplicates(docs: List[Document], threshold: float) -> Tuple[List[Document], int]:
+    """
+    Drop a chunk when at least `threshold` of its word 3-grams already appear in one kept chunk.
+    Containment (rather than Jaccard) also catches a chunk swallowed by a larger merged chunk.
+    """
+    kept: List[Document] = []
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / len(shingles) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept, len(docs) - len(kept)
+
+
+def pack_to_budget(docs: List[Document], token_budget: int) -> Tuple[List[Document], int]:
+    packed: List[Document] = []
+    used = 0
+    for i, doc in enumerate(docs):
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens <= token_budget:
+            packed.append(doc)
+            used += tokens
+            continue
+
+        remaining = token_budget - used
+        if remaining >= _MIN_TRUNCATED_TOKENS:
+            text = doc.page_content[:remaining * CHARS_PER_TOKEN]
+            packed.append(Document(id=doc.id, page_content=text, metadata=dict(doc.metadata, truncated=True)))
+        return packed, len(docs) - len(packed)
+    return packed, 0
+
+
+def compact_context(
+    docs: List[Document], token_budget: int, duplicate_threshold: float = 0.9
+) -> Tuple[List[Document], CompactionReport]:
+    report = CompactionReport(
+        chunks_in=len(docs),
+        tokens_in=sum(estimate_tokens(doc.page_content) for doc in docs)
+    )
+
+    docs, report.merged = merge_adjacent_chunks(docs)
+    docs, report.duplicates_dropped = drop_near_duplicates(docs, duplicate_threshold)
+    docs, report.dropped_for_budget = pack_to_budget(docs, token_budget)
+
+    report.chunks_out = len(docs)
+    report.tokens_out = sum(estimate_tokens(doc.page_content) for doc in docs)
+    return docs, report
+
+
+class CompactingRetriever(BaseRetriever):
+    """
+    Runs compact_context() over another retriever's results and keeps running totals of tokens saved.
+    """
+    base_retriever: BaseRetriever
+    token_budget: int = 3000
+    duplicate_threshold: float = 0.9
+
+    _totals: CompactionReport = PrivateAttr(default_factory=CompactionReport)
+    _requests: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _compact(self, docs: List[Document]) -> List[Document]:
+        docs, report = compact_context(docs, self.token_budget, self.duplicate_threshold)
+        with self._lock:
+            self._requests += 1
+            for field in ("chunks_in", "chunks_out", "merged", "duplicates_dropped",
+                          "dropped_for_budget", "tokens_in", "tokens_out"):
+                setattr(self._totals, field, getattr(self._totals, field) + getattr(report, field))
+        return docs
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            totals, requests = self._totals, self._requests
+            return {
+                "requests": requests,
+                "tokens_in": totals.tokens_in,
+                "tokens_out": totals.tokens_out,
+                "tokens_saved": totals.tokens_saved,
+                "tokens_saved_ratio": totals.tokens_saved / totals.tokens_in if totals.tokens_in else 0.0,
+                "chunks_merged": totals.merged,
+                "duplicates_dropped": totals.duplicates_dropped,
+                "dropped_for_budget": totals.dropped_for_budget,
+            }
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self._compact(docs)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = await self.base_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return self._compact(docs)
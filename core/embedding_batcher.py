@@ -0,0 +1,72 @@
+# The purpose of this file is to embed a large list of texts (ingestion) efficiently on CPU.
+# Texts are sorted by estimated token length so each batch holds similarly sized texts (little padding),
+# and each batch is sized from a token budget: many short chunks go together, long chunks go in small batches.
+# Vectors are returned in the original order of the texts.
+
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from core.tokens import estimate_tokens
+
+
+@dataclass
+class EmbeddingBatchReport:
+    texts: int
+    batches: int
+    largest_batch: int
+    seconds: float
+
+    @property
+    def texts_per_second(self) -> float:
+        return self.texts / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"Embedded {self.texts} chunks in {self.batches} batches "
+                f"(largest {self.largest_batch}) in {self.seconds:.2f}s "
+                f"= {self.texts_per_second:.1f} chunks/sec")
+
+
+def plan_batches(texts: List[str], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Group text indices into length-sorted batches. A batch is padded to its longest text,
+    so it is closed once (batch size x longest text) would exceed the token budget.
+    """
+    order = sorted(range(len(texts)), key=lambda i: estimate_tokens(texts[i]))
+
+    batches, batch = [], []
+    for i in order:
+        longest = estimate_tokens(texts[i])  # ascending order: the newest text is the longest
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * longest > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def embed_in_buckets(
+    embedding_model: Embeddings,
+    texts: List[str],
+    token_budget: int,
+    max_batch_size: int
+) -> Tuple[List[List[float]], EmbeddingBatchReport]:
+    start = time.perf_counter()
+    batches = plan_batches(texts, token_budget, max_batch_size)
+
+    vectors: List[List[float]] = [None] * len(texts)
+    for batch in batches:
+        batch_vectors = embedding_model.embed_documents([texts[i] for i in batch])
+        for i, vector in zip(batch, batch_vectors):
+            vectors[i] = vector
+
+    report = EmbeddingBatchReport(
+        texts=len(texts),
+        batches=len(batches),
+        largest_batch=max((len(b) for b in batches), default=0),
+        seconds=time.perf_counter() - start
+    )
+    return vectors, report
@@ -0,0 +1,163 @@
+# The purpose of this file is to avoid running the embedding model over text it has already embedded.
+# CachedEmbeddings wraps any Embeddings model and is shared by ingestion (embed_documents) and the query path
+# (embed_query). Document vectors are stored as float32 blobs in a SQLite file keyed by (model name, normalize
+# flag, kind, text hash); SQLite's WAL mode makes the file safe to share between the API workers and the ingest
+# script. Query vectors only go into a bounded in-process LRU: every visitor question is different text, so
+# persisting them would grow the file forever (the problem the session store had).
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS document_embeddings (
+    key    TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+)
+"""
+
+# Older versions kept documents and every query in one table under keys without a kind; dropping it costs
+# one re-embed of the documents at the next full ingest
+_LEGACY_TABLE = "embeddings"
+
+DOCUMENT = "document"
+QUERY = "query"
+
+# SQLite limits the number of bound parameters per statement
+_MAX_KEYS_PER_QUERY = 500
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        normalize: bool,
+        path: str,
+        query_lru_size: int = 1024
+    ):
+        self.underlying = underlying
+        self.namespace = f"{model_name}|normalize={normalize}"
+        self.path = path
+        self.query_lru_size = query_lru_size
+
+        self.query_lru_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._query_lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        conn.execute(f"DROP TABLE IF EXISTS {_LEGACY_TABLE}")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread: embeddings are computed on the executor pool as well as the main thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _key(self, text: str, kind: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{self.namespace}|{kind}|{text_hash}".encode("utf-8")).hexdigest()
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        conn = self._connection()
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), _MAX_KEYS_PER_QUERY):
+            batch = unique_keys[i:i + _MAX_KEYS_PER_QUERY]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, vector FROM document_embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _save(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR IGNORE INTO document_embeddings (key, vector) VALUES (?, ?)",
+            [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+        )
+        conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text, DOCUMENT) for text in texts]
+        found = self._load(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        with self._lock:
+            self.disk_hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._save(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def _lru_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._query_lru.get(key)
+            if vector is not None:
+                self._query_lru.move_to_end(key)
+                self.query_lru_hits += 1
+            return vector
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self.misses += 1
+            self._query_lru[key] = vector
+            while len(self._query_lru) > self.query_lru_size:
+                self._query_lru.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text, QUERY)
+        vector = self._lru_get(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self._remember(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # A miss waits for the model (e.g. in a micro-batch) without holding a thread of the bounded pool
+        key = self._key(text, QUERY)
+        vector = self._lru_get(key)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self._remember(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.query_lru_hits + self.disk_hits + self.misses
+        return {
+            "query_lru_hits": self.query_lru_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.query_lru_hits + self.disk_hits) / total if total else 0.0,
+            "query_lru_entries": len(self._query_lru),
+        }
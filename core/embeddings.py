@@ -1,21 +1,72 @@
 # The purpose of this file is to create a function that returns the embedding model that we'll be using for this application
 # We import in settings from app.settings that contains embedding information, and we use HuggingFacEmbeddings to create an embedding model
+# (or, with EMBEDDING_BACKEND="onnx", an ONNX Runtime export of the same model, which is lighter on CPU)
 
-from langchain_huggingface import HuggingFaceEmbeddings
+from functools import lru_cache
+from typing import Optional
 from langchain_core.embeddings import Embeddings
+from core.embedding_cache import CachedEmbeddings
+from core.metrics import TimedEmbeddings
+from core.query_batcher import BatchingEmbeddings
 from app.settings import Settings
 
 settings = Settings()
 
-def get_embedding_model() -> Embeddings:
+def get_base_embedding_model(backend: Optional[str] = None) -> Embeddings:
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+
+    if backend == "onnx":
+        # Imported here so the PyTorch stack is never loaded when it isn't used
+        from core.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            settings.EMBEDDING_ONNX_DIR,
+            quantized=settings.EMBEDDING_ONNX_QUANTIZED,
+            normalize=settings.EMBEDDING_NORMALIZE,
+            batch_size=settings.EMBEDDING_BATCH_SIZE
+        )
+
+    from langchain_huggingface import HuggingFaceEmbeddings
 
     model_kwargs = {"device": settings.EMBEDDING_DEVICE}
 
     encode_kwargs = {"normalize_embeddings": settings.EMBEDDING_NORMALIZE,
                      "batch_size": settings.EMBEDDING_BATCH_SIZE}
 
-    embedding_model = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs)
+    return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs)
 
-    return embedding_model
 
-embedding_model: Embeddings = get_embedding_model()
\ No newline at end of file
+def _cache_model_name() -> str:
+    # Vectors from different backends are close but not identical, so they must not share cache entries
+    if settings.EMBEDDING_BACKEND.lower() == "onnx":
+        variant = "onnx-int8" if settings.EMBEDDING_ONNX_QUANTIZED else "onnx"
+        return f"{settings.EMBEDDING_MODEL_NAME}:{variant}"
+    return settings.EMBEDDING_MODEL_NAME
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model() -> Embeddings:
+
+    embedding_model = get_base_embedding_model()
+
+    if settings.EMBEDDING_MICROBATCH_ENABLED:
+        # Concurrent requests' query embeddings share one forward pass (cache misses only)
+        embedding_model = BatchingEmbeddings(
+            embedding_model,
+            window_ms=settings.EMBEDDING_MICROBATCH_WINDOW_MS,
+            max_batch_size=settings.EMBEDDING_MICROBATCH_MAX_SIZE
+        )
+
+    # Query embedding latency for /metrics (cache misses only)
+    embedding_model = TimedEmbeddings(embedding_model)
+
+    if settings.EMBEDDING_CACHE_ENABLED:
+        # Shared on-disk cache for documents (ingest never re-embeds known text), bounded in-memory LRU for queries
+        embedding_model = CachedEmbeddings(
+            embedding_model,
+            model_name=_cache_model_name(),
+            normalize=settings.EMBEDDING_NORMALIZE,
+            path=settings.EMBEDDING_CACHE_PATH,
+            query_lru_size=settings.EMBEDDING_QUERY_LRU_SIZE
+        )
+
+    return embedding_model
@@ -0,0 +1,57 @@
+# The purpose of this file is to give the async request path a bounded thread pool for blocking work.
+# Chroma queries and sentence-transformers forward passes are synchronous, so on the async path we
+# hand them to this pool instead of running them on (and blocking) the uvicorn event loop.
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, TypeVar
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from app.settings import Settings
+
+settings = Settings()
+
+T = TypeVar("T")
+
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_IO_MAX_WORKERS,
+    thread_name_prefix="rag-blocking"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function on the bounded executor and await its result.
+    The caller's contextvars (LangChain callbacks/tracing) are carried over to the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(blocking_executor, call)
+
+
+class OffloadedRetriever(BaseRetriever):
+    """
+    Wraps a synchronous retriever (e.g. Chroma's VectorStoreRetriever) so that
+    the async path runs it on the bounded executor instead of the event loop.
+    """
+    retriever: BaseRetriever
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await run_blocking(
+            self._get_relevant_documents, query, run_manager=run_manager.get_sync()
+        )
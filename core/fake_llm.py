@@ -0,0 +1,91 @@
+# The purpose of this file is to provide a deterministic stand-in for the Groq model (LLM_PROVIDER="fake").
+# It lets us load-test the whole service (scripts/load_test.py) without spending Groq quota: the answer is
+# derived from a hash of the prompt, and timing follows a simple model of a hosted LLM,
+# a fixed time-to-first-token followed by tokens at a fixed rate. Token usage is reported like a real
+# provider (usage_metadata), so /metrics token counters work too.
+
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from core.tokens import estimate_message_tokens
+
+_WORDS = (
+    "Shree", "built", "a", "retrieval", "pipeline", "with", "LangChain", "and", "Chroma", "for",
+    "the", "portfolio", "project", "using", "Python", "FastAPI", "models", "data", "search", "results",
+)
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Same prompt -> same answer. Each "token" is one word, streamed at tokens_per_second
+    after first_token_latency seconds.
+    """
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 250.0
+    answer_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _answer_words(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        seed = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return [_WORDS[seed[i % len(seed)] % len(_WORDS)] for i in range(self.answer_tokens)]
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _usage(self, messages: List[BaseMessage], words: List[str]) -> dict:
+        input_tokens = estimate_message_tokens(messages)
+        return {"input_tokens": input_tokens, "output_tokens": len(words),
+                "total_tokens": input_tokens + len(words)}
+
+    def _result(self, messages: List[BaseMessage], words: List[str]) -> ChatResult:
+        message = AIMessage(content=" ".join(words), usage_metadata=self._usage(messages, words))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, messages: List[BaseMessage], words: List[str]) -> Iterator[ChatGenerationChunk]:
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=word if i == 0 else f" {word}",
+                # Like Groq, usage arrives with the final chunk
+                usage_metadata=self._usage(messages, words) if last else None
+            ))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        words = self._answer_words(messages)
+        time.sleep(self.first_token_latency + self._token_delay() * len(words))
+        return self._result(messages, words)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        words = self._answer_words(messages)
+        await asyncio.sleep(self.first_token_latency + self._token_delay() * len(words))
+        return self._result(messages, words)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for chunk in self._chunks(messages, self._answer_words(messages)):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            time.sleep(self._token_delay())
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for chunk in self._chunks(messages, self._answer_words(messages)):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self._token_delay())
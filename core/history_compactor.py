@@ -0,0 +1,191 @@
+# The purpose of this file is to keep long conversations from inflating every prompt.
+# Without it, each follow-up re-sends the whole session history twice (rephrase + answer prompts), so prompt
+# tokens, Groq cost and latency grow with the turn number until the session caps start dropping turns.
+#
+# 1. CompactedChatHistory is what RunnableWithMessageHistory reads: the session's rolling summary (one system
+#    message) followed by the recent turns verbatim, trimmed from the oldest so it fits HISTORY_TOKEN_BUDGET.
+# 2. HistoryCompactor.refresh runs after the response has been sent (a FastAPI background task, app/api.py).
+#    Once HISTORY_SUMMARIZE_EVERY_TURNS turns have piled up beyond the last HISTORY_KEEP_TURNS, it folds them
+#    into the summary with one LLM call and drops them from the store, so no request ever waits on summarizing.
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from core.executor import run_blocking
+from core.llm import getLLM
+from core.metrics import metrics_callback
+from core.prompts import HISTORY_SUMMARY_PROMPT
+from core.session_store import SessionStore, get_session_store, trim_messages_to_caps
+from core.tokens import CHARS_PER_TOKEN, estimate_tokens
+from app.settings import Settings
+
+settings = Settings()
+
+# Read by the metrics callback to number turns that are no longer in the prompt
+OMITTED_TURNS_KEY = "omitted_turns"
+
+# Room for the "(N more turns were left out)" note added to the summary message
+_NOTE_TOKENS = 16
+
+
+def count_turns(messages: Sequence[BaseMessage]) -> int:
+    return sum(isinstance(message, HumanMessage) for message in messages)
+
+
+def compose_history(
+    summary: str, summarized_turns: int, messages: List[BaseMessage], token_budget: int
+) -> List[BaseMessage]:
+    """
+    Summary message + the most recent turns that fit in token_budget.
+    The summary gets at most half of the budget; the turns get whatever it leaves.
+    """
+    if summary and estimate_tokens(summary) > token_budget // 2:
+        summary = summary[:(token_budget // 2) * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + " ..."
+    reserved = estimate_tokens(summary) + _NOTE_TOKENS
+    kept = trim_messages_to_caps(messages, len(messages), max(0, token_budget - reserved))
+
+    dropped_turns = count_turns(messages[:len(messages) - len(kept)])
+    omitted_turns = summarized_turns + dropped_turns
+    if not omitted_turns:
+        return kept
+
+    if summary:
+        content = f"Summary of the earlier conversation:\n{summary}"
+        if dropped_turns:
+            content += f"\n({dropped_turns} more recent turns were left out to save space.)"
+    else:
+        content = f"({omitted_turns} earlier turns of this conversation are not shown.)"
+    note = SystemMessage(content=content, additional_kwargs={OMITTED_TURNS_KEY: omitted_turns})
+    return [note] + kept
+
+
+class CompactedChatHistory(BaseChatMessageHistory):
+    """
+    The prompt's view of a session: rolling summary + recent turns under the token budget.
+    Writes go straight to the underlying store.
+    """
+
+    def __init__(self, store: SessionStore, session_id: str, token_budget: int):
+        self.store = store
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.history = store.get_history(session_id)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        summary, summarized_turns = self.store.get_summary(self.session_id)
+        return compose_history(summary, summarized_turns, self.history.messages, self.token_budget)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        self.history.clear()
+
+
+def _format_turns(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        speaker = "Visitor" if isinstance(message, HumanMessage) else "Assistant"
+        lines.append(f"{speaker}: {message.content}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """
+    Folds older turns of a session into its rolling summary, off the request path.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        llm: BaseChatModel,
+        keep_turns: int = 3,
+        summarize_every_turns: int = 2,
+        summary_max_words: int = 150
+    ):
+        self.store = store
+        self.keep_turns = keep_turns
+        self.summarize_every_turns = max(1, summarize_every_turns)
+        self.summary_max_words = summary_max_words
+        self.summarize_chain = (HISTORY_SUMMARY_PROMPT | llm | StrOutputParser()).with_config(
+            run_name="summarize_history", tags=["stage:summarize"]
+        )
+        # One refresh per session at a time; a second request finishing meanwhile has nothing new to fold
+        self._in_flight: Set[str] = set()
+        self.refreshes = 0
+        self.folded_turns = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    def fold_point(self, messages: Sequence[BaseMessage]) -> int:
+        """
+        Number of leading messages to fold into the summary (0 while the backlog is below the threshold).
+        """
+        turn_starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+        if len(turn_starts) < self.keep_turns + self.summarize_every_turns:
+            return 0
+        return turn_starts[-self.keep_turns] if self.keep_turns > 0 else len(messages)
+
+    async def refresh(self, session_id: str) -> None:
+        if session_id in self._in_flight:
+            return
+        self._in_flight.add(session_id)
+        try:
+            history = await run_blocking(self.store.get_history, session_id)
+            messages = await run_blocking(lambda: history.messages)
+            cut = self.fold_point(messages)
+            if not cut:
+                return
+
+            folded = messages[:cut]
+            summary, summarized_turns = await run_blocking(self.store.get_summary, session_id)
+            new_summary = await self.summarize_chain.ainvoke(
+                {
+                    "summary": summary or "(none yet)",
+                    "conversation": _format_turns(folded),
+                    "max_words": self.summary_max_words,
+                },
+                config={"callbacks": [metrics_callback]}
+            )
+            turns = count_turns(folded)
+            # Skipped if the history changed under us (trimmed by the caps, cleared); the next turn retries
+            if await run_blocking(
+                self.store.fold_into_summary, session_id, folded, new_summary.strip(), summarized_turns + turns
+            ):
+                self.refreshes += 1
+                self.folded_turns += turns
+            else:
+                self.conflicts += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"Error while summarizing history for session {session_id}: {e}")
+        finally:
+            self._in_flight.discard(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "refreshes": self.refreshes,
+            "folded_turns": self.folded_turns,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_history_compactor() -> Optional[HistoryCompactor]:
+    if not settings.HISTORY_COMPACTION_ENABLED:
+        return None
+    return HistoryCompactor(
+        get_session_store(),
+        getLLM(),
+        keep_turns=settings.HISTORY_KEEP_TURNS,
+        summarize_every_turns=settings.HISTORY_SUMMARIZE_EVERY_TURNS,
+        summary_max_words=settings.HISTORY_SUMMARY_MAX_WORDS
+    )
@@ -0,0 +1,65 @@
+# The purpose of this file is to fuse several retrievers (vector + BM25) with reciprocal-rank fusion (RRF).
+# RRF only looks at ranks, not raw scores, so cosine distances and BM25 scores never need to be calibrated
+# against each other: score(doc) = sum over retrievers of 1 / (rrf_k + rank).
+
+import asyncio
+from typing import Dict, List
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def doc_key(doc: Document) -> str:
+    """
+    Stable identity for a retrieved chunk: its Chroma ID, or its source + text when it has none.
+    """
+    return doc.id or f"{doc.metadata.get('source_key', '')}|{doc.page_content}"
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+
+    fused = sorted(scores, key=scores.get, reverse=True)[:k]
+    # Copies: the input lists may share Document objects with other callers (e.g. prefetched candidates)
+    return [
+        Document(id=docs[key].id, page_content=docs[key].page_content,
+                 metadata=dict(docs[key].metadata, rrf_score=scores[key]))
+        for key in fused
+    ]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs every retriever on the same query (concurrently on the async path) and fuses them with RRF.
+    """
+    retrievers: List[BaseRetriever]
+    k: int = 12
+    rrf_k: int = 60
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        ranked_lists = [
+            retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            for retriever in self.retrievers
+        ]
+        return reciprocal_rank_fusion(ranked_lists, self.k, self.rrf_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        ranked_lists = await asyncio.gather(*(
+            retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+            for retriever in self.retrievers
+        ))
+        return reciprocal_rank_fusion(list(ranked_lists), self.k, self.rrf_k)
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -5,15 +6,32 @@ from pydantic import Field, SecretStr
 from langchain_core.language_models.chat_models import BaseChatModel
 from app.settings import Settings
 
-def getLLM() -> BaseChatModel:
+def _load_settings() -> Settings:
     try:
-        settings = Settings()
+        return Settings()
     except Exception as e:
         print(f"There was an error with setting up your .env: {e}")
         raise
 
+
+@lru_cache(maxsize=None)
+def getLLM() -> BaseChatModel:
+    settings = _load_settings()
+    return _build_llm(settings, settings.LLM_MODEL)
+
+
+@lru_cache(maxsize=None)
+def getRephraseLLM() -> BaseChatModel:
+    # Turning a follow-up into a search query doesn't need the answering model; an empty setting shares it
+    settings = _load_settings()
+    if not settings.REPHRASE_LLM_MODEL or settings.REPHRASE_LLM_MODEL == settings.LLM_MODEL:
+        return getLLM()
+    print(f"Initializing rephrase model {settings.REPHRASE_LLM_MODEL}")
+    return _build_llm(settings, settings.REPHRASE_LLM_MODEL)
+
+
+def _build_llm(settings: Settings, model_name: str) -> BaseChatModel:
     provider = settings.LLM_PROVIDER.lower()
-    model_name = settings.LLM_MODEL
     temperature = settings.LLM_TEMPERATURE
 
     llm = None
@@ -22,7 +40,13 @@ def getLLM() -> BaseChatModel:
     if provider == "groq":
         api_key = settings.GROQ_API_KEY.get_secret_value()
         llm = ChatGroq(api_key=api_key, model=model_name, temperature=temperature)
+    elif provider == "fake":
+        # Offline stand-in for load tests (scripts/load_test.py), no Groq quota used
+        from core.fake_llm import FakeStreamingChatModel
+        llm = FakeStreamingChatModel(
+            first_token_latency=settings.FAKE_LLM_FIRST_TOKEN_MS / 1000,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            answer_tokens=settings.FAKE_LLM_ANSWER_TOKENS
+        )
     
     return llm
-
-llm : BaseChatModel = getLLM()
@@ -8,10 +8,15 @@
 
 from langchain_community.document_loaders import PyPDFLoader, GitLoader
 from langchain_core.documents import Document
+import base64
+import json
 import os
 import requests
 import shutil
-from typing import List
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from app.settings import Settings
 from dotenv import load_dotenv
 
@@ -30,7 +35,10 @@ def load_all_documents() -> List[Document]:
         return
 
     resume_doc = load_resume(resume_file_path)
-    readme_docs = load_github_readmes(settings.GITHUB_USERNAME, GIT_TEMP_CLONE_DIR)
+    if settings.GITHUB_LOADER_MODE.lower() == "git":
+        readme_docs = load_github_readmes(settings.GITHUB_USERNAME, GIT_TEMP_CLONE_DIR)
+    else:
+        readme_docs = fetch_github_readmes(settings.GITHUB_USERNAME)
 
     all_docs = readme_docs + resume_doc
     print(f"Total documents loaded: {len(all_docs)}")
@@ -56,13 +64,35 @@ def load_resume(resumePath: str) -> List[Document]:
         return
 
 
-def _get_public_repo_details(username: str) -> List[str]:
-    api_url = f"https://api.github.com/users/{username}/repos"
+def _github_headers() -> Dict[str, str]:
+    headers = {"Accept": "application/vnd.github+json"}
+    if settings.GITHUB_TOKEN:
+        headers["Authorization"] = f"Bearer {settings.GITHUB_TOKEN.get_secret_value()}"
+    return headers
+
+
+def _list_public_repos(username: str, http_client: Any = requests) -> List[Dict[str, Any]]:
+    """
+    Every public repo owned by the user, following the API's Link pagination past 100 repos.
+    """
+    url = f"{settings.GITHUB_API_URL}/users/{username}/repos"
+    params = {"type": "owner", "per_page": 100}
+
+    repos = []
+    while url:
+        response = http_client.get(url, params=params, headers=_github_headers(), timeout=30)
+        response.raise_for_status()
+        repos.extend(response.json())
 
-    response = requests.get(api_url, params={"type": "owner", "per_page": 100 })
-    response.raise_for_status()
+        # The 'next' link already carries the query string
+        url = response.links.get("next", {}).get("url")
+        params = None
 
-    repos = response.json()
+    return repos
+
+
+def _get_public_repo_details(username: str) -> List[str]:
+    repos = _list_public_repos(username)
 
     non_forked_urls = [
         (repo["clone_url"], repo["default_branch"]) for repo in repos 
@@ -85,6 +115,32 @@ def _cleanup_temp_dir(dir) -> bool:
         return False
     
 
+def _clone_readmes(url: str, branch: str, clone_dir: str) -> List[Document]:
+    repo_name = url.split('/')[-1]
+    local_repo_path = os.path.join(clone_dir, repo_name)
+
+    print(f"Attempting to load README from: {url} (branch: {branch})")
+    # This lambda function is the filter
+    readme_loader = GitLoader(
+        repo_path=local_repo_path,
+        clone_url=url,
+        file_filter=lambda file_path: file_path.lower().endswith("readme.md"),
+        branch = branch
+    )
+
+    repo_docs = readme_loader.load()
+
+    if repo_docs == []:
+        print(f"No README found for {url} in branch {branch}")
+
+    for doc in repo_docs:
+        doc.metadata["source_type"] = "github"
+        doc.metadata["repo_name"] = repo_name
+        doc.metadata["source_url"] = url
+
+    return repo_docs
+
+
 def load_github_readmes(username: str, clone_dir: str) -> List[Document]:
     repo_details = _get_public_repo_details(username)
 
@@ -95,34 +151,210 @@ def load_github_readmes(username: str, clone_dir: str) -> List[Document]:
         return []
     
     for (url, branch) in repo_details:
-        repo_name = url.split('/')[-1]
-        local_repo_path = os.path.join(clone_dir, repo_name)
-
         try:
-            print(f"Attempting to load README from: {url} (branch: {branch})")
-            # This lambda function is the filter
-            readme_loader = GitLoader(
-                repo_path=local_repo_path,
-                clone_url=url,
-                file_filter=lambda file_path: file_path.lower().endswith("readme.md"),
-                branch = branch
-            )
+            readme_docs.extend(_clone_readmes(url, branch, clone_dir))
+        except Exception as e:
+            print(f"Could not load repo: {url.split('/')[-1]}: {e}")
+    
+    _cleanup_temp_dir(clone_dir)
+
+    print(f"Loaded {len(readme_docs)} README.md files from GitHub.")
+    return readme_docs
+
+
+def _load_readme_etag_cache(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error: could not read README cache {path}, starting fresh: {e}")
+        return {}
+
+
+def _save_readme_etag_cache(path: str, cache: Dict[str, Any]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+class _TruncatedTree(Exception):
+    """
+    The trees API returned only part of a large repo's files.
+    """
+
 
-            repo_docs = readme_loader.load()
+def _is_readme(path: str) -> bool:
+    # Same filter as the GitLoader path in load_github_readmes
+    return path.lower().endswith("readme.md")
 
-            if repo_docs == []:
-                print(f"No README found for {url} in branch {branch}")
 
-            for doc in repo_docs:
-                doc.metadata["source_type"] = "github"
-                doc.metadata["repo_name"] = repo_name
-                doc.metadata["source_url"] = url
+def fetch_github_readmes(
+    username: str,
+    http_client: Any = None,
+    max_workers: Optional[int] = None,
+    cache_path: Optional[str] = None
+) -> List[Document]:
+    """
+    Load README files through the GitHub API instead of cloning every repo.
 
-            readme_docs.extend(repo_docs)
+    Produces the same documents as load_github_readmes: every `*readme.md` in the default branch
+    (found through the git trees API), with the same metadata, including `repo_name` with its `.git`
+    suffix, so switching GITHUB_LOADER_MODE keeps chunk IDs and source citations unchanged.
+
+    Repos are fetched concurrently (bounded by GITHUB_MAX_CONCURRENCY), each worker thread with its own
+    requests.Session. A small JSON cache keeps each repo's tree ETag and the READMEs by blob SHA: an
+    unchanged tree comes back as 304 Not Modified, and a changed tree only downloads the README blobs
+    whose SHA is new. A repo whose tree is too large for one API response (`truncated`) is cloned with
+    the git loader instead, so no README is silently missed.
+
+    `http_client` only needs a requests-style `get(url, params=, headers=, timeout=)` and must be safe to
+    share between threads, so a local stand-in server can be used in place of api.github.com.
+    """
+    local = threading.local()
+    sessions: List[requests.Session] = []
+
+    def _client() -> Any:
+        if http_client is not None:
+            return http_client
+        if getattr(local, "session", None) is None:
+            # requests.Session isn't documented as thread-safe, so every worker gets its own
+            local.session = requests.Session()
+            with cache_lock:
+                sessions.append(local.session)
+        return local.session
+
+    max_workers = max_workers or settings.GITHUB_MAX_CONCURRENCY
+    cache_path = cache_path or settings.GITHUB_README_CACHE_PATH
+
+    repos = [
+        repo for repo in _list_public_repos(username, http_client or requests)
+        if not repo["fork"] and repo["clone_url"]
+    ]
+    if not repos:
+        print(f"No Repositories found for {username}")
+        return []
+
+    etag_cache = _load_readme_etag_cache(cache_path)
+    cache_lock = threading.Lock()
+    counts = {"downloaded": 0, "not_modified": 0, "cloned": 0, "missing": 0, "failed": 0}
+
+    def _count(outcome: str, n: int = 1) -> None:
+        with cache_lock:
+            counts[outcome] += n
+
+    def _readme_files(repo: Dict[str, Any], cached: Dict[str, Any]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        {path: {"sha", "content"}} for every README in the repo's default branch, None when it has none.
+        """
+        base_url = f"{settings.GITHUB_API_URL}/repos/{repo['full_name']}/git"
+        headers = _github_headers()
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+
+        response = _client().get(
+            f"{base_url}/trees/{repo['default_branch']}", params={"recursive": 1}, headers=headers, timeout=30
+        )
+        if response.status_code == 304 and "files" in cached:
+            _count("not_modified", len(cached["files"]))
+            return cached["files"]
+        # 404 / 409: no such branch, or an empty repo
+        if response.status_code in (404, 409):
+            return None
+        response.raise_for_status()
+
+        tree = response.json()
+        if tree.get("truncated"):
+            raise _TruncatedTree()
+
+        previous = {entry["sha"]: entry["content"] for entry in (cached.get("files") or {}).values()}
+        files = {}
+        for item in tree.get("tree", []):
+            if item["type"] != "blob" or not _is_readme(item["path"]):
+                continue
+            if item["sha"] in previous:
+                _count("not_modified")
+                content = previous[item["sha"]]
+            else:
+                blob = _client().get(f"{base_url}/blobs/{item['sha']}", headers=_github_headers(), timeout=30)
+                blob.raise_for_status()
+                try:
+                    # GitLoader only loads text files
+                    content = base64.b64decode(blob.json()["content"]).decode("utf-8")
+                except UnicodeDecodeError:
+                    continue
+                _count("downloaded")
+            files[item["path"]] = {"sha": item["sha"], "content": content}
+
+        if response.headers.get("ETag"):
+            with cache_lock:
+                etag_cache[repo["full_name"]] = {"etag": response.headers["ETag"], "files": files}
+        return files or None
+
+    def _clone_fallback(url: str, branch: str) -> List[Document]:
+        clone_dir = tempfile.mkdtemp(prefix="readme_clone_")
+        try:
+            docs = _clone_readmes(url, branch, clone_dir)
+        except Exception as e:
+            print(f"Could not load repo: {url.split('/')[-1]}: {e}")
+            _count("failed")
+            return []
+        finally:
+            _cleanup_temp_dir(clone_dir)
+        _count("cloned", len(docs))
+        return docs
+
+    def _fetch(repo: Dict[str, Any]) -> List[Document]:
+        url = repo["clone_url"]
+        repo_name = url.split('/')[-1]
+
+        with cache_lock:
+            cached = etag_cache.get(repo["full_name"]) or {}
+
+        try:
+            files = _readme_files(repo, cached)
+        except _TruncatedTree:
+            print(f"Warning: the file tree of {repo_name} is too large for one API response, cloning it instead")
+            return _clone_fallback(url, repo["default_branch"])
         except Exception as e:
             print(f"Could not load repo: {repo_name}: {e}")
-    
-    _cleanup_temp_dir(clone_dir)
+            _count("failed")
+            return []
 
-    print(f"Loaded {len(readme_docs)} README.md files from GitHub.")
-    return readme_docs
\ No newline at end of file
+        if not files:
+            print(f"No README found for {url} in branch {repo['default_branch']}")
+            _count("missing")
+            return []
+
+        return [
+            Document(
+                page_content=entry["content"],
+                metadata={
+                    "source": path,
+                    "file_path": path,
+                    "file_name": os.path.basename(path),
+                    "file_type": os.path.splitext(path)[1],
+                    "source_type": "github",
+                    "repo_name": repo_name,
+                    "source_url": url,
+                }
+            )
+            for path, entry in files.items()
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_fetch, repos))
+
+    for session in sessions:
+        session.close()
+    _save_readme_etag_cache(cache_path, etag_cache)
+
+    readme_docs = [doc for docs in results for doc in docs]
+    print(f"Loaded {len(readme_docs)} README.md files from GitHub "
+          f"({counts['downloaded']} downloaded, {counts['not_modified']} unchanged, {counts['cloned']} cloned, "
+          f"{counts['missing']} repos without README, {counts['failed']} failed).")
+    return readme_docs
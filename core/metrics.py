@@ -0,0 +1,338 @@
+# The purpose of this file is to collect Prometheus metrics for the RAG chain, served at /metrics (app/api.py).
+# Stage latencies come from a LangChain callback handler, so they work without LangSmith:
+# 1. LLM calls are attributed to a stage through the "stage:..." tags set in core/chain.py (rephrase, generation)
+# 2. retriever runs are attributed by retriever name (vector_search, keyword_search)
+# 3. named chain runs give the whole retrieval step (and the retrieved chunk count) and the whole chain
+# Embeddings don't emit callbacks, so query embedding is timed by the small TimedEmbeddings wrapper instead.
+# Prompt tokens are also recorded per conversation turn, to check that long sessions don't grow the prompt.
+# The off-topic gate records each checked question's topic similarity, to tune its threshold on real traffic.
+# Cache hit rates, query micro-batch sizes and the session store size are read from the components' stats()
+# at scrape time.
+#
+# Metrics live in the default registry, so each uvicorn worker reports its own numbers.
+
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import LLMResult
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from core.executor import run_blocking
+from core.tokens import estimate_message_tokens
+
+STAGE_TAG_PREFIX = "stage:"
+
+# Retriever class name -> stage
+RETRIEVER_STAGES = {
+    "VectorStoreRetriever": "vector_search",
+    "ChromaRetriever": "vector_search",
+    "NumpyRetriever": "vector_search",
+    "BM25Retriever": "keyword_search",
+}
+
+# LLM stages whose prompts carry the chat history
+HISTORY_STAGES = {"rephrase", "generation"}
+
+# Same key as core/history_compactor.OMITTED_TURNS_KEY (not imported: that module imports this one)
+OMITTED_TURNS_KEY = "omitted_turns"
+
+# Chain run name (see core/chain.py) -> stage
+CHAIN_STAGES = {
+    "retrieve_documents": "retrieval",
+    "retrieval_chain": "total",
+}
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of the RAG chain",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors_total",
+    "Stage runs that raised (or were cancelled)",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ["stage", "kind"],
+)
+PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "Prompt tokens per LLM call, by conversation turn (1 = first question)",
+    ["stage", "turn"],
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000),
+)
+TOPIC_SIMILARITY = Histogram(
+    "rag_topic_similarity",
+    "Best topic-centroid similarity of questions checked by the off-topic gate",
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.5, 0.6, 0.8),
+)
+RETRIEVED_CHUNKS = Histogram(
+    "rag_retrieved_chunks",
+    "Number of chunks passed to the answer prompt",
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+
+
+def _stage_from_tags(tags: Optional[List[str]]) -> Optional[str]:
+    # The innermost tag wins; tags are inherited from parent runs
+    for tag in reversed(tags or []):
+        if tag.startswith(STAGE_TAG_PREFIX):
+            return tag[len(STAGE_TAG_PREFIX):]
+    return None
+
+
+def _turn_label(messages: List[BaseMessage]) -> str:
+    # Past turns each left one answer in the prompt; turns folded into the summary are counted by the summary message
+    turn = 1 + sum(isinstance(message, AIMessage) for message in messages)
+    turn += sum(message.additional_kwargs.get(OMITTED_TURNS_KEY, 0) for message in messages)
+    return str(turn) if turn <= 10 else "11+"
+
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    # Chat models put usage on the message; older integrations only fill llm_output
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    # Runs inline (also on the async path): every callback is a dict lookup and an observe()
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, Tuple[str, float]] = {}
+        self._turns: Dict[UUID, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, stage: Optional[str]) -> None:
+        if stage is not None:
+            with self._lock:
+                self._started[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id: UUID, error: bool = False) -> Optional[str]:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return None
+        stage, start = started
+        if error:
+            STAGE_ERRORS.labels(stage).inc()
+        else:
+            STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+        return stage
+
+    # --- LLM calls ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs: Any) -> None:
+        stage = _stage_from_tags(tags)
+        self._start(run_id, stage)
+        if stage in HISTORY_STAGES and messages:
+            with self._lock:
+                # The estimate stands in when the provider reports no usage (e.g. some streaming responses)
+                self._turns[run_id] = (_turn_label(messages[0]), estimate_message_tokens(messages[0]))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs: Any) -> None:
+        self._start(run_id, _stage_from_tags(tags))
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs: Any) -> None:
+        stage = self._end(run_id)
+        with self._lock:
+            turn = self._turns.pop(run_id, None)
+        if stage is not None:
+            prompt_tokens, completion_tokens = _token_usage(response)
+            LLM_TOKENS.labels(stage, "prompt").inc(prompt_tokens)
+            LLM_TOKENS.labels(stage, "completion").inc(completion_tokens)
+            if turn is not None:
+                label, estimated_tokens = turn
+                PROMPT_TOKENS.labels(stage, label).observe(prompt_tokens or estimated_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+        with self._lock:
+            self._turns.pop(run_id, None)
+
+    # --- Retrievers ---
+    def on_retriever_start(self, serialized, query, *, run_id, name=None, **kwargs: Any) -> None:
+        self._start(run_id, RETRIEVER_STAGES.get(name))
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_retriever_error(self, error: BaseException, *, run_id, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+    # --- Named chain steps ---
+    def on_chain_start(self, serialized, inputs, *, run_id, name=None, **kwargs: Any) -> None:
+        self._start(run_id, CHAIN_STAGES.get(name))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs: Any) -> None:
+        stage = self._end(run_id)
+        if stage == "retrieval":
+            docs = outputs.get("output", []) if isinstance(outputs, dict) else outputs
+            RETRIEVED_CHUNKS.observe(len(docs))
+
+    def on_chain_error(self, error: BaseException, *, run_id, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+
+metrics_callback = MetricsCallbackHandler()
+
+
+class TimedEmbeddings(Embeddings):
+    """
+    Observes query embedding time as the "embed" stage. Sits under the
+    embedding cache, so only cache misses (real forward passes) are timed.
+    """
+    def __init__(self, underlying: Embeddings):
+        self.underlying = underlying
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with STAGE_SECONDS.labels("embed").time():
+            return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with STAGE_SECONDS.labels("embed").time():
+            if type(self.underlying).aembed_query is Embeddings.aembed_query:
+                # LangChain's default would use the loop's default executor; keep model work on the bounded pool
+                return await run_blocking(self.underlying.embed_query, text)
+            return await self.underlying.aembed_query(text)
+
+
+def _find_component(component: Any, attribute: str) -> Optional[Any]:
+    # Walk a chain of wrappers (.underlying / .base_retriever) to the first one that has `attribute`
+    while component is not None:
+        if hasattr(component, attribute):
+            return component
+        component = getattr(component, "underlying", None) or getattr(component, "base_retriever", None)
+    return None
+
+
+class ComponentStatsCollector:
+    """
+    Reads cache and session-store stats at scrape time. Components that haven't
+    been built yet (their lru_cache factory was never called) are skipped.
+    """
+    def describe(self) -> List[Any]:
+        # Keeps registration from calling collect() (and importing the chain) at import time
+        return []
+
+    def collect(self) -> Iterator[Any]:
+        # Imported here: core.embeddings imports this module
+        from core.chain import (
+            get_answer_cache, get_off_topic_gate, get_query_rewriter, get_single_flight, get_speculative_retrieval
+        )
+        from core.embeddings import get_embedding_model
+        from core.history_compactor import get_history_compactor
+        from core.retrievers import get_ranked_retriever
+        from core.session_store import get_session_store
+
+        caches: Dict[str, Tuple[int, int]] = {}
+
+        if get_answer_cache.cache_info().currsize and get_answer_cache() is not None:
+            stats = get_answer_cache().stats()
+            caches["semantic_answer"] = (stats["hits"], stats["misses"])
+
+        if get_single_flight.cache_info().currsize and get_single_flight() is not None:
+            stats = get_single_flight().stats()
+            caches["single_flight"] = (stats["coalesced"], stats["leaders"])
+
+        if get_speculative_retrieval.cache_info().currsize and get_speculative_retrieval() is not None:
+            stats = get_speculative_retrieval().stats()
+            caches["speculative_retrieval"] = (stats["reused"], stats["researched"])
+
+        rewriter_stats = None
+        if get_query_rewriter.cache_info().currsize and get_query_rewriter() is not None:
+            rewriter_stats = get_query_rewriter().stats()
+            caches["rephrase_fast_path"] = (rewriter_stats["fast_path"], rewriter_stats["rewritten"])
+
+        if get_embedding_model.cache_info().currsize:
+            cached = _find_component(get_embedding_model(), "query_lru_hits")
+            if cached is not None:
+                stats = cached.stats()
+                caches["embedding"] = (stats["query_lru_hits"] + stats["disk_hits"], stats["misses"])
+
+        batcher_stats = None
+        if get_embedding_model.cache_info().currsize:
+            batcher = _find_component(get_embedding_model(), "max_batch_size")
+            if batcher is not None:
+                batcher_stats = batcher.stats()
+
+        if get_ranked_retriever.cache_info().currsize:
+            reranker = _find_component(get_ranked_retriever(), "ranker")
+            if reranker is not None:
+                stats = reranker.stats()
+                caches["reranker"] = (stats["cache_hits"], stats["cache_misses"])
+
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        hit_ratio = GaugeMetricFamily("rag_cache_hit_ratio", "Cache hit ratio since startup", labels=["cache"])
+        for cache, (cache_hits, cache_misses) in caches.items():
+            hits.add_metric([cache], cache_hits)
+            misses.add_metric([cache], cache_misses)
+            total = cache_hits + cache_misses
+            hit_ratio.add_metric([cache], cache_hits / total if total else 0.0)
+        yield hits
+        yield misses
+        yield hit_ratio
+
+        if batcher_stats is not None:
+            yield CounterMetricFamily("rag_query_embedding_batches", "Forward passes run by the query micro-batcher",
+                                      value=batcher_stats["batches"])
+            yield CounterMetricFamily("rag_query_embedding_queries", "Queries embedded by the query micro-batcher",
+                                      value=batcher_stats["queries"])
+            yield GaugeMetricFamily("rag_query_embedding_mean_batch_size", "Mean queries per micro-batch since startup",
+                                    value=batcher_stats["mean_batch_size"])
+            delay = GaugeMetricFamily("rag_query_embedding_queue_delay_seconds",
+                                      "Time queries waited in the micro-batch queue since startup", labels=["stat"])
+            delay.add_metric(["mean"], batcher_stats["mean_queue_delay_ms"] / 1000)
+            delay.add_metric(["max"], batcher_stats["max_queue_delay_ms"] / 1000)
+            yield delay
+
+        if rewriter_stats is not None:
+            # An estimate (skips x mean measured rephrase time), so it can move both ways
+            yield GaugeMetricFamily("rag_rephrase_seconds_saved", "Estimated rephrase LLM time skipped by the fast path",
+                                    value=rewriter_stats["seconds_saved_estimate"])
+
+        if get_off_topic_gate.cache_info().currsize and get_off_topic_gate() is not None:
+            stats = get_off_topic_gate().stats()
+            requests = CounterMetricFamily("rag_off_topic_gate_requests", "Requests seen by the off-topic gate",
+                                           labels=["result"])
+            for result in ("absorbed", "passed", "skipped"):
+                requests.add_metric([result], stats[result])
+            yield requests
+            yield GaugeMetricFamily("rag_off_topic_absorbed_ratio", "Share of requests answered by the off-topic gate",
+                                    value=stats["absorbed_ratio"])
+
+        if get_session_store.cache_info().currsize:
+            stats = get_session_store().stats()
+            yield GaugeMetricFamily("rag_sessions", "Chat sessions in the session store", value=stats["sessions"])
+            yield GaugeMetricFamily("rag_session_messages", "Messages in the session store", value=stats["messages"])
+            yield GaugeMetricFamily("rag_session_content_bytes", "Message content size in the session store",
+                                    value=stats["content_bytes"])
+
+        if get_history_compactor.cache_info().currsize and get_history_compactor() is not None:
+            stats = get_history_compactor().stats()
+            refreshes = CounterMetricFamily("rag_history_summaries", "History summary refreshes", labels=["result"])
+            for result in ("refreshes", "conflicts", "failures"):
+                refreshes.add_metric([result], stats[result])
+            yield refreshes
+            yield CounterMetricFamily("rag_history_folded_turns", "Turns folded into session summaries",
+                                      value=stats["folded_turns"])
+
+
+REGISTRY.register(ComponentStatsCollector())
@@ -0,0 +1,218 @@
+# The purpose of this file is to provide exact vector search without going through Chroma (VECTOR_BACKEND="numpy").
+# The corpus is only a few hundred chunks, so one matrix-vector product over a contiguous float32 array is
+# exact and faster than Chroma's SQLite + HNSW layers. scripts/ingest.py writes the vectors (.npy, memory-mapped
+# on load) and the chunk texts/metadata (.json) next to the Chroma files, from exactly what is in the collection.
+#
+# Scores follow the same space as the Chroma collection (Settings.HNSW_SPACE), so both backends rank alike.
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from core.executor import run_blocking
+from core.vector_store import get_collection_version
+
+NUMPY_VECTORS_FILE = "numpy_index.npy"
+NUMPY_CHUNKS_FILE = "numpy_index.json"
+
+
+def matches_filter(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Chroma-style metadata filter: {"key": value}, {"key": {"$eq"|"$ne"|"$in"|"$nin"|"$gt"|"$gte"|"$lt"|"$lte": ...}},
+    combined with {"$and": [...]} / {"$or": [...]}. Several keys in one dict must all match.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq":
+                ok = value == operand
+            elif op == "$ne":
+                ok = value != operand
+            elif op == "$in":
+                ok = value in operand
+            elif op == "$nin":
+                ok = value not in operand
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                ok = {"$gt": value > operand, "$gte": value >= operand,
+                      "$lt": value < operand, "$lte": value <= operand}[op]
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if not ok:
+                return False
+    return True
+
+
+class NumpyVectorIndex:
+    def __init__(self, space: str = "cosine"):
+        self.space = space
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.collection_version = ""
+        self._squared_norms: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(
+        cls,
+        ids: List[str],
+        vectors: Any,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        space: str = "cosine",
+        collection_version: str = ""
+    ) -> "NumpyVectorIndex":
+        index = cls(space)
+        index.ids, index.texts, index.metadatas = list(ids), list(texts), list(metadatas)
+        index.collection_version = collection_version
+
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if space == "cosine":
+            # Normalized once here, so a query is a single dot product
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        index.vectors = matrix
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _scores(self, query_vector: np.ndarray) -> np.ndarray:
+        # Higher is better in every space
+        if self.space == "cosine":
+            norm = np.linalg.norm(query_vector)
+            return self.vectors @ (query_vector / norm if norm else query_vector)
+        if self.space == "ip":
+            return self.vectors @ query_vector
+        if self._squared_norms is None:
+            self._squared_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        # -||q - v||^2 without the constant ||q||^2
+        return 2 * (self.vectors @ query_vector) - self._squared_norms
+
+    def search(
+        self, query_vector: Any, k: int, where: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k (row, score) pairs, best first, optionally restricted by a metadata filter.
+        """
+        if not self.ids or k <= 0:
+            return []
+        scores = self._scores(np.asarray(query_vector, dtype=np.float32))
+
+        if where:
+            rows = np.fromiter(
+                (i for i, metadata in enumerate(self.metadatas) if matches_filter(metadata, where)), dtype=np.int64
+            )
+            if not len(rows):
+                return []
+            scores, row_ids = scores[rows], rows
+        else:
+            row_ids = None
+
+        k = min(k, len(scores))
+        # argpartition finds the top k in O(n); only those k get sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows_out = row_ids[top] if row_ids is not None else top
+        return [(int(row), float(scores[i])) for row, i in zip(rows_out, top)]
+
+    def document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+    def save(self, vectors_path: str, chunks_path: str) -> None:
+        data = {
+            "collection_version": self.collection_version,
+            "space": self.space,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+        }
+        tmp_vectors, tmp_chunks = f"{vectors_path}.tmp.npy", f"{chunks_path}.tmp"
+        np.save(tmp_vectors, self.vectors)
+        with open(tmp_chunks, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_chunks, chunks_path)
+
+    @classmethod
+    def load(cls, vectors_path: str, chunks_path: str) -> "NumpyVectorIndex":
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["space"])
+        index.ids, index.texts, index.metadatas = data["ids"], data["texts"], data["metadatas"]
+        index.collection_version = data["collection_version"]
+        # Memory-mapped: the OS pages the vectors in, and uvicorn workers share the same pages
+        index.vectors = np.load(vectors_path, mmap_mode="r")
+        if index.vectors.shape[0] != len(index.ids):
+            raise ValueError(f"{vectors_path} has {index.vectors.shape[0]} vectors for {len(index.ids)} chunks")
+        return index
+
+
+def numpy_index_paths(vector_db_path: str) -> Tuple[str, str]:
+    return os.path.join(vector_db_path, NUMPY_VECTORS_FILE), os.path.join(vector_db_path, NUMPY_CHUNKS_FILE)
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Exact top-k retriever over the persisted NumPy index. Reloads the index when ingest bumps the collection version.
+    """
+    vectors_path: str
+    chunks_path: str
+    embedding_model: Embeddings
+    k: int = 12
+    filter: Optional[Dict[str, Any]] = None
+
+    _index: Optional[NumpyVectorIndex] = PrivateAttr(default=None)
+    _loaded_version: Optional[str] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_index(self) -> NumpyVectorIndex:
+        version = get_collection_version()
+        with self._lock:
+            if self._index is None or self._loaded_version != version:
+                print(f"Loading NumPy vector index from {self.vectors_path}")
+                self._index = NumpyVectorIndex.load(self.vectors_path, self.chunks_path)
+                self._loaded_version = version
+            return self._index
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self._search(self.embedding_model.embed_query(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # The embedding is awaited (it may wait in a micro-batch) without holding an executor thread
+        query_vector = await self.embedding_model.aembed_query(query)
+        return await run_blocking(self._search, query_vector)
+
+    def _search(self, query_vector: List[float]) -> List[Document]:
+        index = self._get_index()
+        return [index.document(row) for row, _ in index.search(query_vector, self.k, self.filter)]
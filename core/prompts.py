@@ -57,4 +57,24 @@ RAG_PROMPT = ChatPromptTemplate.from_messages(
         MessagesPlaceholder(variable_name="chat_history"),
         ("user", "{input}"),
     ]
-)
\ No newline at end of file
+)
+
+HISTORY_SUMMARY_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+        "system",
+        "You maintain a running summary of a conversation between a visitor and an assistant "
+        "that answers questions about Shree Gopalakrishnan. Update the summary with the new turns below. "
+        "Keep the names, projects, technologies and facts that later questions might refer back to, "
+        "and what the visitor is interested in. Drop greetings and filler. "
+        "Write at most {max_words} words of plain prose. Return only the updated summary."
+        ),
+        ("user", "Current summary:\n{summary}\n\nNew turns:\n{conversation}"),
+    ]
+)
+
+# Sent by the off-topic gate (core/topic_gate.py) instead of calling the LLM; same voice as rule 2 above
+OFF_TOPIC_REDIRECT = (
+    "That's a great question, but my one and only job is to talk about Shree! "
+    "I can tell you about his skills, experience and projects. What would you like to know?"
+)
@@ -0,0 +1,125 @@
+# The purpose of this file is to coalesce query embeddings from concurrent requests into one forward pass.
+# Under load every /chat request embeds its own rephrased query on its own executor thread, so
+# sentence-transformers runs many batch-of-1 passes one after another. BatchingEmbeddings queues those
+# embed_query calls, and a single dispatcher thread waits a few ms (or until max_batch_size queries arrive)
+# and embeds them together with embed_documents. Each caller gets its own vector back.
+#
+# On the async path callers use aembed_query, which awaits the queued query without holding a thread of the
+# bounded executor (BLOCKING_IO_MAX_WORKERS); otherwise a batch could never grow past the pool size.
+# A query that finds the dispatcher idle is embedded right away (with whatever else is already queued):
+# the window is only waited while a backlog built up during the previous forward pass.
+
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    def __init__(self, underlying: Embeddings, window_ms: float = 5, max_batch_size: int = 32):
+        self.underlying = underlying
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._dispatcher = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._queries = 0
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Ingestion already sends big batches; nothing to coalesce
+        return self.underlying.embed_documents(texts)
+
+    def _enqueue(self, text: str) -> Future:
+        self._ensure_dispatcher()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._enqueue(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._enqueue(text))
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is not None:
+            return
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_forever, name="query-embed-batcher", daemon=True)
+                self._dispatcher.start()
+
+    def _collect_batch(self) -> List[Tuple[str, Future, float]]:
+        try:
+            batch = [self._queue.get_nowait()]
+            backlog = True
+        except queue.Empty:
+            batch = [self._queue.get()]
+            backlog = False
+
+        if not backlog:
+            # Idle until now: don't make a lone query wait out the window
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            return batch
+
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch_forever(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            self._record(batch, started)
+
+            try:
+                vectors = self.underlying.embed_documents([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def _record(self, batch: List[Tuple[str, Future, float]], started: float) -> None:
+        delays = [started - enqueued for _, _, enqueued in batch]
+        with self._stats_lock:
+            self._batch_sizes[len(batch)] += 1
+            self._queries += len(batch)
+            self._queue_delay_total += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "queries": self._queries,
+                "batches": batches,
+                "mean_batch_size": self._queries / batches if batches else 0.0,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_delay_ms": self._queue_delay_total / self._queries * 1000 if self._queries else 0.0,
+                "max_queue_delay_ms": self._queue_delay_max * 1000,
+            }
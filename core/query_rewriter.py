@@ -0,0 +1,111 @@
+# The purpose of this file is to skip the rephrase LLM call for follow-ups that don't need it.
+# Every follow-up used to cost a Groq round trip through REPHRASE_PROMPT just to produce a search query, even
+# when the visitor's question already stands on its own ("What cloud platforms has Shree used?").
+#
+# A follow-up goes straight to retrieval, unchanged, when it is self-contained:
+# 1. no pronouns, demonstratives or continuation words that point back at the conversation ("it", "that one",
+#    "what about ..."), and not so short that it is probably elliptical ("Why?")
+# 2. its embedding is close enough to one of the corpus topics (core/topic_centroids.py), so it is clearly
+#    about something in the knowledge base on its own
+# Everything else is rephrased as before, by the model the chain was given (REPHRASE_LLM_MODEL).
+# The query embedding is the one retrieval needs anyway, so the check adds no model calls.
+
+import re
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from core.executor import run_blocking
+from core.topic_centroids import TopicCentroids
+
+# Words that only make sense with the earlier turns in view. Third-person pronouns are included even though
+# they usually mean Shree here: "his last job" after a question about a project is still ambiguous.
+REFERENCE_WORDS = re.compile(
+    r"\b(it|its|it's|itself|this|that|these|those|they|them|their|theirs|he|him|his|she|her|hers|"
+    r"there|then|one|ones|same|former|latter|above|else|another|other|others|more|further|again)\b",
+    re.IGNORECASE
+)
+CONTINUATIONS = re.compile(r"^\s*(and|but|so|also|or|what about|how about|why not|then)\b", re.IGNORECASE)
+MIN_WORDS = 4
+
+
+def has_references(query: str) -> bool:
+    """
+    True when the query leans on earlier turns: reference words, a continuation opener, or too few words.
+    """
+    if REFERENCE_WORDS.search(query) or CONTINUATIONS.search(query):
+        return True
+    return len(re.findall(r"\w+", query)) < MIN_WORDS
+
+
+class QueryRewriter:
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        get_centroids: Callable[[], Optional[TopicCentroids]],
+        min_topic_similarity: float = 0.3,
+        input_key: str = "input"
+    ):
+        self.embedding_model = embedding_model
+        self.get_centroids = get_centroids
+        self.min_topic_similarity = min_topic_similarity
+        self.input_key = input_key
+
+        self.fast_path = 0
+        self.rewritten = 0
+        self.rewrite_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def is_self_contained(self, query: str) -> bool:
+        if has_references(query):
+            return False
+        centroids = self.get_centroids()
+        if not centroids:
+            return False
+        _, similarity = centroids.best(self.embedding_model.embed_query(query))
+        return similarity >= self.min_topic_similarity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            decided = self.fast_path + self.rewritten
+            mean_rewrite = self.rewrite_seconds / self.rewritten if self.rewritten else 0.0
+            return {
+                "fast_path": self.fast_path,
+                "rewritten": self.rewritten,
+                "skip_rate": self.fast_path / decided if decided else 0.0,
+                "mean_rewrite_seconds": mean_rewrite,
+                # What the skipped calls would have cost at the measured average
+                "seconds_saved_estimate": self.fast_path * mean_rewrite,
+            }
+
+    def wrap(self, rephrase_chain: Runnable) -> Runnable:
+        """
+        Put the fast path in front of a rephrase chain (follow-up turns only). A self-contained input
+        is returned as the standalone question; anything else runs the chain, streaming as usual.
+        """
+        def _on_rewrite_end(run) -> None:
+            if run.end_time and run.start_time:
+                with self._lock:
+                    self.rewrite_seconds += (run.end_time - run.start_time).total_seconds()
+
+        timed_chain = rephrase_chain.with_listeners(on_end=_on_rewrite_end)
+
+        def _decided(query: str, self_contained: bool) -> Any:
+            with self._lock:
+                if self_contained:
+                    self.fast_path += 1
+                else:
+                    self.rewritten += 1
+            return query if self_contained else timed_chain
+
+        def _route(inputs: Dict[str, Any]) -> Any:
+            query = inputs[self.input_key]
+            return _decided(query, self.is_self_contained(query))
+
+        async def _aroute(inputs: Dict[str, Any]) -> Any:
+            query = inputs[self.input_key]
+            return _decided(query, await run_blocking(self.is_self_contained, query))
+
+        return RunnableLambda(_route, afunc=_aroute, name="query_rewriter")
@@ -0,0 +1,125 @@
+# The purpose of this file is to rerank retrieved chunks with a FlashRank cross-encoder before they reach the LLM.
+# Sending only the best RERANKER_TOP_N chunks (instead of all RETRIEVER_K_VALUE) cuts prompt tokens, which
+# dominate our Groq cost and latency. To keep the stage safe to switch on:
+# 1. all uncached chunks for a query are scored in one batched forward pass
+# 2. (query, chunk id) scores are cached, so repeated questions skip the cross-encoder
+# 3. scoring has a per-request time budget; if it runs over we fall back to the retriever's own order.
+#    A scoring pass that already started can't be interrupted: it finishes in the background and fills the
+#    cache for next time. One still queued behind another request's pass is cancelled, so work doesn't pile up.
+# Scores are stored in metadata as plain Python floats, so they serialize to JSON as-is.
+
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from core.hybrid_retriever import doc_key
+
+# The cross-encoder is CPU bound; one dedicated thread keeps it from competing with itself
+# (and from starving the retrieval executor). Work still queued when its budget runs out is cancelled.
+_rerank_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+
+
+class RerankingRetriever(BaseRetriever):
+    base_retriever: BaseRetriever
+    ranker: Any
+    top_n: int = 3
+    budget_ms: float = 300
+    cache_size: int = 4096
+
+    _cache: "OrderedDict[Tuple[str, str], float]" = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(
+        default_factory=lambda: {"cache_hits": 0, "cache_misses": 0, "budget_fallbacks": 0}
+    )
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def _cached_scores(self, query: str, docs: List[Document]) -> Dict[str, float]:
+        scores = {}
+        with self._lock:
+            for doc in docs:
+                key = (query, doc_key(doc))
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key[1]] = self._cache[key]
+            self._stats["cache_hits"] += len(scores)
+            self._stats["cache_misses"] += len(docs) - len(scores)
+        return scores
+
+    def _score(self, query: str, docs: List[Document]) -> Dict[str, float]:
+        """
+        Score every doc in one batched cross-encoder call and cache the results.
+        """
+        from flashrank import RerankRequest
+
+        passages = [{"id": i, "text": doc.page_content} for i, doc in enumerate(docs)]
+        results = self.ranker.rerank(RerankRequest(query=query, passages=passages))
+
+        scores = {doc_key(docs[result["id"]]): float(result["score"]) for result in results}
+        with self._lock:
+            for chunk_id, score in scores.items():
+                self._cache[(query, chunk_id)] = score
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return scores
+
+    def _submit(self, query: str, docs: List[Document]) -> Tuple[Dict[str, float], Optional[Future]]:
+        scores = self._cached_scores(query, docs)
+        missing = [doc for doc in docs if doc_key(doc) not in scores]
+        future = _rerank_executor.submit(self._score, query, missing) if missing else None
+        return scores, future
+
+    def _rank(self, docs: List[Document], scores: Dict[str, float]) -> List[Document]:
+        ranked = sorted(docs, key=lambda doc: scores[doc_key(doc)], reverse=True)[:self.top_n]
+        for doc in ranked:
+            doc.metadata["relevance_score"] = scores[doc_key(doc)]
+        return ranked
+
+    def _fallback(self, docs: List[Document]) -> List[Document]:
+        with self._lock:
+            self._stats["budget_fallbacks"] += 1
+        print(f"Reranker exceeded its {self.budget_ms:.0f} ms budget, using retriever order")
+        return docs[:self.top_n]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+
+        scores, future = self._submit(query, docs)
+        if future is not None:
+            try:
+                scores.update(future.result(timeout=self.budget_ms / 1000))
+            except FutureTimeoutError:
+                # Only cancels a pass that hasn't started; a running one still fills the cache
+                future.cancel()
+                return self._fallback(docs)
+        return self._rank(docs, scores)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = await self.base_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+
+        scores, future = self._submit(query, docs)
+        if future is not None:
+            try:
+                # shield + explicit cancel: same as the sync path, a running pass is left to fill the cache
+                pending = asyncio.shield(asyncio.wrap_future(future))
+                scores.update(await asyncio.wait_for(pending, self.budget_ms / 1000))
+            except asyncio.TimeoutError:
+                future.cancel()
+                return self._fallback(docs)
+        return self._rank(docs, scores)
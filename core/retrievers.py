@@ -0,0 +1,82 @@
+# The purpose of this file is to assemble the retriever the chain uses, based on Settings.RETRIEVER_MODE:
+# 1. "vector": Chroma similarity search only
+# 2. "hybrid": Chroma + BM25 keyword search, fused with reciprocal-rank fusion
+# Either one can be followed by the FlashRank reranker (Settings.RERANKER_ENABLED),
+# and finally by context compaction: merging overlapping chunks and packing to a token budget.
+# With speculative retrieval, the candidate search can be answered from candidates fetched earlier
+# (see core/speculative_retrieval.py).
+
+import os
+from functools import lru_cache
+
+from langchain_core.retrievers import BaseRetriever
+
+from core.bm25 import BM25Retriever, bm25_index_path
+from core.context_compactor import CompactingRetriever
+from core.executor import OffloadedRetriever
+from core.hybrid_retriever import HybridRetriever
+from core.reranker import RerankingRetriever
+from core.speculative_retrieval import PrefetchedRetriever
+from core.vector_store import get_vector_retriever
+from app.settings import Settings
+
+settings = Settings()
+
+
+@lru_cache(maxsize=None)
+def get_retriever() -> BaseRetriever:
+    retriever = get_ranked_retriever()
+
+    if settings.CONTEXT_COMPACTION_ENABLED:
+        print(f"Initializing context compaction with a {settings.CONTEXT_TOKEN_BUDGET} token budget")
+        retriever = CompactingRetriever(
+            base_retriever=retriever,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            duplicate_threshold=settings.CONTEXT_DUPLICATE_THRESHOLD
+        )
+
+    return retriever
+
+
+@lru_cache(maxsize=None)
+def get_ranked_retriever() -> BaseRetriever:
+    retriever = get_candidate_retriever()
+
+    if settings.SPECULATIVE_RETRIEVAL_ENABLED:
+        retriever = PrefetchedRetriever(base_retriever=retriever)
+
+    if settings.RERANKER_ENABLED:
+        from flashrank import Ranker
+
+        print(f"Initializing FlashRank reranker ({settings.RERANKER_MODEL}) with top_n={settings.RERANKER_TOP_N}")
+        retriever = RerankingRetriever(
+            base_retriever=retriever,
+            ranker=Ranker(model_name=settings.RERANKER_MODEL),
+            top_n=settings.RERANKER_TOP_N,
+            budget_ms=settings.RERANKER_BUDGET_MS,
+            cache_size=settings.RERANKER_CACHE_SIZE
+        )
+
+    return retriever
+
+
+@lru_cache(maxsize=None)
+def get_candidate_retriever() -> BaseRetriever:
+    mode = settings.RETRIEVER_MODE.lower()
+
+    if mode == "hybrid":
+        index_path = bm25_index_path(settings.VECTOR_DB_PATH)
+        if os.path.exists(index_path):
+            print(f"Initializing hybrid retriever (vector + BM25, RRF) with k={settings.RETRIEVER_K_VALUE}")
+            candidates = settings.HYBRID_CANDIDATES_K
+            return HybridRetriever(
+                retrievers=[
+                    get_vector_retriever(candidates),
+                    OffloadedRetriever(retriever=BM25Retriever(index_path=index_path, k=candidates)),
+                ],
+                k=settings.RETRIEVER_K_VALUE,
+                rrf_k=settings.HYBRID_RRF_K
+            )
+        print(f"Error: no BM25 index at {index_path} (run scripts/ingest.py), falling back to vector retrieval")
+
+    return get_vector_retriever(settings.RETRIEVER_K_VALUE)
@@ -0,0 +1,154 @@
+# The purpose of this file is to cache final answers keyed on the embedding of the standalone (rephrased) question.
+# Recruiters ask the same handful of questions over and over; when a new standalone question is close enough
+# (cosine similarity) to one we've already answered, we return the stored answer + source documents and skip
+# retrieval and the 70B generation entirely.
+#
+# Entries are evicted LRU (max entries) and by age (TTL). The whole cache is dropped whenever
+# scripts/ingest.py rebuilds the collection (tracked through the collection version file, which
+# get_collection_version only re-reads when ingest replaces it).
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from core.executor import run_blocking
+from core.vector_store import get_collection_version
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    vector: np.ndarray
+    answer: str
+    context: List[Document]
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        threshold: float = 0.95,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600,
+        query_key: str = "standalone_question"
+    ):
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.query_key = query_key
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_id = 0
+        self._collection_version = get_collection_version()
+        self._lock = threading.Lock()
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_model.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray) -> Optional[CachedAnswer]:
+        with self._lock:
+            self._check_collection_version()
+            self._expire()
+
+            best_id, best_score = None, -1.0
+            for entry_id, entry in self._entries.items():
+                score = float(np.dot(vector, entry.vector))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id]
+
+    def store(self, question: str, vector: np.ndarray, answer: str, context: List[Document]) -> None:
+        with self._lock:
+            self._entries[self._next_id] = CachedAnswer(question, vector, answer, list(context))
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _check_collection_version(self) -> None:
+        version = get_collection_version()
+        if version != self._collection_version:
+            print(f"Collection was re-ingested, dropping {len(self._entries)} cached answers")
+            self._entries.clear()
+            self._collection_version = version
+            self.invalidations += 1
+
+    def _expire(self) -> None:
+        # Entries are kept in LRU order, not creation order, so check all of them
+        now = time.monotonic()
+        expired = [k for k, e in self._entries.items() if now - e.created_at > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+            self.evictions += 1
+
+    def wrap(self, chain: Runnable) -> Runnable:
+        """
+        Put the cache in front of a chain that takes {query_key: ...} and
+        returns {"context": [...], "answer": "..."}. On a hit the chain is skipped;
+        on a miss the chain runs (streaming still works) and its output is stored.
+        """
+        def _on_hit(inputs: Dict[str, Any], hit: CachedAnswer) -> Runnable:
+            return RunnableLambda(
+                lambda _: {**inputs, "context": hit.context, "answer": hit.answer},
+                name="cached_answer"
+            )
+
+        def _on_miss(question: str, vector: np.ndarray) -> Runnable:
+            def _store(run) -> None:
+                outputs = run.outputs or {}
+                answer = outputs.get("answer")
+                if isinstance(answer, str) and answer:
+                    self.store(question, vector, answer, outputs.get("context", []))
+            return chain.with_listeners(on_end=_store)
+
+        def _route(inputs: Dict[str, Any]) -> Runnable:
+            question = inputs[self.query_key]
+            vector = self.embed(question)
+            hit = self.lookup(vector)
+            return _on_hit(inputs, hit) if hit else _on_miss(question, vector)
+
+        async def _aroute(inputs: Dict[str, Any]) -> Runnable:
+            question = inputs[self.query_key]
+            vector = await run_blocking(self.embed, question)
+            hit = self.lookup(vector)
+            return _on_hit(inputs, hit) if hit else _on_miss(question, vector)
+
+        return RunnableLambda(_route, afunc=_aroute, name="semantic_answer_cache")
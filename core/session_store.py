@@ -0,0 +1,390 @@
+# The purpose of this file is to hold chat histories for RunnableWithMessageHistory without growing forever.
+# session_id is client-supplied, so an unbounded dict of histories is a memory leak under real traffic.
+#
+# Two stores are available (Settings.SESSION_STORE_BACKEND):
+# 1. "memory": an in-process LRU of sessions with idle-TTL eviction
+# 2. "sqlite": a SQLite file, so sessions survive restarts and are shared by several uvicorn workers
+# Both cap each session's history by message count and estimated tokens, dropping the oldest turns first.
+# Each session can also hold a rolling summary of older turns (see core/history_compactor.py).
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage, message_to_dict, messages_from_dict
+
+from core.tokens import estimate_message_tokens
+from app.settings import Settings
+
+settings = Settings()
+
+
+def trim_messages_to_caps(messages: List[BaseMessage], max_messages: int, max_tokens: int) -> List[BaseMessage]:
+    """
+    Drop the oldest messages until the history fits both caps.
+    The kept history always starts on a user turn so the LLM never sees a dangling answer.
+    """
+    start = 0
+    while start < len(messages) and (
+        len(messages) - start > max_messages
+        or estimate_message_tokens(messages[start:]) > max_tokens
+    ):
+        start += 1
+    while start < len(messages) and not isinstance(messages[start], HumanMessage):
+        start += 1
+    return messages[start:]
+
+
+def _message_bytes(messages: Sequence[BaseMessage]) -> int:
+    return sum(len(str(message.content).encode("utf-8")) for message in messages)
+
+
+class SessionStore(ABC):
+    """
+    Hands out a BaseChatMessageHistory per session_id (the get_session_history contract).
+    """
+
+    def __init__(self, max_sessions: int, idle_ttl_seconds: float, max_messages: int, max_tokens: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.evictions = 0
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> BaseChatMessageHistory:
+        ...
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        """
+        The session's rolling summary and how many turns it covers ("", 0 if none).
+        """
+        ...
+
+    @abstractmethod
+    def fold_into_summary(
+        self, session_id: str, folded: Sequence[BaseMessage], summary: str, summarized_turns: int
+    ) -> bool:
+        """
+        Atomically drop `folded` from the start of the history and store the new summary.
+        Returns False (and changes nothing) if the history no longer starts with `folded`.
+        """
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+# ---------------------------------------------------------------------------
+# In-memory store
+# ---------------------------------------------------------------------------
+
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    """
+    In-memory chat history that trims itself to the store's per-session caps.
+    """
+
+    def __init__(self, max_messages: int, max_tokens: int):
+        self.messages: List[BaseMessage] = []
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.last_access = time.monotonic()
+        self.summary = ""
+        self.summarized_turns = 0
+        self._lock = threading.Lock()
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            self.messages = trim_messages_to_caps(
+                self.messages + list(messages), self.max_messages, self.max_tokens
+            )
+            self.last_access = time.monotonic()
+
+    def fold(self, folded: Sequence[BaseMessage], summary: str, summarized_turns: int) -> bool:
+        with self._lock:
+            if self.messages[:len(folded)] != list(folded):
+                return False
+            self.messages = self.messages[len(folded):]
+            self.summary = summary
+            self.summarized_turns = summarized_turns
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self.messages = []
+            self.summary = ""
+            self.summarized_turns = 0
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int, idle_ttl_seconds: float, max_messages: int, max_tokens: int):
+        super().__init__(max_sessions, idle_ttl_seconds, max_messages, max_tokens)
+        self._sessions: "OrderedDict[str, BoundedChatMessageHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_history(self, session_id: str) -> BaseChatMessageHistory:
+        with self._lock:
+            self._evict_idle()
+
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = BoundedChatMessageHistory(self.max_messages, self.max_tokens)
+                self._sessions[session_id] = history
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._sessions.move_to_end(session_id)
+
+            history.last_access = time.monotonic()
+            return history
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        with self._lock:
+            history = self._sessions.get(session_id)
+        if history is None:
+            return "", 0
+        return history.summary, history.summarized_turns
+
+    def fold_into_summary(
+        self, session_id: str, folded: Sequence[BaseMessage], summary: str, summarized_turns: int
+    ) -> bool:
+        with self._lock:
+            history = self._sessions.get(session_id)
+        return history is not None and history.fold(folded, summary, summarized_turns)
+
+    def _evict_idle(self) -> None:
+        # Sessions are kept in access order, so idle ones are at the front
+        now = time.monotonic()
+        while self._sessions:
+            session_id, history = next(iter(self._sessions.items()))
+            if now - history.last_access <= self.idle_ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            histories = list(self._sessions.values())
+        return {
+            "backend": "memory",
+            "sessions": len(histories),
+            "messages": sum(len(h.messages) for h in histories),
+            "content_bytes": sum(_message_bytes(h.messages) for h in histories),
+            "evictions": self.evictions,
+        }
+
+
+# ---------------------------------------------------------------------------
+# SQLite store
+# ---------------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id  TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+CREATE TABLE IF NOT EXISTS messages (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id  TEXT NOT NULL,
+    message     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id       TEXT PRIMARY KEY,
+    summary          TEXT NOT NULL,
+    summarized_turns INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history for one session, stored in the shared SQLite file.
+    """
+
+    def __init__(self, store: "SQLiteSessionStore", session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self.store.connect() as conn:
+            rows = conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY id",
+                (self.session_id,)
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self.store.connect() as conn:
+            # Read, trim and rewrite under the write lock (as fold_into_summary does), so a concurrent append
+            # or summary fold from another worker can't be lost or undone in between
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY id", (self.session_id,)
+            ).fetchall()
+            kept = trim_messages_to_caps(
+                messages_from_dict([json.loads(row[0]) for row in rows]) + list(messages),
+                self.store.max_messages,
+                self.store.max_tokens
+            )
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            conn.executemany(
+                "INSERT INTO messages (session_id, message) VALUES (?, ?)",
+                [(self.session_id, json.dumps(message_to_dict(m))) for m in kept]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, last_access) VALUES (?, ?)",
+                (self.session_id, time.time())
+            )
+
+    def clear(self) -> None:
+        with self.store.connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            conn.execute("DELETE FROM summaries WHERE session_id = ?", (self.session_id,))
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str, max_sessions: int, idle_ttl_seconds: float, max_messages: int, max_tokens: int):
+        super().__init__(max_sessions, idle_ttl_seconds, max_messages, max_tokens)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            # WAL lets one worker write while the others keep reading
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def connect(self) -> "_ClosingConnection":
+        # A short-lived connection per operation keeps this safe across threads and processes
+        return _ClosingConnection(self.path)
+
+    def get_history(self, session_id: str) -> BaseChatMessageHistory:
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, last_access) VALUES (?, ?)",
+                (session_id, now)
+            )
+            self._evict(conn, now)
+        return SQLiteChatMessageHistory(self, session_id)
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT summary, summarized_turns FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def fold_into_summary(
+        self, session_id: str, folded: Sequence[BaseMessage], summary: str, summarized_turns: int
+    ) -> bool:
+        with self.connect() as conn:
+            # Take the write lock before reading, so no worker can append in between
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, message FROM messages WHERE session_id = ? ORDER BY id LIMIT ?",
+                (session_id, len(folded))
+            ).fetchall()
+            if [json.loads(row[1]) for row in rows] != [message_to_dict(m) for m in folded]:
+                return False
+            if rows:
+                conn.execute("DELETE FROM messages WHERE session_id = ? AND id <= ?", (session_id, rows[-1][0]))
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (session_id, summary, summarized_turns) VALUES (?, ?, ?)",
+                (session_id, summary, summarized_turns)
+            )
+            return True
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT session_id FROM sessions WHERE last_access < ?",
+            (now - self.idle_ttl_seconds,)
+        ).fetchall()
+        overflow = conn.execute(
+            "SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+            (self.max_sessions,)
+        ).fetchall()
+        doomed = {row[0] for row in expired + overflow}
+        if not doomed:
+            return
+        conn.executemany("DELETE FROM messages WHERE session_id = ?", [(s,) for s in doomed])
+        conn.executemany("DELETE FROM summaries WHERE session_id = ?", [(s,) for s in doomed])
+        conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(s,) for s in doomed])
+        self.evictions += len(doomed)
+
+    def __len__(self) -> int:
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.connect() as conn:
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages, content_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(message)), 0) FROM messages"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "messages": messages,
+            "content_bytes": content_bytes,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "evictions": self.evictions,
+        }
+
+
+class _ClosingConnection:
+    """
+    `with sqlite3.connect(...)` commits but never closes; this does both.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, timeout=30)
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_session_store() -> SessionStore:
+    backend = settings.SESSION_STORE_BACKEND.lower()
+    caps = dict(
+        max_sessions=settings.SESSION_MAX_SESSIONS,
+        idle_ttl_seconds=settings.SESSION_IDLE_TTL_SECONDS,
+        max_messages=settings.SESSION_MAX_MESSAGES,
+        max_tokens=settings.SESSION_MAX_TOKENS
+    )
+
+    if backend == "sqlite":
+        print(f"Initializing SQLite session store at {settings.SESSION_STORE_PATH}")
+        return SQLiteSessionStore(settings.SESSION_STORE_PATH, **caps)
+
+    print(f"Initializing in-memory session store (max {settings.SESSION_MAX_SESSIONS} sessions)")
+    return InMemorySessionStore(**caps)
@@ -0,0 +1,134 @@
+# The purpose of this file is to stop a burst of identical questions from each running the full chain.
+# When the site gets linked somewhere, many visitors send the same starter question at nearly the same
+# moment. The semantic answer cache only helps once the first answer is stored, so until then every one
+# of them would rephrase, retrieve and call Groq. SingleFlight lets the first request (the leader) run the
+# chain and makes identical requests that arrive while it is in flight wait for its result instead.
+#
+# Only history-free requests are coalesced: with history the answer depends on the conversation. The
+# wrapper sits inside RunnableWithMessageHistory, so every caller still gets its own history write.
+# A follower waits at most timeout_seconds for the leader (whose Groq call may hang), then runs the chain itself.
+
+import asyncio
+import re
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import Runnable, RunnableLambda
+
+
+def normalize_query(query: str) -> str:
+    # "What are Shree's projects?" and "what are shree's projects" are the same question
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+
+class SingleFlight:
+    def __init__(self, input_key: str = "input", history_key: str = "chat_history", timeout_seconds: float = 30.0):
+        self.input_key = input_key
+        self.history_key = history_key
+        self.timeout_seconds = timeout_seconds
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "fallbacks": self.fallbacks,
+                "timeouts": self.timeouts,
+            }
+
+    def _key(self, inputs: Dict[str, Any]) -> Optional[str]:
+        if inputs.get(self.history_key):
+            return None
+        query = inputs.get(self.input_key)
+        return normalize_query(query) if isinstance(query, str) else None
+
+    def _join(self, key: str) -> "tuple[Future, bool]":
+        # Returns the flight for this key and whether the caller is its leader
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = Future()
+            self._in_flight[key] = flight
+            self.leaders += 1
+            return flight, True
+
+    def _land(self, key: str, flight: Future, outputs: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+        # None means the leader failed or its client went away; followers then run the chain themselves
+        flight.set_result(outputs)
+
+    def _wait(self, flight: Future) -> Optional[Dict[str, Any]]:
+        try:
+            return flight.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            return self._timed_out()
+
+    async def _await(self, flight: Future) -> Optional[Dict[str, Any]]:
+        try:
+            # shield: a follower whose client disconnects (or times out) must not cancel the shared flight
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(flight)), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            return self._timed_out()
+
+    def _timed_out(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+        return None
+
+    def wrap(self, chain: Runnable) -> Runnable:
+        """
+        Put single-flight coalescing in front of a chain that takes
+        {input_key: ..., history_key: [...]} and returns a dict. The leader runs
+        (and streams) the chain as usual; followers get the leader's output
+        with their own input keys on top.
+        """
+        def _on_leader(key: str, flight: Future) -> Runnable:
+            def _end(run) -> None:
+                outputs = run.outputs or {}
+                self._land(key, flight, outputs if outputs.get("answer") else None)
+
+            def _error(run) -> None:
+                self._land(key, flight, None)
+
+            return chain.with_listeners(on_end=_end, on_error=_error)
+
+        def _on_follower(inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]]) -> Runnable:
+            if outputs is None:
+                with self._lock:
+                    self.fallbacks += 1
+                return chain
+            return RunnableLambda(lambda _: {**outputs, **inputs}, name="coalesced_answer")
+
+        def _route(inputs: Dict[str, Any]) -> Runnable:
+            key = self._key(inputs)
+            if key is None:
+                return chain
+            flight, is_leader = self._join(key)
+            if is_leader:
+                return _on_leader(key, flight)
+            return _on_follower(inputs, self._wait(flight))
+
+        async def _aroute(inputs: Dict[str, Any]) -> Runnable:
+            key = self._key(inputs)
+            if key is None:
+                return chain
+            flight, is_leader = self._join(key)
+            if is_leader:
+                return _on_leader(key, flight)
+            return _on_follower(inputs, await self._await(flight))
+
+        return RunnableLambda(_route, afunc=_aroute, name="single_flight")
@@ -0,0 +1,192 @@
+# The purpose of this file is to overlap retrieval with the rephrase LLM call on follow-up turns.
+# Normally the chain waits a full Groq round trip for the standalone question before searching at all.
+# With SPECULATIVE_RETRIEVAL_ENABLED:
+# 1. the candidate search (vector / hybrid, before reranking) starts on the raw input, in parallel with the rephrase
+# 2. when the standalone question arrives, it is compared with the raw input (cosine of their embeddings):
+#    - close enough: the speculative candidates are used as they are
+#    - otherwise: the candidates are searched again with the standalone question and both lists are fused (RRF)
+# 3. reranking and context compaction then run as usual, against the standalone question
+#
+# The candidates reach the bottom of the retriever pipeline through PrefetchedRetriever, which answers from
+# a context variable set for the duration of one retrieval, so the rest of the pipeline stays unchanged.
+
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import HumanMessage
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from core.executor import run_blocking
+from core.hybrid_retriever import reciprocal_rank_fusion
+
+# (query, candidates) for the retrieval currently running in this context
+_prefetched: ContextVar[Optional[Tuple[str, List[Document]]]] = ContextVar("prefetched_candidates", default=None)
+
+
+class PrefetchedRetriever(BaseRetriever):
+    """
+    Returns the prefetched candidates when they were set for this exact query, else searches base_retriever.
+    """
+    base_retriever: BaseRetriever
+
+    def _prefetched_for(self, query: str) -> Optional[List[Document]]:
+        prefetched = _prefetched.get()
+        if prefetched is not None and prefetched[0] == query:
+            return list(prefetched[1])
+        return None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self._prefetched_for(query)
+        if docs is not None:
+            return docs
+        return self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        docs = self._prefetched_for(query)
+        if docs is not None:
+            return docs
+        return await self.base_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denominator if denominator else 0.0
+
+
+class SpeculativeRetrieval:
+    def __init__(
+        self,
+        candidate_retriever: BaseRetriever,
+        embedding_model: Embeddings,
+        threshold: float = 0.9,
+        k: int = 12,
+        rrf_k: int = 60,
+        include_previous_query: bool = False,
+        input_key: str = "input",
+        history_key: str = "chat_history",
+        query_key: str = "standalone_question",
+        candidates_key: str = "speculative_candidates"
+    ):
+        self.candidate_retriever = candidate_retriever
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.k = k
+        self.rrf_k = rrf_k
+        self.include_previous_query = include_previous_query
+        self.input_key = input_key
+        self.history_key = history_key
+        self.query_key = query_key
+        self.candidates_key = candidates_key
+
+        self.speculations = 0
+        self.reused = 0
+        self.researched = 0
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            decided = self.reused + self.researched
+            return {
+                "speculations": self.speculations,
+                "reused": self.reused,
+                "researched": self.researched,
+                "reuse_ratio": self.reused / decided if decided else 0.0,
+            }
+
+    def _speculative_queries(self, inputs: Dict[str, Any]) -> List[str]:
+        queries = [inputs[self.input_key]]
+        if self.include_previous_query:
+            previous = [m for m in inputs.get(self.history_key) or [] if isinstance(m, HumanMessage)]
+            if previous and isinstance(previous[-1].content, str):
+                queries.append(previous[-1].content)
+        return queries
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def speculate(self) -> Runnable:
+        """
+        Candidate search on the raw input, to run next to the rephrase step. None on first turns,
+        where the input already is the standalone question.
+        """
+        def _speculate(inputs: Dict[str, Any], config: RunnableConfig) -> Optional[Tuple[str, List[Document]]]:
+            if not inputs.get(self.history_key):
+                return None
+            self._count("speculations")
+            queries = self._speculative_queries(inputs)
+            ranked = [self.candidate_retriever.invoke(q, config=config) for q in queries]
+            return queries[0], reciprocal_rank_fusion(ranked, self.k, self.rrf_k) if len(ranked) > 1 else ranked[0]
+
+        async def _aspeculate(inputs: Dict[str, Any], config: RunnableConfig) -> Optional[Tuple[str, List[Document]]]:
+            if not inputs.get(self.history_key):
+                return None
+            self._count("speculations")
+            queries = self._speculative_queries(inputs)
+            ranked = await asyncio.gather(*(self.candidate_retriever.ainvoke(q, config=config) for q in queries))
+            return queries[0], reciprocal_rank_fusion(list(ranked), self.k, self.rrf_k) if len(ranked) > 1 else ranked[0]
+
+        return RunnableLambda(_speculate, afunc=_aspeculate, name="speculative_retrieval")
+
+    def _close_enough(self, question: str, speculative_query: str) -> bool:
+        if question.strip().lower() == speculative_query.strip().lower():
+            return True
+        # Both are query embeddings the pipeline computes anyway, so they come from (or warm) the query cache
+        vectors = [self.embedding_model.embed_query(question), self.embedding_model.embed_query(speculative_query)]
+        return _cosine(*vectors) >= self.threshold
+
+    def _merge(self, speculative: List[Document], fresh: Optional[List[Document]]) -> List[Document]:
+        if fresh is None:
+            self._count("reused")
+            return speculative
+        self._count("researched")
+        return reciprocal_rank_fusion([fresh, speculative], self.k, self.rrf_k)
+
+    def retrieve(self, retriever: BaseRetriever) -> Runnable:
+        """
+        Runs `retriever` on the standalone question, feeding it the speculative candidates when there are any.
+        """
+        def _retrieve(inputs: Dict[str, Any], config: RunnableConfig) -> List[Document]:
+            question, speculation = inputs[self.query_key], inputs.get(self.candidates_key)
+            if speculation is None:
+                return retriever.invoke(question, config=config)
+            speculative_query, speculative = speculation
+            fresh = None
+            if not self._close_enough(question, speculative_query):
+                fresh = self.candidate_retriever.invoke(question, config=config)
+            token = _prefetched.set((question, self._merge(speculative, fresh)))
+            try:
+                return retriever.invoke(question, config=config)
+            finally:
+                _prefetched.reset(token)
+
+        async def _aretrieve(inputs: Dict[str, Any], config: RunnableConfig) -> List[Document]:
+            question, speculation = inputs[self.query_key], inputs.get(self.candidates_key)
+            if speculation is None:
+                return await retriever.ainvoke(question, config=config)
+            speculative_query, speculative = speculation
+            fresh = None
+            if not await run_blocking(self._close_enough, question, speculative_query):
+                fresh = await self.candidate_retriever.ainvoke(question, config=config)
+            token = _prefetched.set((question, self._merge(speculative, fresh)))
+            try:
+                return await retriever.ainvoke(question, config=config)
+            finally:
+                _prefetched.reset(token)
+
+        return RunnableLambda(_retrieve, afunc=_aretrieve)
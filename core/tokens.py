@@ -0,0 +1,20 @@
+# The purpose of this file is to give a cheap, dependency-free token estimate.
+# We don't ship the Llama tokenizer, and budgets (session caps, prompt packing) only need to be
+# in the right ballpark, so we use the usual ~4 characters per token rule of thumb.
+
+from typing import Iterable
+
+from langchain_core.messages import BaseMessage
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(messages: Iterable[BaseMessage]) -> int:
+    return sum(estimate_tokens(message.content if isinstance(message.content, str) else str(message.content))
+               for message in messages)
@@ -0,0 +1,161 @@
+# The purpose of this file is to summarize what the knowledge base is about as a few centroids per source
+# (the resume, each GitHub repo). Comparing a query embedding with a few dozen centroids costs a handful of
+# dot products, so it is cheap enough to run on every request before deciding anything about the query.
+#
+# A source's chunks are clustered (spherical k-means, up to TOPIC_CENTROIDS_PER_SOURCE clusters) so a resume
+# that covers work, education and skills isn't averaged into one blurry vector. scripts/ingest.py writes the
+# centroids next to the Chroma files; if they are missing or stale they are built from the collection instead.
+
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.vector_store import get_collection_version, get_vector_store
+from app.settings import Settings
+
+settings = Settings()
+
+TOPIC_CENTROIDS_FILE = "topic_centroids.npz"
+
+
+def source_label(metadata: Dict[str, Any]) -> str:
+    return metadata.get("repo_name") or metadata.get("source_name") or "other"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def spherical_kmeans(matrix: np.ndarray, k: int, iterations: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (centroids, cluster sizes) of unit-length rows. Deterministic: seeded with the row closest to
+    the mean, then repeatedly with the row farthest from every centroid so far.
+    """
+    k = max(1, min(k, len(matrix)))
+    mean = _normalize(matrix.mean(axis=0))
+    seeds = [int(np.argmax(matrix @ mean))]
+    while len(seeds) < k:
+        seeds.append(int(np.argmin((matrix @ matrix[seeds].T).max(axis=1))))
+    centroids = matrix[seeds].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(matrix @ centroids.T, axis=1)
+        updated = np.vstack([
+            _normalize(matrix[assignment == c].mean(axis=0)) if np.any(assignment == c) else centroids[c]
+            for c in range(k)
+        ])
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    assignment = np.argmax(matrix @ centroids.T, axis=1)
+    return centroids, np.bincount(assignment, minlength=k)
+
+
+class TopicCentroids:
+    def __init__(self, labels: List[str], centroids: np.ndarray, counts: List[int], collection_version: str = ""):
+        # One entry per centroid; a source with several clusters appears several times in labels
+        self.labels = labels
+        self.centroids = centroids
+        self.counts = counts
+        self.collection_version = collection_version
+
+    @classmethod
+    def build(
+        cls,
+        vectors: Any,
+        metadatas: List[Dict[str, Any]],
+        per_source: int = 1,
+        collection_version: str = ""
+    ) -> "TopicCentroids":
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(metadatas), -1))
+        groups: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            groups.setdefault(source_label(metadata or {}), []).append(row)
+
+        labels: List[str] = []
+        centroids: List[np.ndarray] = []
+        counts: List[int] = []
+        for label in sorted(groups):
+            source_centroids, sizes = spherical_kmeans(matrix[groups[label]], per_source)
+            for centroid, size in zip(source_centroids, sizes):
+                if size:
+                    labels.append(label)
+                    centroids.append(centroid)
+                    counts.append(int(size))
+
+        if not labels:
+            return cls([], np.zeros((0, matrix.shape[1]), dtype=np.float32), [], collection_version)
+        return cls(labels, np.vstack(centroids).astype(np.float32), counts, collection_version)
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, labels=np.asarray(self.labels, dtype=str), centroids=self.centroids,
+                 counts=np.asarray(self.counts, dtype=np.int64), collection_version=self.collection_version)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TopicCentroids":
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["centroids"].astype(np.float32),
+                       [int(count) for count in data["counts"]], str(data["collection_version"]))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def similarities(self, vector: Any) -> np.ndarray:
+        """
+        Cosine similarity of the vector with every centroid, in label order.
+        """
+        return self.centroids @ _normalize(np.asarray(vector, dtype=np.float32))
+
+    def best(self, vector: Any) -> Tuple[Optional[str], float]:
+        if not self.labels:
+            return None, 0.0
+        scores = self.similarities(vector)
+        i = int(np.argmax(scores))
+        return self.labels[i], float(scores[i])
+
+
+def topic_centroids_path(vector_db_path: str) -> str:
+    return os.path.join(vector_db_path, TOPIC_CENTROIDS_FILE)
+
+
+class TopicCentroidsLoader:
+    """
+    Loads the centroids written at ingest, again whenever ingest bumps the collection version.
+    Falls back to building them from the collection when the file is missing or from an older version.
+    """
+
+    def __init__(self, path: str, per_source: int = 1):
+        self.path = path
+        self.per_source = per_source
+        self._centroids: Optional[TopicCentroids] = None
+        self._loaded_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[TopicCentroids]:
+        version = get_collection_version()
+        with self._lock:
+            if self._centroids is None or self._loaded_version != version:
+                centroids = TopicCentroids.load(self.path) if os.path.exists(self.path) else None
+                if centroids is None or centroids.collection_version != version:
+                    stored = get_vector_store().get(include=["embeddings", "metadatas"])
+                    if not stored["ids"]:
+                        return None
+                    print(f"No topic centroids for collection version {version!r} at {self.path}, "
+                          f"building them from {len(stored['ids'])} chunks (run scripts/ingest.py to persist)")
+                    centroids = TopicCentroids.build(
+                        stored["embeddings"], stored["metadatas"], self.per_source, version
+                    )
+                self._centroids = centroids
+                self._loaded_version = version
+            return self._centroids
+
+
+@lru_cache(maxsize=None)
+def get_topic_centroids_loader() -> TopicCentroidsLoader:
+    return TopicCentroidsLoader(topic_centroids_path(settings.VECTOR_DB_PATH), settings.TOPIC_CENTROIDS_PER_SOURCE)
@@ -0,0 +1,124 @@
+# The purpose of this file is to answer clearly off-topic questions ("a cake recipe?") without the RAG chain.
+# Rule 2 of RAG_SYSTEM_PROMPT already makes the LLM redirect them, but only after a rephrase, a full retrieval
+# and a 70B generation. The gate compares the question's embedding with the topic centroids written at ingest
+# (core/topic_centroids.py); below OFF_TOPIC_GATE_THRESHOLD for every centroid, it replies with
+# OFF_TOPIC_REDIRECT right away. The reply still goes into the session history like any other answer.
+#
+# Only first turns are gated: a follow-up is judged by the conversation it continues, and even one without
+# reference words ("Which AWS services specifically?") can look off-topic on its own. Questions that can't be
+# judged by their embedding alone are never gated either:
+# - greetings and questions to the assistant itself ("Hi", "Who are you?", "What's your background?")
+# - references and very short questions ("why?", "tell me more about it", "What is his experience with React?"),
+#   where "he" is usually Shree
+# The threshold is tuned with scripts/eval_topic_gate.py, which applies the same rule.
+
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from core.executor import run_blocking
+from core.metrics import TOPIC_SIMILARITY
+from core.prompts import OFF_TOPIC_REDIRECT
+from core.query_rewriter import has_references
+from core.topic_centroids import TopicCentroids
+
+GREETINGS = re.compile(
+    r"^\s*(hi|hello|hey|hiya|howdy|yo|greetings|good (morning|afternoon|evening)|thanks|thank you)\b", re.IGNORECASE
+)
+# "your background", "tell me about yourself", "do you know ...", but not requests like "can you write ..."
+ADDRESSED = re.compile(r"\b(your|yours|yourself)\b|\b(are|do|did|have|were|would) you\b", re.IGNORECASE)
+
+
+def is_gateable(query: str, chat_history: Optional[List[Any]] = None) -> bool:
+    """
+    False for follow-ups, greetings, questions to the assistant and questions with references or too few words.
+    """
+    if chat_history:
+        return False
+    return not (GREETINGS.search(query) or ADDRESSED.search(query) or has_references(query))
+
+
+class OffTopicGate:
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        get_centroids: Callable[[], Optional[TopicCentroids]],
+        threshold: float = 0.2,
+        redirect: str = OFF_TOPIC_REDIRECT,
+        input_key: str = "input",
+        history_key: str = "chat_history"
+    ):
+        self.embedding_model = embedding_model
+        self.get_centroids = get_centroids
+        self.threshold = threshold
+        self.redirect = redirect
+        self.input_key = input_key
+        self.history_key = history_key
+
+        self.absorbed = 0
+        self.passed = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def check(self, query: str) -> Tuple[bool, Optional[float]]:
+        """
+        (off topic?, best topic similarity). Never off topic when there are no centroids to compare with.
+        """
+        centroids = self.get_centroids()
+        if not centroids:
+            return False, None
+        _, similarity = centroids.best(self.embedding_model.embed_query(query))
+        return similarity < self.threshold, similarity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.absorbed + self.passed + self.skipped
+            return {
+                "absorbed": self.absorbed,
+                "passed": self.passed,
+                "skipped": self.skipped,
+                "absorbed_ratio": self.absorbed / total if total else 0.0,
+            }
+
+    def _gated(self, inputs: Dict[str, Any]) -> bool:
+        return is_gateable(inputs[self.input_key], inputs.get(self.history_key))
+
+    def _decided(self, chain: Runnable, inputs: Dict[str, Any], off_topic: bool, similarity: Optional[float]) -> Any:
+        if similarity is not None:
+            TOPIC_SIMILARITY.observe(similarity)
+        with self._lock:
+            if off_topic:
+                self.absorbed += 1
+            else:
+                self.passed += 1
+        if not off_topic:
+            return chain
+        return RunnableLambda(
+            lambda _: {**inputs, "standalone_question": inputs[self.input_key], "context": [], "answer": self.redirect},
+            name="off_topic_redirect"
+        )
+
+    def _skip(self, chain: Runnable) -> Runnable:
+        with self._lock:
+            self.skipped += 1
+        return chain
+
+    def wrap(self, chain: Runnable) -> Runnable:
+        """
+        Put the gate in front of a chain that takes {input_key, history_key} and returns
+        {"context": [...], "answer": "..."}. Off-topic questions get the redirect; the rest run the chain.
+        """
+        def _route(inputs: Dict[str, Any]) -> Runnable:
+            if not self._gated(inputs):
+                return self._skip(chain)
+            return self._decided(chain, inputs, *self.check(inputs[self.input_key]))
+
+        async def _aroute(inputs: Dict[str, Any]) -> Runnable:
+            if not self._gated(inputs):
+                return self._skip(chain)
+            return self._decided(chain, inputs, *(await run_blocking(self.check, inputs[self.input_key])))
+
+        return RunnableLambda(_route, afunc=_aroute, name="off_topic_gate")
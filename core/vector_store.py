@@ -1,14 +1,65 @@
 # The purpose of this file is to initialize and return a vector store using ChromaDB as well as a retriever
 # This file will import in the embeddings function created in embeddings.py to use in the vector store
 
+import os
+import threading
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 import chromadb
 from langchain_chroma import Chroma
-from langchain_core.vectorstores import VectorStoreRetriever
-from core.embeddings import embedding_model
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from core.embeddings import get_embedding_model
+from core.executor import run_blocking
 from app.settings import Settings
 
 settings = Settings()
 
+# Written by scripts/ingest.py every time the collection is rebuilt, so that
+# anything derived from the collection (e.g. cached answers) knows it is stale.
+COLLECTION_VERSION_FILE = "collection_version"
+
+# Settings field -> (collection metadata key, key in the collection's HNSW configuration)
+HNSW_BUILD_PARAMS = {
+    "HNSW_SPACE": ("hnsw:space", "space"),
+    "HNSW_M": ("hnsw:M", "max_neighbors"),
+    "HNSW_CONSTRUCTION_EF": ("hnsw:construction_ef", "ef_construction"),
+}
+
+
+def hnsw_metadata() -> Dict[str, Any]:
+    metadata = {key: getattr(settings, field) for field, (key, _) in HNSW_BUILD_PARAMS.items()}
+    metadata["hnsw:search_ef"] = settings.HNSW_SEARCH_EF
+    return metadata
+
+
+def hnsw_build_mismatches(collection) -> Dict[str, Tuple[Any, Any]]:
+    """
+    Build-time HNSW parameters where the existing collection differs from Settings,
+    as {setting: (current, wanted)}. These only change by rebuilding the collection.
+    """
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    mismatches = {}
+    for field, (_, config_key) in HNSW_BUILD_PARAMS.items():
+        wanted = getattr(settings, field)
+        if hnsw.get(config_key) != wanted:
+            mismatches[field] = (hnsw.get(config_key), wanted)
+    return mismatches
+
+
+def _apply_search_ef(collection) -> None:
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    if hnsw.get("ef_search") != settings.HNSW_SEARCH_EF:
+        print(f"Setting HNSW ef_search {hnsw.get('ef_search')} -> {settings.HNSW_SEARCH_EF}")
+        collection.modify(configuration={"hnsw": {"ef_search": settings.HNSW_SEARCH_EF}})
+
+
+@lru_cache(maxsize=None)
 def get_vector_store() -> Chroma:
     print(f"Initializing Vector Store at {settings.VECTOR_DB_PATH}")
 
@@ -18,17 +69,102 @@ def get_vector_store() -> Chroma:
         print(f"Error initializing chromaDB vector store: {e}")
         raise
 
-    vector_store = Chroma(client=client, collection_name=settings.VECTOR_DB_COLLECTION_NAME, embedding_function=embedding_model)
+    # The HNSW metadata is only used when the collection is created
+    vector_store = Chroma(client=client, collection_name=settings.VECTOR_DB_COLLECTION_NAME,
+                          embedding_function=get_embedding_model(), collection_metadata=hnsw_metadata())
+
+    mismatches = hnsw_build_mismatches(vector_store._collection)
+    if mismatches:
+        print(f"Error: the collection's HNSW index was built with different settings {mismatches}; "
+              f"build a new store with scripts/ingest.py (see HNSW_SPACE in app/settings.py)")
+    _apply_search_ef(vector_store._collection)
+
     print(f"Success initializing vector store: {settings.VECTOR_DB_COLLECTION_NAME}")
     return vector_store
 
-vector_store = get_vector_store()
 
+class ChromaRetriever(BaseRetriever):
+    """
+    Top-k similarity search on the Chroma collection. The async path awaits the query embedding
+    (aembed_query, so it can join a micro-batch without holding an executor thread) and only runs
+    the Chroma lookup itself on the bounded pool.
+    """
+    vector_store: Chroma
+    k: int = 12
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.vector_store.similarity_search(query, k=self.k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        query_vector = await self.vector_store.embeddings.aembed_query(query)
+        return await run_blocking(self.vector_store.similarity_search_by_vector, query_vector, k=self.k)
+
+
+def get_vector_retriever(k: int) -> BaseRetriever:
+    if settings.VECTOR_BACKEND.lower() == "numpy":
+        # Imported here: core.numpy_index imports this module
+        from core.numpy_index import NumpyRetriever, numpy_index_paths
+
+        vectors_path, chunks_path = numpy_index_paths(settings.VECTOR_DB_PATH)
+        if os.path.exists(vectors_path) and os.path.exists(chunks_path):
+            print(f"Initializing exact NumPy vector retriever with k={k}")
+            # Runs its blocking part on the bounded pool itself (see NumpyRetriever._aget_relevant_documents)
+            return NumpyRetriever(
+                vectors_path=vectors_path,
+                chunks_path=chunks_path,
+                embedding_model=get_embedding_model(),
+                k=k
+            )
+        print(f"Error: no NumPy index at {vectors_path} (run scripts/ingest.py), falling back to Chroma")
+
+    print(f"Initializing vector retriever with k={k}")
+
+    # The Chroma query is blocking; ChromaRetriever runs it on the bounded pool on the async path
+    return ChromaRetriever(vector_store=get_vector_store(), k=k)
+
+
+# (path, file identity) -> version, so the hot path only stats the file instead of reading it on every request
+_version_cache: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+_version_lock = threading.Lock()
+
+
+def get_collection_version() -> str:
+    path = os.path.join(settings.VECTOR_DB_PATH, COLLECTION_VERSION_FILE)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ""
+    # bump_collection_version replaces the file, so a bump always changes the inode (and usually the mtime)
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _version_lock:
+        cached = _version_cache.get(path)
+        if cached is not None and cached[0] == identity:
+            return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return ""
+    with _version_lock:
+        _version_cache[path] = (identity, version)
+    return version
 
-def get_retriever() -> VectorStoreRetriever:
-    print(f"Initializing retriever with k={settings.RETRIEVER_K_VALUE}")
 
-    return vector_store.as_retriever(search_kwargs={"k": settings.RETRIEVER_K_VALUE})
+def new_collection_version() -> str:
+    return uuid.uuid4().hex
 
 
-base_retriever = get_retriever()
\ No newline at end of file
+def bump_collection_version(version: Optional[str] = None) -> str:
+    version = version or new_collection_version()
+    path = os.path.join(settings.VECTOR_DB_PATH, COLLECTION_VERSION_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    # Atomic, and a new inode, so readers never see a partial version and always notice the change
+    os.replace(tmp_path, path)
+    print(f"Collection version is now: {version}")
+    return version
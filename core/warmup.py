@@ -0,0 +1,59 @@
+# The purpose of this file is to build every heavy component ahead of the first request and time each one.
+# Nothing in core/ is built at import time anymore; the API calls warm_up() in the background on startup
+# (see the lifespan in app/api.py), and scripts only pay for the components they actually use.
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from core.embeddings import get_embedding_model
+from core.vector_store import get_vector_store
+from core.retrievers import get_retriever
+from core.llm import getLLM, getRephraseLLM
+from core.session_store import get_session_store
+from core.chain import get_final_rag_chain
+from core.topic_centroids import get_topic_centroids_loader
+from app.settings import Settings
+
+settings = Settings()
+
+
+@contextmanager
+def _timed(component: str, timings: Dict[str, float]) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    timings[component] = time.perf_counter() - start
+    print(f"Startup: {component} ready in {timings[component]:.2f}s")
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Build (and exercise) every component once. Returns seconds per component.
+    """
+    timings: Dict[str, float] = {}
+
+    with _timed("embedding_model", timings):
+        embedding_model = get_embedding_model()
+    with _timed("embedding_first_query", timings):
+        # Go around the embedding cache so the model itself runs its first (slow) forward pass
+        getattr(embedding_model, "underlying", embedding_model).embed_query("warm up")
+    with _timed("vector_store", timings):
+        get_vector_store()
+    with _timed("vector_search", timings):
+        # Chroma loads the HNSW index from disk on the first query
+        get_retriever().invoke("warm up")
+    with _timed("llm_client", timings):
+        getLLM()
+        getRephraseLLM()
+    if settings.REPHRASE_FAST_PATH_ENABLED or settings.OFF_TOPIC_GATE_ENABLED:
+        with _timed("topic_centroids", timings):
+            get_topic_centroids_loader().get()
+    with _timed("session_store", timings):
+        get_session_store()
+    with _timed("rag_chain", timings):
+        get_final_rag_chain()
+
+    total = sum(timings.values())
+    breakdown = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items())
+    print(f"Startup complete in {total:.2f}s ({breakdown})")
+    return timings
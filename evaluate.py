@@ -1,8 +1,14 @@
 import os
 import sys
-from typing import Any, Dict
+import argparse
+import hashlib
+import importlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
-from langchain.smith import RunEvalConfig
 
 # Load environment variables first
 load_dotenv()
@@ -12,20 +18,12 @@ PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
-from langsmith import Client
-
-# DeepEval imports (metrics + test case model)
-from deepeval.metrics import (
-    AnswerRelevancyMetric,
-    FaithfulnessMetric,
-    ContextualPrecisionMetric,
-    ContextualRecallMetric,
-    ContextualRelevancyMetric,
-)
-from deepeval.test_case import LLMTestCase
+# LangSmith and DeepEval are imported where they are used, so the local mode with
+# a stand-in judge (python evaluate.py --local ... --judge overlap) needs neither.
 
 # Import RAG chain factory (must return a fresh chain per invocation when called by LangSmith)
-from core.chain import conversational_rag_chain
+from core.chain import get_conversational_rag_chain
+from core.bm25 import tokenize
 
 ###################################################################################################
 # LangSmith custom evaluator wrappers using DeepEval
@@ -156,7 +154,9 @@ def _extract_prediction_components(example: Dict[str, Any], prediction: Any) ->
     return {"question": question, "answer": answer, "contexts": contexts, "expected": expected}
 
 
-def _build_test_case(components: Dict[str, Any]) -> LLMTestCase:
+def _build_test_case(components: Dict[str, Any]) -> "LLMTestCase":
+    from deepeval.test_case import LLMTestCase
+
     return LLMTestCase(
         input=components["question"],
         actual_output=components["answer"],
@@ -164,6 +164,98 @@ def _build_test_case(components: Dict[str, Any]) -> LLMTestCase:
         retrieval_context=components["contexts"],
     )
 
+###################################################################################################
+# Judges: score one metric for one (question, answer, contexts, expected) example.
+# A judge has a `name` (part of the cache key) and `score(metric, components) -> (score, reason)`.
+# Pass your own with --judge module:attribute (a Judge instance or a zero-argument factory).
+###################################################################################################
+
+METRICS = [
+    "answer_relevancy",
+    "faithfulness",
+    "context_precision",
+    "context_recall",
+    "context_relevancy",
+]
+
+# Metrics that can't be scored without retrieved context
+CONTEXT_METRICS = set(METRICS) - {"answer_relevancy"}
+
+
+class DeepEvalJudge:
+    """The LLM-as-judge metrics from DeepEval (needs the judge model's API key)."""
+    name = "deepeval"
+
+    def __init__(self):
+        from deepeval.metrics import (
+            AnswerRelevancyMetric,
+            FaithfulnessMetric,
+            ContextualPrecisionMetric,
+            ContextualRecallMetric,
+            ContextualRelevancyMetric,
+        )
+        self.metric_classes = {
+            "answer_relevancy": AnswerRelevancyMetric,
+            "faithfulness": FaithfulnessMetric,
+            "context_precision": ContextualPrecisionMetric,
+            "context_recall": ContextualRecallMetric,
+            "context_relevancy": ContextualRelevancyMetric,
+        }
+
+    def score(self, metric: str, components: Dict[str, Any]) -> Tuple[Optional[float], Optional[str]]:
+        # A fresh metric object per call: DeepEval metrics keep per-measurement state
+        deepeval_metric = self.metric_classes[metric]()
+        deepeval_metric.measure(_build_test_case(components))
+        return deepeval_metric.score, getattr(deepeval_metric, "reason", None)
+
+
+class OverlapJudge:
+    """
+    Local stand-in judge: keyword overlap instead of an LLM. Free and deterministic, so it is
+    good for smoke-testing the pipeline and for tests, not for judging answer quality.
+    """
+    name = "overlap"
+
+    @staticmethod
+    def _coverage(needle: str, haystack: str) -> float:
+        needle_tokens = set(tokenize(needle))
+        if not needle_tokens:
+            return 0.0
+        return len(needle_tokens & set(tokenize(haystack))) / len(needle_tokens)
+
+    def score(self, metric: str, components: Dict[str, Any]) -> Tuple[Optional[float], Optional[str]]:
+        question, answer, contexts = components["question"], components["answer"], components["contexts"]
+        if metric == "answer_relevancy":
+            return self._coverage(question, answer), "question terms found in the answer"
+        if metric == "faithfulness":
+            return self._coverage(answer, " ".join(contexts)), "answer terms found in the context"
+        if metric == "context_recall":
+            if not components["expected"]:
+                return None, "No expected answer"
+            return self._coverage(components["expected"], " ".join(contexts)), "expected-answer terms found in the context"
+        if metric in ("context_precision", "context_relevancy"):
+            relevant = [c for c in contexts if self._coverage(question, c) > 0]
+            return len(relevant) / len(contexts), "contexts sharing a term with the question"
+        raise ValueError(f"Unknown metric: {metric}")
+
+
+def load_judge(spec: str) -> Any:
+    if spec == "deepeval":
+        return DeepEvalJudge()
+    if spec == "overlap":
+        return OverlapJudge()
+    module_name, _, attribute = spec.partition(":")
+    judge = getattr(importlib.import_module(module_name), attribute)
+    return judge() if isinstance(judge, type) or not hasattr(judge, "score") else judge
+
+
+def evaluate_metric(judge: Any, metric: str, components: Dict[str, Any]) -> Dict[str, Any]:
+    if metric in CONTEXT_METRICS and not components["contexts"]:
+        return {"key": metric, "score": None, "comment": "No retrieval context"}
+    score, reason = judge.score(metric, components)
+    return {"key": metric, "score": score, "comment": reason}
+
+
 ###################################################################################################
 # RunEvaluator style wrappers (LangSmith expects callables: (run, example) -> {key, score, ...})
 # We adapt DeepEval metrics here.
@@ -179,48 +271,30 @@ def _extract_from_run(run: Any, example: Dict[str, Any]) -> Dict[str, Any]:
     # Pass the ENTIRE outputs dictionary as the 'prediction'
     return _extract_prediction_components(example.inputs, outputs)
 
+
+_deepeval_judge = None
+
+
+def _get_deepeval_judge() -> DeepEvalJudge:
+    global _deepeval_judge
+    if _deepeval_judge is None:
+        _deepeval_judge = DeepEvalJudge()
+    return _deepeval_judge
+
 def answer_relevancy_evaluator(run: Any, example: Any) -> Dict[str, Any]:
-    comps = _extract_from_run(run, example)
-    test_case = _build_test_case(comps)
-    metric = AnswerRelevancyMetric()
-    metric.measure(test_case)
-    return {"key": "answer_relevancy", "score": metric.score, "comment": getattr(metric, "reason", None)}
+    return evaluate_metric(_get_deepeval_judge(), "answer_relevancy", _extract_from_run(run, example))
 
 def faithfulness_evaluator(run: Any, example: Any) -> Dict[str, Any]:
-    comps = _extract_from_run(run, example)
-    if not comps["contexts"]:
-        return {"key": "faithfulness", "score": None, "comment": "No retrieval context"}
-    test_case = _build_test_case(comps)
-    metric = FaithfulnessMetric()
-    metric.measure(test_case)
-    return {"key": "faithfulness", "score": metric.score, "comment": getattr(metric, "reason", None)}
+    return evaluate_metric(_get_deepeval_judge(), "faithfulness", _extract_from_run(run, example))
 
 def context_precision_evaluator(run: Any, example: Any) -> Dict[str, Any]:
-    comps = _extract_from_run(run, example)
-    if not comps["contexts"]:
-        return {"key": "context_precision", "score": None, "comment": "No retrieval context"}
-    test_case = _build_test_case(comps)
-    metric = ContextualPrecisionMetric()
-    metric.measure(test_case)
-    return {"key": "context_precision", "score": metric.score, "comment": getattr(metric, "reason", None)}
+    return evaluate_metric(_get_deepeval_judge(), "context_precision", _extract_from_run(run, example))
 
 def context_recall_evaluator(run: Any, example: Any) -> Dict[str, Any]:
-    comps = _extract_from_run(run, example)
-    if not comps["contexts"]:
-        return {"key": "context_recall", "score": None, "comment": "No retrieval context"}
-    test_case = _build_test_case(comps)
-    metric = ContextualRecallMetric()
-    metric.measure(test_case)
-    return {"key": "context_recall", "score": metric.score, "comment": getattr(metric, "reason", None)}
+    return evaluate_metric(_get_deepeval_judge(), "context_recall", _extract_from_run(run, example))
 
 def context_relevancy_evaluator(run: Any, example: Any) -> Dict[str, Any]:
-    comps = _extract_from_run(run, example)
-    if not comps["contexts"]:
-        return {"key": "context_relevancy", "score": None, "comment": "No retrieval context"}
-    test_case = _build_test_case(comps)
-    metric = ContextualRelevancyMetric()
-    metric.measure(test_case)
-    return {"key": "context_relevancy", "score": metric.score, "comment": getattr(metric, "reason", None)}
+    return evaluate_metric(_get_deepeval_judge(), "context_relevancy", _extract_from_run(run, example))
 
 deepeval_run_evaluators = [
     answer_relevancy_evaluator,
@@ -230,7 +304,151 @@ deepeval_run_evaluators = [
     context_relevancy_evaluator,
 ]
 
-def main():
+###################################################################################################
+# Local evaluation (no LangSmith): golden dataset from a file, chain runs and judge calls on a
+# bounded worker pool, judge results cached on disk so unchanged examples are free on re-runs.
+###################################################################################################
+
+def load_dataset(path: str) -> List[Dict[str, Any]]:
+    """
+    JSONL (one example per line) or a JSON list. Each example needs "question";
+    "ground_truth" (or "expected_answer") is used by context recall.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+class JudgeCache:
+    """JSON file of judge results keyed by a hash of (judge, metric, question, answer, contexts, expected)."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def key(judge_name: str, metric: str, components: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            [judge_name, metric, components["question"], components["answer"],
+             components["contexts"], components["expected"]],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = result
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+
+
+def _judge_cached(judge: Any, cache: JudgeCache, metric: str, components: Dict[str, Any]) -> Dict[str, Any]:
+    key = JudgeCache.key(judge.name, metric, components)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    result = evaluate_metric(judge, metric, components)
+    # Skipped metrics (no context) are cheap, only real judge calls are worth caching
+    if result["score"] is not None:
+        cache.put(key, result)
+    return result
+
+
+def run_local_evaluation(
+    examples: List[Dict[str, Any]],
+    judge: Any,
+    cache: JudgeCache,
+    chain: Any = None,
+    max_workers: int = 8,
+    metrics: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Runs the chain on every example and every metric on every answer, all on one
+    bounded pool: an example's judge calls are queued as soon as its answer is ready.
+    """
+    chain = chain or get_conversational_rag_chain()
+    metrics = metrics or METRICS
+    started = time.perf_counter()
+
+    def answer(example: Dict[str, Any]) -> Dict[str, Any]:
+        prediction = chain.invoke({"input": example["question"], "chat_history": []})
+        return _extract_prediction_components(example, prediction)
+
+    rows: List[Dict[str, Any]] = [{} for _ in examples]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eval") as pool:
+        answer_futures = {pool.submit(answer, example): i for i, example in enumerate(examples)}
+        judge_futures = {}
+        for future in as_completed(answer_futures):
+            i = answer_futures[future]
+            try:
+                components = future.result()
+            except Exception as e:
+                print(f"Error answering example {i}: {e}")
+                rows[i] = {"question": examples[i].get("question"), "error": str(e), "scores": {}}
+                continue
+            rows[i] = {"question": components["question"], "answer": components["answer"],
+                       "contexts": len(components["contexts"]), "scores": {}}
+            for metric in metrics:
+                judge_futures[pool.submit(_judge_cached, judge, cache, metric, components)] = (i, metric)
+
+        for future in as_completed(judge_futures):
+            i, metric = judge_futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error judging {metric} for example {i}: {e}")
+                result = {"key": metric, "score": None, "comment": f"Judge error: {e}"}
+            rows[i]["scores"][metric] = result["score"]
+
+    cache.save()
+
+    summary = {}
+    for metric in metrics:
+        scores = [row["scores"].get(metric) for row in rows]
+        scored = [score for score in scores if score is not None]
+        summary[metric] = {
+            "mean": sum(scored) / len(scored) if scored else None,
+            "scored": len(scored),
+            "skipped": len(scores) - len(scored),
+        }
+
+    return {
+        "judge": judge.name,
+        "examples": len(examples),
+        "wall_seconds": time.perf_counter() - started,
+        "judge_cache": {"hits": cache.hits, "misses": cache.misses},
+        "metrics": summary,
+        "rows": rows,
+    }
+
+
+def run_langsmith_evaluation():
+    from langchain.smith import RunEvalConfig
+    from langsmith import Client
+
     client = Client()
 
     DATASET_NAME = "rag_dataset"     # Must exist in LangSmith datasets
@@ -244,7 +462,7 @@ def main():
 
     run = client.run_on_dataset(
         dataset_name=DATASET_NAME,
-        llm_or_chain_factory=conversational_rag_chain,
+        llm_or_chain_factory=get_conversational_rag_chain(),
         evaluation=eval_config,
         project_name=PROJECT_NAME,
         input_mapper=lambda x: {"input": x["question"], "chat_history": []},
@@ -254,5 +472,42 @@ def main():
     print("Evaluation complete.")
     print(f"Results URL: {run.url}")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the RAG chain on LangSmith, or locally from a dataset file")
+    parser.add_argument("--local", metavar="DATASET", help="golden dataset (.jsonl or .json) to evaluate locally")
+    parser.add_argument("--judge", default="deepeval",
+                        help="deepeval, overlap (local stand-in) or module:attribute of your own judge")
+    parser.add_argument("--workers", type=int, default=8, help="max concurrent chain runs + judge calls")
+    parser.add_argument("--cache", default="eval_judge_cache.json", help="judge result cache ('' to disable)")
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=METRICS)
+    parser.add_argument("--output", help="write the full results (per example) to this JSON file")
+    args = parser.parse_args()
+
+    if not args.local:
+        run_langsmith_evaluation()
+        return
+
+    examples = load_dataset(args.local)
+    print(f"Evaluating {len(examples)} examples from {args.local} with the {args.judge} judge")
+    result = run_local_evaluation(
+        examples,
+        judge=load_judge(args.judge),
+        cache=JudgeCache(args.cache or None),
+        max_workers=args.workers,
+        metrics=args.metrics
+    )
+
+    print(f"\nDone in {result['wall_seconds']:.1f}s "
+          f"(judge cache: {result['judge_cache']['hits']} hits, {result['judge_cache']['misses']} misses)")
+    for metric, summary in result["metrics"].items():
+        mean = f"{summary['mean']:.3f}" if summary["mean"] is not None else "n/a"
+        print(f"  {metric:<18} {mean:>6}  ({summary['scored']} scored, {summary['skipped']} skipped)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nWrote {args.output}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,123 @@
+# Benchmark: concurrent /chat throughput with the old blocking path vs the async path.
+# Uses a fake LLM and a fake (blocking) retriever, so no Groq quota or vector store is needed.
+#
+#   python scripts/bench_async.py --requests 50 --concurrency 10
+#
+# "blocking" reproduces the old chat_handler: an async handler that calls chain.invoke.
+# "async" is the new path: chain.ainvoke with retrieval on the bounded executor.
+# While the requests run, a probe task measures how long the event loop is stalled
+# (this is what the health check experiences).
+
+import sys
+import os
+import argparse
+import asyncio
+import time
+from typing import Any, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+from core.chain import build_conversational_rag_chain
+from core.executor import OffloadedRetriever
+
+
+class SleepyChatModel(BaseChatModel):
+    """Fake LLM: blocks like the sync Groq client, awaits like the async one."""
+    latency: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleepy-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="fake answer"))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="fake answer"))])
+
+
+class SleepyRetriever(BaseRetriever):
+    """Fake retriever: blocks like a Chroma query + query embedding."""
+    latency: float = 0.05
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency)
+        return [Document(page_content=f"context for {query}", metadata={"source_name": "resume"})]
+
+
+async def probe_loop(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Returns the worst event-loop stall seen while the benchmark ran."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_mode(chain, mode: str, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    input_data = {"input": "What projects has Shree built?", "chat_history": []}
+
+    async def one_request():
+        async with semaphore:
+            if mode == "blocking":
+                return chain.invoke(input_data)
+            return await chain.ainvoke(input_data)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await probe
+
+    return {
+        "mode": mode,
+        "requests": total,
+        "seconds": elapsed,
+        "requests_per_sec": total / elapsed,
+        "worst_loop_stall_ms": worst_stall * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blocking vs async chat throughput benchmark")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--retrieval-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    llm = SleepyChatModel(latency=args.llm_latency)
+    retriever = OffloadedRetriever(retriever=SleepyRetriever(latency=args.retrieval_latency))
+    chain = build_conversational_rag_chain(llm, retriever)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"llm {args.llm_latency}s, retrieval {args.retrieval_latency}s\n")
+    for mode in ("blocking", "async"):
+        result = asyncio.run(run_mode(chain, mode, args.requests, args.concurrency))
+        print(f"{result['mode']:>9}: {result['seconds']:.2f}s total, "
+              f"{result['requests_per_sec']:.1f} req/s, "
+              f"worst loop stall {result['worst_loop_stall_ms']:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Benchmark: ingestion embedding throughput on CPU for fixed batch sizes vs length-bucketed batching.
+# Uses the chunks already stored in the Chroma collection (run scripts/ingest.py first) and the raw
+# sentence-transformers model (no embedding cache), so every run measures real forward passes.
+#
+#   python scripts/bench_embedding_batches.py --batch-sizes 1 8 32 64 --token-budget 8192
+
+import sys
+import os
+import argparse
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import chromadb
+from langchain_huggingface import HuggingFaceEmbeddings
+from core.embedding_batcher import embed_in_buckets
+from app.settings import Settings
+settings = Settings()
+
+
+def load_chunk_texts():
+    client = chromadb.PersistentClient(path=settings.VECTOR_DB_PATH)
+    collection = client.get_collection(settings.VECTOR_DB_COLLECTION_NAME)
+    return collection.get(include=["documents"])["documents"]
+
+
+def build_model(batch_size: int) -> HuggingFaceEmbeddings:
+    return HuggingFaceEmbeddings(
+        model_name=settings.EMBEDDING_MODEL_NAME,
+        model_kwargs={"device": settings.EMBEDDING_DEVICE},
+        encode_kwargs={"normalize_embeddings": settings.EMBEDDING_NORMALIZE, "batch_size": batch_size}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding batch size benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--token-budget", type=int, default=settings.EMBEDDING_BATCH_TOKEN_BUDGET)
+    parser.add_argument("--max-batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    args = parser.parse_args()
+
+    texts = load_chunk_texts()
+    print(f"Benchmarking {len(texts)} chunks on {settings.EMBEDDING_DEVICE}\n")
+
+    for batch_size in args.batch_sizes:
+        model = build_model(batch_size)
+        model.embed_documents(texts[:8])  # warm up
+        start = time.perf_counter()
+        model.embed_documents(texts)
+        seconds = time.perf_counter() - start
+        print(f"fixed batch_size={batch_size:>3}: {seconds:.2f}s = {len(texts) / seconds:.1f} chunks/sec")
+
+    model = build_model(args.max_batch_size)
+    model.embed_documents(texts[:8])
+    _, report = embed_in_buckets(model, texts, args.token_budget, args.max_batch_size)
+    print(f"bucketed (budget {args.token_budget} tokens, max {args.max_batch_size}): {report}")
+
+if __name__ == "__main__":
+    main()
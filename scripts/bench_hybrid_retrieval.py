@@ -0,0 +1,95 @@
+# Benchmark: recall and latency of vector-only vs BM25-only vs hybrid (RRF) retrieval.
+# Run scripts/ingest.py first (it writes the BM25 index next to the Chroma files).
+#
+#   python scripts/bench_hybrid_retrieval.py --ks 3 6 12
+#
+# Queries are generated from the corpus itself: for every repo README we ask about the repo by name
+# (the exact-token case embeddings struggle with), plus a few resume questions. A query counts as a hit
+# at k if any chunk from the expected source is in the top k.
+
+import sys
+import os
+import argparse
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+from core.bm25 import BM25Index, BM25Retriever, bm25_index_path
+from core.hybrid_retriever import HybridRetriever
+from core.vector_store import get_vector_retriever
+from app.settings import Settings
+settings = Settings()
+
+RESUME_QUESTIONS = [
+    "Where did Shree go to school?",
+    "What internships has Shree done?",
+    "What programming languages does Shree know?",
+    "What is Shree's work experience?",
+]
+
+
+def build_queries(index: BM25Index):
+    repo_names = sorted({m["repo_name"] for m in index.metadatas if m.get("repo_name")})
+    queries = []
+    for name in repo_names:
+        queries.append((f"Tell me about the {name} project", ("repo_name", name)))
+        queries.append((f"What did Shree build in {name.replace('-', ' ').replace('_', ' ')}?", ("repo_name", name)))
+    for question in RESUME_QUESTIONS:
+        queries.append((question, ("source_name", "resume")))
+    return queries
+
+
+def is_hit(docs, expected) -> bool:
+    key, value = expected
+    return any(doc.metadata.get(key) == value for doc in docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector vs BM25 vs hybrid retrieval benchmark")
+    parser.add_argument("--ks", type=int, nargs="+", default=[3, 6, settings.RETRIEVER_K_VALUE])
+    parser.add_argument("--candidates", type=int, default=settings.HYBRID_CANDIDATES_K)
+    args = parser.parse_args()
+    max_k = max(args.ks)
+
+    index_path = bm25_index_path(settings.VECTOR_DB_PATH)
+    queries = build_queries(BM25Index.load(index_path))
+    print(f"{len(queries)} labeled queries\n")
+
+    retrievers = {
+        "vector": get_vector_retriever(max_k),
+        "bm25": BM25Retriever(index_path=index_path, k=max_k),
+        "hybrid": HybridRetriever(
+            retrievers=[
+                get_vector_retriever(max(args.candidates, max_k)),
+                BM25Retriever(index_path=index_path, k=max(args.candidates, max_k)),
+            ],
+            k=max_k,
+            rrf_k=settings.HYBRID_RRF_K
+        ),
+    }
+
+    header = " ".join(f"recall@{k:<3}" for k in args.ks)
+    print(f"{'retriever':>9}  {header}  p50 ms  p95 ms")
+    for name, retriever in retrievers.items():
+        retriever.invoke("warm up")
+        hits = {k: 0 for k in args.ks}
+        latencies = []
+        for query, expected in queries:
+            start = time.perf_counter()
+            docs = retriever.invoke(query)
+            latencies.append(time.perf_counter() - start)
+            for k in args.ks:
+                hits[k] += is_hit(docs[:k], expected)
+
+        recalls = " ".join(f"{hits[k] / len(queries):<10.2%}" for k in args.ks)
+        print(f"{name:>9}  {recalls}  {np.percentile(latencies, 50) * 1000:6.1f}  "
+              f"{np.percentile(latencies, 95) * 1000:6.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Parity check and latency/RSS benchmark: PyTorch (sentence-transformers) vs ONNX Runtime embeddings.
+# Run scripts/export_onnx_embeddings.py and scripts/ingest.py first.
+#
+#   python scripts/bench_onnx_embeddings.py --k 6
+#
+# Parity:  per-chunk cosine similarity between the two backends' vectors, and for a set of
+#          recruiter-style questions, the overlap of the top-k chunks each backend retrieves.
+# Latency: single-query embed latency (p50/p95) for each backend.
+# RSS:     peak resident memory of a fresh process that loads the backend and embeds one query.
+
+import sys
+import os
+import argparse
+import json
+import resource
+import subprocess
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import chromadb
+import numpy as np
+from core.embeddings import get_base_embedding_model
+from app.settings import Settings
+settings = Settings()
+
+QUESTIONS = [
+    "What projects has Shree built?",
+    "What programming languages does Shree know?",
+    "Where did Shree go to school?",
+    "Tell me about the 3D image rendering project.",
+    "What experience does Shree have with machine learning?",
+    "Has Shree worked with React or frontend frameworks?",
+    "What internships has Shree done?",
+    "What databases has Shree used?",
+]
+
+
+def _unit(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def _percentile_ms(samples, q) -> float:
+    return float(np.percentile(samples, q) * 1000)
+
+
+def measure_rss(backend: str) -> None:
+    """Runs in a child process: load one backend, embed once, print peak RSS in MB."""
+    model = get_base_embedding_model(backend)
+    model.embed_query("warm up")
+    # ru_maxrss is KB on Linux
+    print(json.dumps({"rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyTorch vs ONNX embedding parity and latency")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVER_K_VALUE)
+    parser.add_argument("--latency-runs", type=int, default=50)
+    parser.add_argument("--measure-rss", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_rss:
+        measure_rss(args.measure_rss)
+        return
+
+    client = chromadb.PersistentClient(path=settings.VECTOR_DB_PATH)
+    texts = client.get_collection(settings.VECTOR_DB_COLLECTION_NAME).get(include=["documents"])["documents"]
+    print(f"Corpus: {len(texts)} chunks, {len(QUESTIONS)} questions, k={args.k}\n")
+
+    backends = {name: get_base_embedding_model(name) for name in ("torch", "onnx")}
+
+    doc_vectors = {name: _unit(model.embed_documents(texts)) for name, model in backends.items()}
+    query_vectors = {name: _unit(model.embed_documents(QUESTIONS)) for name, model in backends.items()}
+
+    # --- Parity ---
+    cosines = (doc_vectors["torch"] * doc_vectors["onnx"]).sum(axis=1)
+    print(f"Chunk cosine agreement: mean {cosines.mean():.4f}, min {cosines.min():.4f}")
+
+    overlaps = []
+    for i in range(len(QUESTIONS)):
+        top = {}
+        for name in backends:
+            scores = doc_vectors[name] @ query_vectors[name][i]
+            top[name] = set(np.argsort(-scores)[:args.k].tolist())
+        overlaps.append(len(top["torch"] & top["onnx"]) / args.k)
+    print(f"Top-{args.k} retrieval overlap: mean {np.mean(overlaps):.2%}, min {np.min(overlaps):.2%}\n")
+
+    # --- Latency ---
+    for name, model in backends.items():
+        samples = []
+        for i in range(args.latency_runs):
+            start = time.perf_counter()
+            model.embed_query(QUESTIONS[i % len(QUESTIONS)])
+            samples.append(time.perf_counter() - start)
+        print(f"{name:>5} query latency: p50 {_percentile_ms(samples, 50):.1f} ms, "
+              f"p95 {_percentile_ms(samples, 95):.1f} ms")
+
+    # --- RSS (fresh process per backend so the numbers don't include each other) ---
+    print()
+    for name in backends:
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure-rss", name],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        print(f"{name:>5} peak RSS: {json.loads(output)['rss_mb']:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark: query embedding throughput and latency at different concurrency levels,
+# one forward pass per query vs micro-batched across concurrent callers.
+#
+#   python scripts/bench_query_batching.py --concurrency 1 4 16 64 --queries 256
+
+import sys
+import os
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+from core.embeddings import get_base_embedding_model
+from core.query_batcher import BatchingEmbeddings
+from app.settings import Settings
+settings = Settings()
+
+
+def run(model, queries, concurrency):
+    latencies = []
+
+    def one(query):
+        start = time.perf_counter()
+        model.embed_query(query)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    elapsed = time.perf_counter() - start
+    return len(queries) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batched query embedding benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--window-ms", type=float, default=settings.EMBEDDING_MICROBATCH_WINDOW_MS)
+    parser.add_argument("--max-batch-size", type=int, default=settings.EMBEDDING_MICROBATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    base = get_base_embedding_model()
+    base.embed_query("warm up")
+    # Unique texts so nothing could be served from a cache
+    queries = [f"What did Shree build in project number {i}?" for i in range(args.queries)]
+
+    print(f"{'concurrency':>11} {'mode':>9} {'q/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean batch':>10} {'queue ms':>8}")
+    for concurrency in args.concurrency:
+        qps, p50, p95 = run(base, queries, concurrency)
+        print(f"{concurrency:>11} {'single':>9} {qps:8.1f} {p50:8.1f} {p95:8.1f} {1:>10.1f} {0:>8.1f}")
+
+        batching = BatchingEmbeddings(base, window_ms=args.window_ms, max_batch_size=args.max_batch_size)
+        qps, p50, p95 = run(batching, queries, concurrency)
+        stats = batching.stats()
+        print(f"{concurrency:>11} {'batched':>9} {qps:8.1f} {p50:8.1f} {p95:8.1f} "
+              f"{stats['mean_batch_size']:>10.1f} {stats['mean_queue_delay_ms']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Benchmark: vector search latency of the Chroma retriever (HNSW) vs the exact NumPy index (VECTOR_BACKEND="numpy").
+# Uses the live collection (run scripts/ingest.py first). Query vectors are embedded once up front, so the
+# "search" rows compare only the index lookups; the "retriever" rows time retriever.invoke end to end
+# (query embedding is served from the embedding cache after the first round).
+#
+#   python scripts/bench_vector_backends.py --k 12 --rounds 50
+#   python scripts/bench_vector_backends.py --filter '{"source_name": "resume"}'
+
+import sys
+import os
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+from core.embeddings import get_embedding_model
+from core.numpy_index import NumpyRetriever, NumpyVectorIndex, numpy_index_paths
+from core.vector_store import get_vector_store
+from app.settings import Settings
+settings = Settings()
+
+QUESTIONS = [
+    "What projects has Shree built?",
+    "What programming languages does Shree know?",
+    "Where did Shree go to school?",
+    "What work experience does Shree have?",
+    "Has Shree worked with machine learning?",
+    "What is Shree's most recent project?",
+    "Does Shree have experience with cloud platforms?",
+    "What are Shree's strongest skills?",
+]
+
+
+def time_calls(call: Callable[[int], List[str]], n_queries: int, rounds: int) -> Dict[str, float]:
+    latencies = []
+    for _ in range(rounds):
+        for i in range(n_queries):
+            start = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - start)
+    ms = np.asarray(latencies) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)), "mean": float(ms.mean())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vs exact NumPy vector search benchmark")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVER_K_VALUE)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--filter", type=json.loads, default=None, help="Chroma-style metadata filter (JSON)")
+    args = parser.parse_args()
+
+    vector_store = get_vector_store()
+    collection = vector_store._collection
+    stored = vector_store.get(include=["embeddings", "documents", "metadatas"])
+    if not stored["ids"]:
+        print("The collection is empty. Run scripts/ingest.py first.")
+        return
+
+    # Same data the ingest script writes; built here so the benchmark works before the first re-ingest
+    index = NumpyVectorIndex.build(
+        stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"], space=settings.HNSW_SPACE
+    )
+    embedding_model = get_embedding_model()
+    query_vectors = np.asarray(embedding_model.embed_documents(QUESTIONS), dtype=np.float32)
+    k = min(args.k, len(index))
+
+    def chroma_search(i: int) -> List[str]:
+        result = collection.query(query_embeddings=[query_vectors[i].tolist()], n_results=k,
+                                  where=args.filter, include=["documents", "metadatas"])
+        return result["ids"][0]
+
+    def numpy_search(i: int) -> List[str]:
+        return [index.document(row).id for row, _ in index.search(query_vectors[i], k, args.filter)]
+
+    chroma_retriever = vector_store.as_retriever(search_kwargs={"k": k, "filter": args.filter})
+    vectors_path, chunks_path = numpy_index_paths(settings.VECTOR_DB_PATH)
+    numpy_retriever = None
+    if os.path.exists(vectors_path) and os.path.exists(chunks_path):
+        numpy_retriever = NumpyRetriever(vectors_path=vectors_path, chunks_path=chunks_path,
+                                         embedding_model=embedding_model, k=k, filter=args.filter)
+
+    print(f"{len(index)} chunks, dim {index.vectors.shape[1]}, space {settings.HNSW_SPACE}, "
+          f"k={k}, {len(QUESTIONS)} queries x {args.rounds} rounds, filter={args.filter}\n")
+    rows = [("chroma search", chroma_search), ("numpy search", numpy_search),
+            ("chroma retriever", lambda i: [d.id for d in chroma_retriever.invoke(QUESTIONS[i])])]
+    if numpy_retriever is not None:
+        rows.append(("numpy retriever", lambda i: [d.id for d in numpy_retriever.invoke(QUESTIONS[i])]))
+    else:
+        print(f"(no NumPy index at {vectors_path}; run scripts/ingest.py to benchmark the retriever)\n")
+
+    for label, call in rows:
+        call(0)
+        stats = time_calls(call, len(QUESTIONS), args.rounds)
+        print(f"{label:>17}: p50 {stats['p50']:7.3f} ms  p95 {stats['p95']:7.3f} ms  mean {stats['mean']:7.3f} ms")
+
+    overlap = [len(set(chroma_search(i)) & set(numpy_search(i))) / k for i in range(len(QUESTIONS))]
+    print(f"\nTop-{k} overlap (Chroma HNSW vs exact): {np.mean(overlap):.3f}")
+
+if __name__ == "__main__":
+    main()
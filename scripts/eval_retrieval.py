@@ -0,0 +1,190 @@
+# Retrieval-only evaluation: hit-rate@k, MRR and context tokens for a grid of chunking settings, no LLM.
+# Every golden question (data/eval/golden.jsonl) is labeled with the sources that answer it: "resume", or a
+# GitHub repo (matched against the repo name or the README's title). A question is a hit at k when one of its
+# top-k chunks comes from an expected source.
+#
+# Documents are loaded once and each (CHUNK_SIZE, CHUNK_OVERLAP) split is searched in memory with the exact
+# NumPy index (+ BM25 and RRF in hybrid mode), so nothing is written to Chroma. Chunk vectors go through the
+# app's embedding cache: identical chunks are shared between settings and re-runs only embed what changed.
+#
+#   python scripts/eval_retrieval.py --chunk-sizes 500 1000 1500 --chunk-overlaps 0 100 200 --k 3 6 12
+
+import sys
+import os
+import argparse
+import itertools
+import json
+import re
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Set
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from core.bm25 import BM25Index
+from core.embedding_batcher import embed_in_buckets
+from core.embeddings import get_embedding_model
+from core.hybrid_retriever import reciprocal_rank_fusion
+from core.loaders import load_all_documents
+from core.numpy_index import NumpyVectorIndex
+from core.tokens import estimate_tokens
+from app.settings import Settings
+settings = Settings()
+
+LABELS_KEY = "eval_source_labels"
+
+
+def normalize_label(label: str) -> str:
+    # "Pokédex" == "pokedex", "3D Image Rendering" == "3D-Image-Rendering"
+    ascii_label = unicodedata.normalize("NFKD", label).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]", "", ascii_label.lower())
+
+
+def source_labels(doc: Document) -> Set[str]:
+    labels = {doc.metadata.get("source_name") or "", doc.metadata.get("repo_name") or ""}
+    # READMEs open with the project's title, which is what people (and the golden set) call it
+    first_line = doc.page_content.lstrip().split("\n", 1)[0]
+    if first_line.startswith("#"):
+        labels.add(first_line.lstrip("#").split(":")[0])
+    return {normalize_label(label) for label in labels if label}
+
+
+def rank_chunks(
+    chunks: List[Document],
+    vectors: List[List[float]],
+    query_vectors: np.ndarray,
+    questions: List[str],
+    mode: str,
+    max_k: int
+) -> List[List[int]]:
+    """
+    Chunk indexes for each question, best first (max_k of them).
+    """
+    ids = [str(i) for i in range(len(chunks))]
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [{} for _ in chunks]
+    vector_index = NumpyVectorIndex.build(ids, vectors, texts, metadatas, space=settings.HNSW_SPACE)
+    bm25_index = BM25Index.build(ids, texts, metadatas) if mode == "hybrid" else None
+
+    rankings = []
+    for question, query_vector in zip(questions, query_vectors):
+        if bm25_index is None:
+            rankings.append([row for row, _ in vector_index.search(query_vector, max_k)])
+            continue
+        candidates = max(max_k, settings.HYBRID_CANDIDATES_K)
+        fused = reciprocal_rank_fusion(
+            [
+                [vector_index.document(row) for row, _ in vector_index.search(query_vector, candidates)],
+                [bm25_index.document(row) for row, _ in bm25_index.search(question, candidates)],
+            ],
+            k=max_k,
+            rrf_k=settings.HYBRID_RRF_K
+        )
+        rankings.append([int(doc.id) for doc in fused])
+    return rankings
+
+
+def score(
+    rankings: List[List[int]],
+    chunks: List[Document],
+    expected: List[Set[str]],
+    ks: List[int]
+) -> Dict[str, Any]:
+    hit_ranks: List[Optional[int]] = []
+    for ranking, expected_labels in zip(rankings, expected):
+        first_hit = next(
+            (rank for rank, i in enumerate(ranking, start=1) if chunks[i].metadata[LABELS_KEY] & expected_labels),
+            None
+        )
+        hit_ranks.append(first_hit)
+
+    result = {"mrr": float(np.mean([1 / rank if rank else 0.0 for rank in hit_ranks]))}
+    for k in ks:
+        result[f"hit@{k}"] = float(np.mean([rank is not None and rank <= k for rank in hit_ranks]))
+        result[f"tokens@{k}"] = float(np.mean([
+            sum(estimate_tokens(chunks[i].page_content) for i in ranking[:k]) for ranking in rankings
+        ]))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval-only evaluation over a grid of chunking settings")
+    parser.add_argument("--dataset", default=os.path.join(PROJECT_ROOT, "data", "eval", "golden.jsonl"))
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500, 750, 1000, 1500])
+    parser.add_argument("--chunk-overlaps", type=int, nargs="+", default=[0, 100, 200])
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 6, settings.RETRIEVER_K_VALUE])
+    parser.add_argument("--mode", choices=["vector", "hybrid"], default=settings.RETRIEVER_MODE.lower())
+    parser.add_argument("--output", help="write all rows to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    examples = [e for e in examples if e.get("expected_sources")]
+    questions = [e["question"] for e in examples]
+    expected = [{normalize_label(label) for label in e["expected_sources"]} for e in examples]
+
+    documents = load_all_documents()
+    if not documents:
+        print("Could not load documents. Exiting.")
+        return
+    for doc in documents:
+        doc.metadata[LABELS_KEY] = source_labels(doc)
+
+    embedding_model = get_embedding_model()
+    query_vectors = np.asarray([embedding_model.embed_query(q) for q in questions], dtype=np.float32)
+    ks = sorted(set(args.k))
+
+    print(f"{len(questions)} labeled questions, {len(documents)} documents, mode={args.mode}. "
+          f"Current settings: CHUNK_SIZE={settings.CHUNK_SIZE} CHUNK_OVERLAP={settings.CHUNK_OVERLAP} "
+          f"RETRIEVER_K_VALUE={settings.RETRIEVER_K_VALUE}\n")
+    header = f"{'size':>5} {'overlap':>7} {'chunks':>6} {'embed s':>7} {'MRR':>6}"
+    for k in ks:
+        header += f" {f'hit@{k}':>7} {f'tok@{k}':>7}"
+    print(header)
+
+    rows = []
+    for chunk_size, chunk_overlap in itertools.product(args.chunk_sizes, args.chunk_overlaps):
+        if chunk_overlap >= chunk_size:
+            continue
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+        )
+        chunks = splitter.split_documents(documents)
+
+        start = time.perf_counter()
+        vectors, _ = embed_in_buckets(
+            embedding_model,
+            [chunk.page_content for chunk in chunks],
+            token_budget=settings.EMBEDDING_BATCH_TOKEN_BUDGET,
+            max_batch_size=settings.EMBEDDING_BATCH_SIZE
+        )
+        embed_seconds = time.perf_counter() - start
+
+        rankings = rank_chunks(chunks, vectors, query_vectors, questions, args.mode, max(ks))
+        row = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "chunks": len(chunks),
+               "embed_seconds": embed_seconds, **score(rankings, chunks, expected, ks)}
+        rows.append(row)
+
+        line = f"{chunk_size:>5} {chunk_overlap:>7} {len(chunks):>6} {embed_seconds:>7.2f} {row['mrr']:>6.3f}"
+        for k in ks:
+            line += f" {row[f'hit@{k}']:>7.3f} {row[f'tokens@{k}']:>7.0f}"
+        if (chunk_size, chunk_overlap) == (settings.CHUNK_SIZE, settings.CHUNK_OVERLAP):
+            line += "  <- current"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mode": args.mode, "questions": len(questions), "k": ks, "rows": rows}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
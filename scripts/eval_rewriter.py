@@ -0,0 +1,178 @@
+# Regression check for the rephrase fast path (core/query_rewriter.py) and the rephrase model: how many
+# follow-ups skip the rephrase LLM call, how much time that (and a smaller model) saves, and whether retrieval
+# gets any worse for it.
+# Every follow-up in data/eval/followups.jsonl (previous question + answer, then the follow-up) is:
+# 1. checked by the fast path (REPHRASE_FAST_PATH_MIN_SIMILARITY against centroids of the current chunks)
+# 2. always rephrased by the answering model (LLM_MODEL, timed): the baseline
+# 3. always rephrased by the rephrase model (REPHRASE_LLM_MODEL, timed), when it is a different model
+# Retrieval is then scored (hit@k, MRR, as in scripts/eval_retrieval.py) for the raw follow-up, both
+# always-rephrased queries, and what the fast path would send. Exits with status 1 when the fast path (with the
+# rephrase model) loses more than --tolerance hit rate against always rephrasing with LLM_MODEL.
+#
+#   python scripts/eval_rewriter.py --k 3 6 12
+#   python scripts/eval_rewriter.py --min-similarity 0.4
+#   REPHRASE_LLM_MODEL=llama-3.1-8b-instant python scripts/eval_rewriter.py
+
+import sys
+import os
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from core.embedding_batcher import embed_in_buckets
+from core.embeddings import get_embedding_model
+from core.llm import getLLM, getRephraseLLM
+from core.loaders import load_all_documents
+from core.prompts import REPHRASE_PROMPT
+from core.query_rewriter import QueryRewriter, has_references
+from core.topic_centroids import TopicCentroids
+from scripts.eval_retrieval import LABELS_KEY, normalize_label, rank_chunks, score, source_labels
+from app.settings import Settings
+settings = Settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rephrase fast path: skip rate, time saved and retrieval regression")
+    parser.add_argument("--dataset", default=os.path.join(PROJECT_ROOT, "data", "eval", "followups.jsonl"))
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 6, settings.RETRIEVER_K_VALUE])
+    parser.add_argument("--mode", choices=["vector", "hybrid"], default=settings.RETRIEVER_MODE.lower())
+    parser.add_argument("--min-similarity", type=float, default=settings.REPHRASE_FAST_PATH_MIN_SIMILARITY)
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="allowed hit-rate drop vs always rephrasing with LLM_MODEL")
+    parser.add_argument("--output", help="write per-question results to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    expected = [{normalize_label(label) for label in e["expected_sources"]} for e in examples]
+    ks = sorted(set(args.k))
+
+    documents = load_all_documents()
+    if not documents:
+        print("Could not load documents. Exiting.")
+        return
+    for doc in documents:
+        doc.metadata[LABELS_KEY] = source_labels(doc)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP, add_start_index=True
+    )
+    chunks = splitter.split_documents(documents)
+
+    embedding_model = get_embedding_model()
+    vectors, _ = embed_in_buckets(
+        embedding_model,
+        [chunk.page_content for chunk in chunks],
+        token_budget=settings.EMBEDDING_BATCH_TOKEN_BUDGET,
+        max_batch_size=settings.EMBEDDING_BATCH_SIZE
+    )
+    centroids = TopicCentroids.build(
+        vectors, [chunk.metadata for chunk in chunks], per_source=settings.TOPIC_CENTROIDS_PER_SOURCE
+    )
+    rewriter = QueryRewriter(embedding_model, lambda: centroids, min_topic_similarity=args.min_similarity)
+    baseline_model = settings.LLM_MODEL
+    rephrase_model = settings.REPHRASE_LLM_MODEL or settings.LLM_MODEL
+    baseline_chain = REPHRASE_PROMPT | getLLM() | StrOutputParser()
+    rephrase_chain = REPHRASE_PROMPT | getRephraseLLM() | StrOutputParser()
+
+    def _rephrase(chain, follow_up: str, history: List[Any]):
+        start = time.perf_counter()
+        rephrased = chain.invoke({"input": follow_up, "chat_history": history}).strip()
+        return rephrased, time.perf_counter() - start
+
+    rows: List[Dict[str, Any]] = []
+    for example in examples:
+        question, answer = example["history"]
+        follow_up = example["question"]
+        history = [HumanMessage(content=question), AIMessage(content=answer)]
+        _, similarity = centroids.best(embedding_model.embed_query(follow_up))
+
+        baseline, baseline_seconds = _rephrase(baseline_chain, follow_up, history)
+        if rephrase_model == baseline_model:
+            rephrased, rephrase_seconds = baseline, baseline_seconds
+        else:
+            rephrased, rephrase_seconds = _rephrase(rephrase_chain, follow_up, history)
+
+        fast_path = rewriter.is_self_contained(follow_up)
+        rows.append({
+            "question": follow_up,
+            "labeled_self_contained": example.get("self_contained"),
+            "has_references": has_references(follow_up),
+            "topic_similarity": similarity,
+            "fast_path": fast_path,
+            "baseline_rephrased": baseline,
+            "baseline_seconds": baseline_seconds,
+            "rephrased": rephrased,
+            "rephrase_seconds": rephrase_seconds,
+        })
+
+    baseline_label = "always rephrase (LLM_MODEL)"
+    variants = {"raw follow-up": [row["question"] for row in rows]}
+    variants[baseline_label] = [row["baseline_rephrased"] for row in rows]
+    if rephrase_model != baseline_model:
+        variants["always rephrase (REPHRASE_LLM_MODEL)"] = [row["rephrased"] for row in rows]
+    variants["fast path"] = [row["question"] if row["fast_path"] else row["rephrased"] for row in rows]
+    results = {}
+    for label, queries in variants.items():
+        query_vectors = np.asarray([embedding_model.embed_query(q) for q in queries], dtype=np.float32)
+        rankings = rank_chunks(chunks, vectors, query_vectors, queries, args.mode, max(ks))
+        results[label] = score(rankings, chunks, expected, ks)
+
+    skipped = [row for row in rows if row["fast_path"]]
+    unsafe = [row for row in skipped if row["labeled_self_contained"] is False]
+    mean_baseline = float(np.mean([row["baseline_seconds"] for row in rows]))
+    mean_rephrase = float(np.mean([row["rephrase_seconds"] for row in rows]))
+    print(f"{len(rows)} follow-ups, baseline model {baseline_model}, rephrase model {rephrase_model}, "
+          f"mode={args.mode}, min similarity {args.min_similarity}\n")
+    for row in rows:
+        marker = "skip" if row["fast_path"] else "llm "
+        print(f"  [{marker}] sim {row['topic_similarity']:.2f} refs {str(row['has_references']):<5} "
+              f"{row['question']!r} -> {row['rephrased']!r}")
+
+    print(f"\nSkip rate: {len(skipped)}/{len(rows)} ({len(skipped) / len(rows):.0%}), "
+          f"of which labeled as needing context: {len(unsafe)}")
+    # Per follow-up, the baseline always pays the LLM_MODEL call; the fast path pays the rephrase model or nothing
+    fast_path_seconds = (len(rows) - len(skipped)) * mean_rephrase / len(rows)
+    print(f"Rephrase call: mean {mean_baseline * 1000:.0f} ms with {baseline_model}, "
+          f"{mean_rephrase * 1000:.0f} ms with {rephrase_model}; "
+          f"saved ~{(mean_baseline - fast_path_seconds) * 1000:.0f} ms per follow-up on average\n")
+
+    width = max(len(label) for label in results)
+    header = f"{'':>{width}} {'MRR':>6}" + "".join(f" {f'hit@{k}':>7}" for k in ks)
+    print(header)
+    for label, result in results.items():
+        print(f"{label:>{width}} {result['mrr']:>6.3f}" + "".join(f" {result[f'hit@{k}']:>7.3f}" for k in ks))
+
+    regressions = [
+        k for k in ks
+        if results["fast path"][f"hit@{k}"] < results[baseline_label][f"hit@{k}"] - args.tolerance
+    ]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "baseline_model": baseline_model, "rephrase_model": rephrase_model,
+                "min_similarity": args.min_similarity, "k": ks, "results": results, "rows": rows
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if regressions:
+        print(f"\nREGRESSION: the fast path with {rephrase_model} loses hit rate against always rephrasing "
+              f"with {baseline_model} at k={regressions} (tolerance {args.tolerance})")
+        sys.exit(1)
+    print(f"\nNo retrieval regression from the fast path with {rephrase_model}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Threshold sweep for the off-topic gate (core/topic_gate.py) on a labeled question set.
+# Uses the topic centroids the API would load (written by scripts/ingest.py) and reports, per threshold:
+# - false-positive rate: on-topic questions that would get the redirect instead of an answer (keep this at 0)
+# - absorbed: off-topic questions answered by the gate without retrieval or the LLM
+# Questions the gate never checks (follow-ups, i.e. examples with a "history", greetings, questions to the
+# assistant, references; see is_gateable) pass at every threshold, as they would in the API.
+# Questions misclassified at --threshold (default: OFF_TOPIC_GATE_THRESHOLD) are listed with their scores.
+#
+#   python scripts/eval_topic_gate.py
+#   python scripts/eval_topic_gate.py --thresholds 0.1 0.15 0.2 0.25 --threshold 0.15 --output gate.json
+
+import sys
+import os
+import argparse
+import json
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import numpy as np
+from core.embeddings import get_embedding_model
+from core.topic_centroids import get_topic_centroids_loader
+from core.topic_gate import is_gateable
+from app.settings import Settings
+settings = Settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Off-topic gate: false positives vs absorbed traffic per threshold")
+    parser.add_argument("--dataset", default=os.path.join(PROJECT_ROOT, "data", "eval", "topic_gate.jsonl"))
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4])
+    parser.add_argument("--threshold", type=float, default=settings.OFF_TOPIC_GATE_THRESHOLD,
+                        help="threshold to list misclassified questions for")
+    parser.add_argument("--output", help="write per-question scores and the sweep to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    centroids = get_topic_centroids_loader().get()
+    if not centroids:
+        print("The collection is empty. Run scripts/ingest.py first.")
+        return
+
+    embedding_model = get_embedding_model()
+    rows = []
+    for example in examples:
+        topic, similarity = centroids.best(embedding_model.embed_query(example["question"]))
+        gated = is_gateable(example["question"], example.get("history"))
+        rows.append({**example, "best_topic": topic, "similarity": similarity, "gated": gated})
+
+    # Ungated questions can't be blocked, whatever their similarity
+    def _scores(on_topic: bool) -> np.ndarray:
+        return np.asarray([
+            row["similarity"] if row["gated"] else np.inf for row in rows if row["on_topic"] == on_topic
+        ])
+
+    on_topic, off_topic = _scores(True), _scores(False)
+    skipped = [row for row in rows if not row["gated"]]
+    print(f"{len(on_topic)} on-topic and {len(off_topic)} off-topic questions "
+          f"({sum(row['on_topic'] for row in skipped)} on-topic and {sum(not row['on_topic'] for row in skipped)} "
+          f"off-topic never gated), {len(centroids)} centroids over {len(set(centroids.labels))} sources\n")
+    for row in skipped:
+        print(f"  never gated {row['similarity']:.3f} ({'on' if row['on_topic'] else 'off'}-topic) {row['question']}")
+    print()
+
+    checked_on = [row["similarity"] for row in rows if row["on_topic"] and row["gated"]]
+    checked_off = [row["similarity"] for row in rows if not row["on_topic"] and row["gated"]]
+    if checked_on and checked_off:
+        print(f"Similarity of gated questions: on-topic min {min(checked_on):.3f} / "
+              f"median {np.median(checked_on):.3f}, "
+              f"off-topic median {np.median(checked_off):.3f} / max {max(checked_off):.3f}\n")
+
+    print(f"{'threshold':>9} {'false pos':>9} {'absorbed':>9}")
+    sweep = []
+    for threshold in sorted(set(args.thresholds) | {args.threshold}):
+        false_positive_rate = float(np.mean(on_topic < threshold)) if len(on_topic) else 0.0
+        absorbed = float(np.mean(off_topic < threshold)) if len(off_topic) else 0.0
+        sweep.append({"threshold": threshold, "false_positive_rate": false_positive_rate, "absorbed": absorbed})
+        line = f"{threshold:>9.2f} {false_positive_rate:>9.1%} {absorbed:>9.1%}"
+        if threshold == settings.OFF_TOPIC_GATE_THRESHOLD:
+            line += "  <- current"
+        print(line)
+
+    wrong = [row for row in rows if (row["gated"] and row["similarity"] < args.threshold) == row["on_topic"]]
+    print(f"\nMisclassified at {args.threshold}: {len(wrong)}")
+    for row in sorted(wrong, key=lambda r: r["similarity"]):
+        verdict = "blocked on-topic" if row["on_topic"] else "passed off-topic"
+        print(f"  {verdict:<16} {row['similarity']:.3f} ({row['best_topic']}) {row['question']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"centroids": len(centroids), "sweep": sweep, "rows": rows}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Export the sentence-transformers embedding model to ONNX (and an int8 dynamically-quantized copy)
+# for EMBEDDING_BACKEND="onnx". Run once, wherever the PyTorch stack is installed:
+#
+#   python scripts/export_onnx_embeddings.py
+#
+# Writes model.onnx, model_quantized.onnx, tokenizer.json and onnx_config.json to EMBEDDING_ONNX_DIR.
+
+import sys
+import os
+import json
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.models import Normalize
+from core.onnx_embeddings import ONNX_CONFIG_FILE, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE
+from app.settings import Settings
+settings = Settings()
+
+
+def main():
+    out_dir = settings.EMBEDDING_ONNX_DIR
+    os.makedirs(out_dir, exist_ok=True)
+
+    print(f"Loading {settings.EMBEDDING_MODEL_NAME}...")
+    st_model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, device="cpu")
+    transformer = st_model[0]
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+
+    dummy = tokenizer(["Shree built a 3D image renderer."], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(out_dir, ONNX_MODEL_FILE)
+    print(f"Exporting ONNX model to {model_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    quantized_path = os.path.join(out_dir, ONNX_QUANTIZED_MODEL_FILE)
+    print(f"Quantizing weights to int8: {quantized_path}...")
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(out_dir)  # writes tokenizer.json for the fast tokenizer
+
+    config = {
+        "model_name": settings.EMBEDDING_MODEL_NAME,
+        "max_seq_length": st_model.max_seq_length,
+        "pooling": "mean",
+        "normalize": any(isinstance(module, Normalize) for module in st_model),
+    }
+    with open(os.path.join(out_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    print("Done!")
+    for name in (ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE):
+        size_mb = os.path.getsize(os.path.join(out_dir, name)) / 1e6
+        print(f"  {name}: {size_mb:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import sys
 import os
+import hashlib
+from collections import Counter
+from typing import Dict, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,10 +13,21 @@ if PROJECT_ROOT not in sys.path:
 print(f"Added project root to path: {PROJECT_ROOT}")
 
 from core.loaders import load_all_documents
-from core.vector_store import vector_store
+from core.vector_store import (
+    get_vector_store,
+    get_collection_version,
+    hnsw_build_mismatches,
+    new_collection_version,
+    bump_collection_version
+)
+from core.bm25 import BM25Index, bm25_index_path
+from core.numpy_index import NumpyVectorIndex, numpy_index_paths
+from core.topic_centroids import TopicCentroids, topic_centroids_path
+from core.embedding_batcher import embed_in_buckets
 # from core.embeddings import embedding_model
 # from langchain_experimental.text_splitter import SemanticChunker
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 from app.settings import Settings
 settings = Settings()
 
@@ -34,6 +48,137 @@ def preview_chunks(chunks, filename="chunks_debug.txt"):
     
     print(f"Done! Open {filename} to verify your chunking quality.")
 
+def _source_key(chunk: Document) -> str:
+    """
+    Stable identifier for the document a chunk came from (a repo README or the resume file).
+    """
+    metadata = chunk.metadata
+    if metadata.get("repo_name"):
+        return f"github:{metadata['repo_name']}:{metadata.get('source', '')}"
+    return f"file:{metadata.get('source_file') or metadata.get('source', 'unknown')}"
+
+
+def assign_chunk_ids(chunks: List[Document]) -> List[str]:
+    """
+    Derive each chunk's ID from its source plus a hash of its content, so an unchanged
+    chunk gets the same ID on every run. Identical chunks within one source are numbered.
+    """
+    ids = []
+    seen = Counter()
+    for chunk in chunks:
+        source_key = _source_key(chunk)
+        content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        seen[(source_key, content_hash)] += 1
+        occurrence = seen[(source_key, content_hash)]
+
+        chunk.metadata["source_key"] = source_key
+        chunk.metadata["content_hash"] = content_hash
+        ids.append(hashlib.sha256(f"{source_key}|{content_hash}|{occurrence}".encode("utf-8")).hexdigest())
+    return ids
+
+
+def sync_chunks(chunks: List[Document]) -> Dict[str, int]:
+    """
+    Bring the collection in line with `chunks` without rebuilding it:
+    - added:   new IDs are embedded and inserted
+    - updated: known IDs whose metadata moved (e.g. start_index) get a metadata-only update
+    - deleted: IDs no longer produced (changed or removed sources) are dropped
+    - skipped: everything else is left alone and never re-embedded
+    """
+    ids = assign_chunk_ids(chunks)
+    vector_store = get_vector_store()
+
+    existing = vector_store.get(include=["metadatas"])
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+
+    to_add_ids, to_add = [], []
+    to_update_ids, to_update_metadata = [], []
+    skipped = 0
+    for chunk_id, chunk in zip(ids, chunks):
+        if chunk_id not in existing_metadata:
+            to_add_ids.append(chunk_id)
+            to_add.append(chunk)
+        elif existing_metadata[chunk_id] != chunk.metadata:
+            to_update_ids.append(chunk_id)
+            to_update_metadata.append(chunk.metadata)
+        else:
+            skipped += 1
+
+    current_ids = set(ids)
+    to_delete_ids = [chunk_id for chunk_id in existing_metadata if chunk_id not in current_ids]
+
+    # Add before deleting so the live collection is never empty mid-run
+    if to_add:
+        print(f"Embedding and adding {len(to_add)} new chunks...")
+        texts = [chunk.page_content for chunk in to_add]
+        vectors, report = embed_in_buckets(
+            vector_store.embeddings,
+            texts,
+            token_budget=settings.EMBEDDING_BATCH_TOKEN_BUDGET,
+            max_batch_size=settings.EMBEDDING_BATCH_SIZE
+        )
+        print(report)
+        vector_store._collection.add(
+            ids=to_add_ids,
+            embeddings=vectors,
+            documents=texts,
+            metadatas=[chunk.metadata for chunk in to_add]
+        )
+    if to_update_ids:
+        vector_store._collection.update(ids=to_update_ids, metadatas=to_update_metadata)
+    if to_delete_ids:
+        vector_store.delete(ids=to_delete_ids)
+
+    return {
+        "added": len(to_add_ids),
+        "updated": len(to_update_ids),
+        "deleted": len(to_delete_ids),
+        "skipped": skipped,
+    }
+
+
+def rebuild_bm25_index(collection_version: str) -> None:
+    """
+    Rebuild the BM25 index from exactly what is in the collection now (same IDs as Chroma).
+    """
+    existing = get_vector_store().get(include=["documents", "metadatas"])
+    index = BM25Index.build(
+        existing["ids"], existing["documents"], existing["metadatas"], collection_version
+    )
+    path = bm25_index_path(settings.VECTOR_DB_PATH)
+    index.save(path)
+    print(f"BM25 index rebuilt with {len(index)} chunks at {path}")
+
+
+def rebuild_numpy_index(collection_version: str) -> None:
+    """
+    Rebuild the exact NumPy vector index from the collection's stored vectors (no re-embedding).
+    Always written, so switching VECTOR_BACKEND doesn't need a re-ingest.
+    """
+    existing = get_vector_store().get(include=["embeddings", "documents", "metadatas"])
+    index = NumpyVectorIndex.build(
+        existing["ids"], existing["embeddings"], existing["documents"], existing["metadatas"],
+        space=settings.HNSW_SPACE, collection_version=collection_version
+    )
+    vectors_path, chunks_path = numpy_index_paths(settings.VECTOR_DB_PATH)
+    index.save(vectors_path, chunks_path)
+    print(f"NumPy vector index rebuilt with {len(index)} chunks at {vectors_path}")
+
+
+def rebuild_topic_centroids(collection_version: str) -> None:
+    """
+    Recompute the per-source topic centroids (rephrase fast path, off-topic gate) from the stored vectors.
+    """
+    existing = get_vector_store().get(include=["embeddings", "metadatas"])
+    centroids = TopicCentroids.build(
+        existing["embeddings"], existing["metadatas"],
+        per_source=settings.TOPIC_CENTROIDS_PER_SOURCE, collection_version=collection_version
+    )
+    path = topic_centroids_path(settings.VECTOR_DB_PATH)
+    centroids.save(path)
+    print(f"Topic centroids rebuilt: {len(centroids)} centroids for {len(set(centroids.labels))} sources at {path}")
+
+
 def main():
     documents = load_all_documents()
 
@@ -71,20 +216,39 @@ def main():
 
     final_chunks = text_splitter.split_documents(documents)
 
-    try:
-        print(f"Clearing old data from collection: {vector_store._collection.name}...")
-        vector_store.reset_collection()
-        print("Old data cleared.")
-    except Exception as e:
-        # This is expected on the very first run when the
-        # collection doesn't exist yet. We can safely ignore it.
-        print(f"Info: Could not clear collection (this is normal on first run): {e}")
+    mismatches = hnsw_build_mismatches(get_vector_store()._collection)
+    if mismatches:
+        # Space / M / construction ef are fixed at creation. Deleting the live collection would leave a running
+        # API with an empty (and then dangling) collection, so the new index is built next to it instead.
+        print(f"Error: HNSW settings changed {mismatches}; the collection at {settings.VECTOR_DB_PATH} is left as is.")
+        print("Build a new store with VECTOR_DB_PATH=<new path> python scripts/ingest.py (unchanged chunks come "
+              "from the embedding cache), then point the API's VECTOR_DB_PATH at it and restart.")
+        sys.exit(1)
+
+    print(f"Syncing chunks into collection: {settings.VECTOR_DB_COLLECTION_NAME}...")
+    counts = sync_chunks(final_chunks)
 
-    vector_store.add_documents(final_chunks)
+    if counts["added"] or counts["updated"] or counts["deleted"]:
+        # Derived indexes are written first, then the version bump tells the running API
+        # that cached answers are stale and the new indexes are ready to load
+        version = new_collection_version()
+        rebuild_bm25_index(version)
+        rebuild_numpy_index(version)
+        rebuild_topic_centroids(version)
+        bump_collection_version(version)
+    else:
+        if not os.path.exists(bm25_index_path(settings.VECTOR_DB_PATH)):
+            rebuild_bm25_index(get_collection_version())
+        if not all(os.path.exists(path) for path in numpy_index_paths(settings.VECTOR_DB_PATH)):
+            rebuild_numpy_index(get_collection_version())
+        if not os.path.exists(topic_centroids_path(settings.VECTOR_DB_PATH)):
+            rebuild_topic_centroids(get_collection_version())
     
     print("\n--- Ingestion Complete ---")
     print(f"Total documents loaded: {len(documents)}")
     print(f"Total chunks created: {len(final_chunks)}")
+    print(f"Chunks added: {counts['added']}, updated: {counts['updated']}, "
+          f"deleted: {counts['deleted']}, skipped (unchanged): {counts['skipped']}")
     print(f"Vector store populated and ready at: {settings.VECTOR_DB_PATH}")
 
 if __name__ == "__main__":
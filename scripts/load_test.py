@@ -0,0 +1,282 @@
+# Load test: throughput, tail latency and memory of the real service (app.api:app) without Groq quota.
+# Starts uvicorn with LLM_PROVIDER="fake" (core/fake_llm.py, simulated time-to-first-token and token rate),
+# waits for /ready, then drives /chat with concurrent multi-turn sessions while sampling the server's RSS.
+# Everything else is real: embeddings, Chroma, BM25, caches, session store (run scripts/ingest.py first).
+#
+#   python scripts/load_test.py --users 8 --sessions 64 --turns 3 --output results/load_test.json
+#   python scripts/load_test.py --output results/after.json --compare results/before.json
+#
+# The JSON file records the commit and configuration with the results, so runs can be compared between commits.
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import httpx
+import numpy as np
+
+FIRST_QUESTIONS = [
+    "What projects has Shree built?",
+    "What programming languages does Shree know?",
+    "Where did Shree go to school?",
+    "What work experience does Shree have?",
+    "Has Shree worked with machine learning?",
+    "What is Shree's most recent project?",
+    "Does Shree have experience with cloud platforms?",
+    "What are Shree's strongest skills?",
+]
+
+FOLLOW_UPS = [
+    "Tell me more about that.",
+    "Which technologies were used?",
+    "What was the hardest part?",
+    "How long did it take?",
+    "Can you give another example?",
+]
+
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAKE_LLM_ANSWER_TOKENS": str(args.answer_tokens),
+    })
+    # Settings requires a key even though the fake provider never uses it
+    env.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+    command = [sys.executable, "-m", "uvicorn", "app.api:app", "--host", "127.0.0.1", "--port", str(args.port)]
+    print(f"Starting server: {' '.join(command)}")
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/ready")
+            body = response.json()
+            if response.status_code == 200:
+                return body
+            if body.get("status") == "failed":
+                raise RuntimeError(f"Server warmup failed: {body.get('error')}")
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server was not ready after {timeout}s")
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    # Linux only (the deployment target); returns None elsewhere
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+async def sample_rss(pid: int, interval: float, started: float, samples: List[Dict[str, float]],
+                     stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = read_rss_mb(pid)
+        if rss is not None:
+            samples.append({"seconds": round(time.perf_counter() - started, 3), "rss_mb": round(rss, 1)})
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_session(client: httpx.AsyncClient, session_id: str, turns: int, rng: random.Random,
+                      records: List[Dict[str, Any]]) -> None:
+    for turn in range(turns):
+        query = rng.choice(FIRST_QUESTIONS) if turn == 0 else rng.choice(FOLLOW_UPS)
+        start = time.perf_counter()
+        try:
+            response = await client.post("/chat", json={"query": query, "session_id": session_id})
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        records.append({"turn": turn, "ok": ok, "latency": time.perf_counter() - start})
+
+
+async def run_load(client: httpx.AsyncClient, args, run_id: str) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    sessions: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(args.sessions):
+        sessions.put_nowait(i)
+
+    async def user() -> None:
+        while not sessions.empty():
+            i = sessions.get_nowait()
+            # One RNG per session, so every run sends exactly the same conversations
+            rng = random.Random(args.seed * 100003 + i)
+            await run_session(client, f"load-{run_id}-{i}", args.turns, rng, records)
+
+    await asyncio.gather(*(user() for _ in range(args.users)))
+    return records
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    ms = np.asarray(latencies) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 1),
+        "p95": round(float(np.percentile(ms, 95)), 1),
+        "p99": round(float(np.percentile(ms, 99)), 1),
+        "mean": round(float(ms.mean()), 1),
+        "max": round(float(ms.max()), 1),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    rows = [("requests_per_sec", ["requests_per_sec"])]
+    rows += [(f"latency_ms.{p}", ["latency_ms", p]) for p in ("p50", "p95", "p99")]
+    rows += [("rss_mb.peak", ["rss_mb", "peak"])]
+
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for label, path in rows:
+        before, after = baseline["results"], current["results"]
+        for key in path:
+            before = (before or {}).get(key)
+            after = (after or {}).get(key)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {label:<18} {before:>10.1f} -> {after:>10.1f} ({change:+.1f}%)")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    server = None if args.url else start_server(args)
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    pid = server.pid if server else args.pid
+
+    try:
+        timeout = httpx.Timeout(args.request_timeout)
+        limits = httpx.Limits(max_connections=args.users)
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+            ready = await wait_until_ready(client, args.ready_timeout)
+            print(f"Server ready (startup: {ready.get('startup_seconds')})")
+
+            rss_samples: List[Dict[str, float]] = []
+            stop = asyncio.Event()
+            started = time.perf_counter()
+            sampler = None
+            if pid:
+                sampler = asyncio.create_task(sample_rss(pid, args.rss_interval, started, rss_samples, stop))
+
+            records = await run_load(client, args, run_id=str(int(time.time())))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            if sampler:
+                await sampler
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    ok = [r for r in records if r["ok"]]
+    rss_values = [s["rss_mb"] for s in rss_samples]
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "users": args.users,
+            "sessions": args.sessions,
+            "turns": args.turns,
+            "seed": args.seed,
+            "fake_llm": None if args.url else {
+                "first_token_ms": args.first_token_ms,
+                "tokens_per_second": args.tokens_per_second,
+                "answer_tokens": args.answer_tokens,
+            },
+        },
+        "results": {
+            "requests": len(records),
+            "errors": len(records) - len(ok),
+            "seconds": round(elapsed, 2),
+            "requests_per_sec": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": latency_summary([r["latency"] for r in ok]),
+            "first_turn_latency_ms": latency_summary([r["latency"] for r in ok if r["turn"] == 0]),
+            "follow_up_latency_ms": latency_summary([r["latency"] for r in ok if r["turn"] > 0]),
+            "rss_mb": {
+                "start": rss_values[0] if rss_values else None,
+                "end": rss_values[-1] if rss_values else None,
+                "peak": max(rss_values) if rss_values else None,
+                "samples": rss_samples,
+            },
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /chat load test with a fake LLM")
+    parser.add_argument("--users", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=64, help="total sessions to run")
+    parser.add_argument("--turns", type=int, default=3, help="requests per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--tokens-per-second", type=float, default=250)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="drive an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="server pid for RSS sampling when using --url")
+    parser.add_argument("--rss-interval", type=float, default=0.5)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    results = result["results"]
+
+    print(f"\n{results['requests']} requests ({results['errors']} errors) in {results['seconds']}s: "
+          f"{results['requests_per_sec']} req/s")
+    for label in ("latency_ms", "first_turn_latency_ms", "follow_up_latency_ms"):
+        summary = results[label]
+        if summary:
+            print(f"  {label:<22} p50 {summary['p50']:>8.1f}  p95 {summary['p95']:>8.1f}  p99 {summary['p99']:>8.1f}")
+    if results["rss_mb"]["peak"] is not None:
+        rss = results["rss_mb"]
+        print(f"  rss_mb                 start {rss['start']:.1f}  end {rss['end']:.1f}  peak {rss['peak']:.1f}")
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Report: how many prompt tokens context compaction saves on typical questions.
+# Runs each question through the retriever (without compaction), then through compact_context(),
+# and prints chunk/token counts before and after.
+#
+#   python scripts/report_context_savings.py --budget 3000
+
+import sys
+import os
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from core.context_compactor import compact_context
+from core.retrievers import get_ranked_retriever
+from app.settings import Settings
+settings = Settings()
+
+QUESTIONS = [
+    "What projects has Shree built?",
+    "What programming languages does Shree know?",
+    "Where did Shree go to school?",
+    "Tell me about the 3D-Image-Rendering project.",
+    "What experience does Shree have with machine learning?",
+    "Has Shree worked with React or frontend frameworks?",
+    "What internships has Shree done?",
+    "What databases has Shree used?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Context compaction token savings report")
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--duplicate-threshold", type=float, default=settings.CONTEXT_DUPLICATE_THRESHOLD)
+    args = parser.parse_args()
+
+    retriever = get_ranked_retriever()
+    total_in = total_out = 0
+
+    print(f"{'question':<55} chunks  tokens   merged dups")
+    for question in QUESTIONS:
+        docs = retriever.invoke(question)
+        _, report = compact_context(docs, args.budget, args.duplicate_threshold)
+        total_in += report.tokens_in
+        total_out += report.tokens_out
+        print(f"{question[:55]:<55} {report.chunks_in:>2}->{report.chunks_out:<2} "
+              f"{report.tokens_in:>4}->{report.tokens_out:<4} {report.merged:>6} {report.duplicates_dropped:>4}")
+
+    saved = total_in - total_out
+    print(f"\nTotal prompt context tokens: {total_in} -> {total_out} "
+          f"(saved {saved}, {saved / total_in if total_in else 0:.1%})")
+
+if __name__ == "__main__":
+    main()
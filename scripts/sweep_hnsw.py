@@ -0,0 +1,161 @@
+# Sweep: HNSW index settings (space, M, construction ef, search ef) vs recall@k, query latency and disk size.
+# Takes the chunk vectors already stored in the live collection (run scripts/ingest.py first), rebuilds a
+# throwaway Chroma collection for every (space, M, construction ef) combination, and compares each query's
+# top-k with exact brute-force search in the same space. Search ef is changed in place, no rebuild needed.
+#
+#   python scripts/sweep_hnsw.py --spaces cosine l2 --m 8 16 32 --search-ef 10 50 100 --k 12
+#
+# Queries are the sample questions below (embedded with the app's embedding model) plus
+# --chunk-queries randomly chosen chunk vectors, so small corpora still get enough queries.
+
+import sys
+import os
+import argparse
+import itertools
+import json
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+import chromadb
+import numpy as np
+from core.embeddings import get_embedding_model
+from core.vector_store import get_vector_store
+from app.settings import Settings
+settings = Settings()
+
+SAMPLE_QUESTIONS = [
+    "What projects has Shree built?",
+    "What programming languages does Shree know?",
+    "Where did Shree go to school?",
+    "What work experience does Shree have?",
+    "Has Shree worked with machine learning?",
+    "What is Shree's most recent project?",
+    "Does Shree have experience with cloud platforms?",
+    "What are Shree's strongest skills?",
+    "Which projects use Python?",
+    "Has Shree built anything with React?",
+]
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, space: str, k: int) -> np.ndarray:
+    if space == "cosine":
+        normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        qnormed = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        distances = -(qnormed @ normed.T)
+    elif space == "ip":
+        distances = -(queries @ vectors.T)
+    else:
+        distances = (
+            (queries ** 2).sum(axis=1, keepdims=True) - 2 * queries @ vectors.T + (vectors ** 2).sum(axis=1)
+        )
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total / (1024 * 1024)
+
+
+def build_collection(path: str, ids: List[str], vectors: np.ndarray, space: str, m: int, construction_ef: int):
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection(
+        "hnsw_sweep",
+        metadata={"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef},
+    )
+    batch = client.get_max_batch_size()
+    for start in range(0, len(ids), batch):
+        collection.add(ids=ids[start:start + batch], embeddings=vectors[start:start + batch].tolist())
+    return collection
+
+
+def measure(collection, id_to_row: Dict[str, int], queries: np.ndarray, exact: np.ndarray, k: int) -> Dict[str, float]:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, exact):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        found = {id_to_row[i] for i in result["ids"][0]}
+        recalls.append(len(found & set(expected.tolist())) / len(expected))
+    ms = np.asarray(latencies) * 1000
+    return {
+        "recall_at_k": float(np.mean(recalls)),
+        "min_recall": float(np.min(recalls)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW settings sweep: recall@k vs latency vs size")
+    parser.add_argument("--spaces", nargs="+", default=["cosine", "l2", "ip"])
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    parser.add_argument("--k", type=int, default=settings.RETRIEVER_K_VALUE)
+    parser.add_argument("--chunk-queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write all rows to this JSON file")
+    args = parser.parse_args()
+
+    stored = get_vector_store().get(include=["embeddings"])
+    ids = list(stored["ids"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    if not ids:
+        print("The collection is empty. Run scripts/ingest.py first.")
+        return
+    id_to_row = {chunk_id: row for row, chunk_id in enumerate(ids)}
+    k = min(args.k, len(ids))
+
+    question_vectors = np.asarray(get_embedding_model().embed_documents(SAMPLE_QUESTIONS), dtype=np.float32)
+    rng = random.Random(args.seed)
+    sampled = rng.sample(range(len(ids)), min(args.chunk_queries, len(ids)))
+    queries = np.vstack([question_vectors, vectors[sampled]]) if sampled else question_vectors
+
+    print(f"{len(ids)} chunks, {len(queries)} queries, k={k}. "
+          f"Current settings: space={settings.HNSW_SPACE} M={settings.HNSW_M} "
+          f"construction_ef={settings.HNSW_CONSTRUCTION_EF} search_ef={settings.HNSW_SEARCH_EF}\n")
+    print(f"{'space':>6} {'M':>4} {'c_ef':>5} {'s_ef':>5} {'recall@k':>9} {'min':>6} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'build s':>8} {'disk MB':>8}")
+
+    rows: List[Dict[str, Any]] = []
+    for space in args.spaces:
+        exact = exact_top_k(vectors, queries, space, k)
+        for m, construction_ef in itertools.product(args.m, args.construction_ef):
+            path = tempfile.mkdtemp(prefix="hnsw_sweep_")
+            try:
+                start = time.perf_counter()
+                collection = build_collection(path, ids, vectors, space, m, construction_ef)
+                build_seconds = time.perf_counter() - start
+
+                for search_ef in args.search_ef:
+                    collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                    row = {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef,
+                           **measure(collection, id_to_row, queries, exact, k),
+                           "build_seconds": build_seconds, "disk_mb": dir_size_mb(path)}
+                    rows.append(row)
+                    print(f"{space:>6} {m:>4} {construction_ef:>5} {search_ef:>5} {row['recall_at_k']:>9.4f} "
+                          f"{row['min_recall']:>6.2f} {row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f} "
+                          f"{build_seconds:>8.2f} {row['disk_mb']:>8.2f}")
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"chunks": len(ids), "queries": len(queries), "k": k, "rows": rows}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-from core.llm import llm
+from core.llm import getLLM
 from langchain_core.output_parsers import StrOutputParser
 from langchain.prompts import ChatPromptTemplate
 from core.loaders import load_all_documents
 from app.settings import Settings
-from core.chain import final_rag_chain
+from core.chain import get_final_rag_chain
 
 # template = "what is the capital of india? what is the population?"
 
@@ -38,6 +38,7 @@ def run_test():
     # --- 4. The 'config' object ---
     # This is required by RunnableWithMessageHistory
     config = {"configurable": {"session_id": my_session_id}}
+    final_rag_chain = get_final_rag_chain()
 
     print("--- Test 1: First question ---")
     